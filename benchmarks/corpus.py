@@ -0,0 +1,118 @@
+import base64
+import hashlib
+import zipfile
+from pathlib import Path
+from typing import Dict, Iterable
+
+from pyorbs.requirements import ProcessedRequirements
+from pyorbs.templates import render
+
+
+def package_name(index: int) -> str:
+    return f'bench-pkg-{index:03d}'
+
+
+def build_wheel(wheels: Path, name: str, version: str = '1.0', modules: int = 10) -> Path:
+    """
+    Build a pure Python wheel containing the given number of modules.
+    """
+    module = name.replace('-', '_')
+    dist_info = f'{module}-{version}.dist-info'
+    files: Dict[str, str] = {f'{module}/__init__.py': f'VERSION = "{version}"\n'}
+    for index in range(modules):
+        files[f'{module}/module_{index}.py'] = ''.join(
+            f'def function_{line}():\n    return {line}\n\n\n' for line in range(50)
+        )
+    files[f'{dist_info}/METADATA'] = (
+        f'Metadata-Version: 2.1\nName: {name}\nVersion: {version}\n'
+    )
+    files[f'{dist_info}/WHEEL'] = (
+        'Wheel-Version: 1.0\nGenerator: pyorbs-benchmarks\nRoot-Is-Purelib: true\n'
+        'Tag: py3-none-any\n'
+    )
+    record = []
+    for path, content in files.items():
+        digest = hashlib.sha256(content.encode(encoding='utf-8')).digest()
+        encoded_digest = base64.urlsafe_b64encode(digest).rstrip(b'=').decode()
+        record.append(f'{path},sha256={encoded_digest},{len(content.encode(encoding="utf-8"))}')
+    files[f'{dist_info}/RECORD'] = '\n'.join(record + [f'{dist_info}/RECORD,,']) + '\n'
+
+    wheels.mkdir(parents=True, exist_ok=True)
+    wheel = wheels / f'{module}-{version}-py3-none-any.whl'
+    with zipfile.ZipFile(wheel, 'w') as archive:
+        for path, content in files.items():
+            archive.writestr(path, content)
+    return wheel
+
+
+def build_wheels(wheels: Path, packages: int) -> None:
+    """
+    Build the wheels of the benchmark packages (the first package also has a newer version).
+    """
+    for index in range(packages):
+        build_wheel(wheels, name=package_name(index))
+    build_wheel(wheels, name=package_name(0), version='1.1')
+
+
+def write_lockfile(requirements: Path, pins: Iterable[str]) -> Path:
+    """
+    Write an up-to-date lockfile for a requirements file.
+    """
+    lockfile = requirements.with_name(requirements.name + '.lock')
+    processed = ProcessedRequirements(requirements, lockfile)
+    header = render('lockfile_header', {'hash': processed.current_hash})
+    lockfile.write_text(header + '\n'.join(processed.options + list(pins)) + '\n')
+    return lockfile
+
+
+def deep_chain(path: Path, depth: int, packages: int) -> Path:
+    """
+    Create a chain of requirements files that include the next one using ``-r``.
+    """
+    path.mkdir(parents=True, exist_ok=True)
+    for index in range(depth):
+        include = f'-r chain_{index + 1}.txt\n' if index + 1 < depth else ''
+        (path / f'chain_{index}.txt').write_text(
+            f'# Level {index}\n{include}{package_name(index % packages)}\n'
+        )
+    return path / 'chain_0.txt'
+
+
+def wide_fanout(path: Path, width: int, packages: int) -> Path:
+    """
+    Create a requirements file that refers to many constraints files using ``-c``.
+    """
+    path.mkdir(parents=True, exist_ok=True)
+    lines = []
+    for index in range(width):
+        (path / f'constraints_{index}.txt').write_text(
+            f'{package_name(index % packages)}==1.0\n'
+        )
+        lines.append(f'-c constraints_{index}.txt')
+    lines += [package_name(index) for index in range(packages)]
+    requirements = path / 'requirements.txt'
+    requirements.write_text('\n'.join(lines) + '\n')
+    return requirements
+
+
+def many_files(path: Path, count: int, packages: int) -> Path:
+    """
+    Create a folder with many requirements files, each having an up-to-date lockfile.
+    """
+    path.mkdir(parents=True, exist_ok=True)
+    for index in range(count):
+        names = [package_name((index + offset) % packages) for offset in range(3)]
+        requirements = path / f'requirements_{index}.txt'
+        requirements.write_text('\n'.join(names) + '\n')
+        write_lockfile(requirements, pins=[f'{name}==1.0' for name in names])
+    return path
+
+
+def orb_folders(path: Path, count: int) -> Path:
+    """
+    Create an orb storage folder with many (empty) orbs.
+    """
+    for index in range(count):
+        (path / f'orb-{index}').mkdir(parents=True, exist_ok=True)
+    (path / 'glowing').write_text('orb-0')
+    return path
@@ -0,0 +1,386 @@
+import argparse
+import io
+import json
+import os
+import platform
+import re
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import contextmanager, redirect_stdout
+from datetime import datetime, timezone
+from functools import cached_property
+from importlib import metadata
+from pathlib import Path
+from types import TracebackType
+from typing import Any, Callable, Dict, Iterator, Optional, Sequence, Type, Union
+
+import pyorbs
+from benchmarks import corpus
+from pyorbs.orb import Orb
+from pyorbs.requirements import ProcessedRequirements, RequirementsCache
+from pyorbs.shell import which
+from pyorbs.store import Store
+
+SIZES = {'packages': 20, 'depth': 200, 'width': 500, 'files': 300, 'orbs': 2000, 'freeze': 4}
+QUICK_SIZES = {'packages': 3, 'depth': 20, 'width': 20, 'files': 20, 'orbs': 100, 'freeze': 2}
+
+BenchmarkCallable = Callable[['Workspace'], float]
+BENCHMARKS: Dict[str, BenchmarkCallable] = {}
+
+
+def benchmark(function: BenchmarkCallable) -> BenchmarkCallable:
+    BENCHMARKS[function.__name__] = function
+    return function
+
+
+class Timer:
+    def __init__(self) -> None:
+        self.elapsed = 0.0
+        self._start = 0.0
+
+    def __enter__(self) -> 'Timer':
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc_value: Optional[BaseException],
+        traceback: Optional[TracebackType],
+    ) -> None:
+        self.elapsed = time.perf_counter() - self._start
+
+
+@contextmanager
+def silenced(verbose: bool = False) -> Iterator[None]:
+    """
+    Suppress the output of the current process and its subprocesses.
+    """
+    if verbose:
+        yield
+        return
+    sys.stdout.flush()
+    sys.stderr.flush()
+    saved = [os.dup(1), os.dup(2)]
+    try:
+        with open(os.devnull, 'w', encoding='utf-8') as devnull:
+            os.dup2(devnull.fileno(), 1)
+            os.dup2(devnull.fileno(), 2)
+            with redirect_stdout(io.StringIO()):
+                yield
+    finally:
+        for descriptor, saved_descriptor in enumerate(saved, start=1):
+            os.dup2(saved_descriptor, descriptor)
+            os.close(saved_descriptor)
+
+
+class Workspace:
+    def __init__(self, path: Path, sizes: Dict[str, int], verbose: bool = False):
+        """
+        Benchmark corpus that is generated on demand.
+
+        Args:
+            path: The folder to generate the corpus in.
+            sizes: The sizes of the generated requirements trees and orb folders.
+            verbose: Whether to show the output of the orb commands.
+
+        """
+        self.path = path
+        self.sizes = sizes
+        self.verbose = verbose
+        self.orbs = path / 'orbs'
+
+    def orb(self, *args: str) -> int:
+        """
+        Run an orb command offline using the orb storage folder of the workspace.
+        """
+        with silenced(verbose=self.verbose):
+            return Orb(args=[*args, '--path', str(self.orbs), '--offline']).act()
+
+    @staticmethod
+    def command(*args: str) -> float:
+        """
+        Return the wall time of running a Python command in a new process.
+        """
+        env = {**os.environ, 'PYTHONPATH': str(Path(pyorbs.__file__).parents[1])}
+        with Timer() as timer:
+            subprocess.run(  # nosec: trusted input
+                [sys.executable, *args], env=env, capture_output=True, check=True,
+            )
+        return timer.elapsed
+
+    def seed(self) -> Store:
+        """
+        Add the benchmark wheels and a base environment to the orb store (unless already done).
+        """
+        store = Store(self.orbs / '.store')
+        if (base := store.base(sys.executable)).exists():
+            return store
+        corpus.build_wheels(store.wheels, packages=self.sizes['packages'])
+        # The base environment is seeded using ensurepip, as upgrading pip, setuptools and
+        # wheel would require network access
+        staging = store.staging(base)
+        subprocess.run(  # nosec: trusted input
+            [sys.executable, '-m', 'venv', str(staging)], capture_output=True, check=True,
+        )
+        store.commit(staging, base)
+        return store
+
+    def requirements(self, name: str, packages: Optional[int] = None) -> Path:
+        """
+        Create a requirements file that contains the given number of benchmark packages.
+        """
+        self.seed()
+        path = self.path / name / 'requirements.txt'
+        path.parent.mkdir(parents=True, exist_ok=True)
+        names = [corpus.package_name(index) for index in range(packages or self.sizes['packages'])]
+        path.write_text('\n'.join(names) + '\n')
+        return path
+
+    @cached_property
+    def made(self) -> str:
+        """
+        Return the name of an orb made from a lockfile that is already in the store.
+        """
+        requirements = self.requirements('made')
+        self.orb('--make', 'made', '--requirements', str(requirements))
+        return 'made'
+
+    @cached_property
+    def deep_chain(self) -> Path:
+        return corpus.deep_chain(
+            self.path / 'deep', depth=self.sizes['depth'], packages=self.sizes['packages'],
+        )
+
+    @cached_property
+    def wide_fanout(self) -> Path:
+        return corpus.wide_fanout(
+            self.path / 'wide', width=self.sizes['width'], packages=self.sizes['packages'],
+        )
+
+    @cached_property
+    def many_files(self) -> Path:
+        return corpus.many_files(
+            self.path / 'many', count=self.sizes['files'], packages=self.sizes['packages'],
+        )
+
+    @cached_property
+    def orb_folders(self) -> Path:
+        return corpus.orb_folders(self.path / 'many-orbs', count=self.sizes['orbs'])
+
+
+def _hash(path: Path, cache_path: Optional[Path] = None) -> float:
+    lockfile = path.with_name('missing.lock')
+    if cache_path and not cache_path.exists():  # warming up the cache
+        warm_cache = RequirementsCache(cache_path)
+        ProcessedRequirements(path, lockfile, cache=warm_cache)
+        warm_cache.save()
+    with Timer() as timer:
+        cache = RequirementsCache(cache_path) if cache_path else None
+        ProcessedRequirements(path, lockfile, cache=cache)
+    return timer.elapsed
+
+
+@benchmark
+def hash_deep_chain(workspace: Workspace) -> float:
+    return _hash(workspace.deep_chain)
+
+
+@benchmark
+def hash_deep_chain_cached(workspace: Workspace) -> float:
+    return _hash(workspace.deep_chain, cache_path=workspace.path / 'deep-cache.json')
+
+
+@benchmark
+def hash_wide_fanout(workspace: Workspace) -> float:
+    return _hash(workspace.wide_fanout)
+
+
+@benchmark
+def hash_wide_fanout_cached(workspace: Workspace) -> float:
+    return _hash(workspace.wide_fanout, cache_path=workspace.path / 'wide-cache.json')
+
+
+@benchmark
+def lockfile_test(workspace: Workspace) -> float:
+    with Timer() as timer:
+        workspace.orb('--test', '--requirements', str(workspace.many_files), '--no-cache')
+    return timer.elapsed
+
+
+@benchmark
+def lockfile_test_cached(workspace: Workspace) -> float:
+    workspace.orb('--test', '--requirements', str(workspace.many_files))  # warming up the cache
+    with Timer() as timer:
+        workspace.orb('--test', '--requirements', str(workspace.many_files))
+    return timer.elapsed
+
+
+@benchmark
+def list_orbs(workspace: Workspace) -> float:
+    with Timer() as timer, silenced(verbose=workspace.verbose):
+        Orb(args=['--list', '--path', str(workspace.orb_folders)]).act()
+    return timer.elapsed
+
+
+@benchmark
+def startup_baseline(workspace: Workspace) -> float:  # pylint: disable=unused-argument
+    return workspace.command('-c', 'pass')
+
+
+@benchmark
+def startup_list(workspace: Workspace) -> float:
+    return workspace.command('-m', 'pyorbs', '--path', str(workspace.orb_folders), '--list')
+
+
+@benchmark
+def startup_activate(workspace: Workspace) -> float:
+    return workspace.command(
+        '-m', 'pyorbs', workspace.made, '--path', str(workspace.orbs), '--no-cd',
+        '--command', 'true',
+    )
+
+
+@benchmark
+def make(workspace: Workspace) -> float:
+    requirements = workspace.requirements('make')
+    requirements.with_name('requirements.txt.lock').unlink(missing_ok=True)
+    shutil.rmtree(workspace.seed().path / 'orbs', ignore_errors=True)
+    with Timer() as timer:
+        workspace.orb('--make', 'make', '--requirements', str(requirements))
+    return timer.elapsed
+
+
+@benchmark
+def make_store_hit(workspace: Workspace) -> float:
+    requirements = workspace.requirements(workspace.made)
+    with Timer() as timer:
+        workspace.orb('--make', 'store-hit', '--requirements', str(requirements))
+    return timer.elapsed
+
+
+@benchmark
+def update_sync(workspace: Workspace) -> float:
+    requirements = workspace.requirements('sync')
+    lockfile = requirements.with_name('requirements.txt.lock')
+    if not lockfile.exists():
+        workspace.orb('--make', 'sync', '--requirements', str(requirements))
+    # Alternating between two versions of a package that is pinned in the lockfile
+    package = corpus.package_name(0)
+    content = lockfile.read_text()
+    old, new = (f'{package}==1.0', f'{package}==1.1')
+    lockfile.write_text(content.replace(old, new) if old in content else content.replace(new, old))
+    with Timer() as timer:
+        workspace.orb('--update', 'sync', '--requirements', str(requirements), '--no-store')
+    return timer.elapsed
+
+
+@benchmark
+def freeze(workspace: Workspace) -> float:
+    folder = workspace.path / 'freeze'
+    folder.mkdir(exist_ok=True)
+    workspace.seed()
+    for index in range(workspace.sizes['freeze']):
+        requirements = folder / f'requirements_{index}.txt'
+        requirements.write_text(corpus.package_name(index % workspace.sizes['packages']) + '\n')
+        requirements.with_name(f'{requirements.name}.lock').write_text(
+            '# Requirements hash: outdated\n'
+        )
+    with Timer() as timer:
+        workspace.orb(
+            '--freeze', '--requirements', str(folder), '--jobs', str(workspace.sizes['freeze']),
+        )
+    return timer.elapsed
+
+
+def run_benchmarks(
+    workspace: Workspace, names: Sequence[str], repeat: int,
+) -> Dict[str, Dict[str, Any]]:
+    results = {}
+    for name in names:
+        times = [BENCHMARKS[name](workspace) for _ in range(repeat)]
+        minimum, median = min(times), statistics.median(times)
+        results[name] = {
+            'times': times, 'min': minimum, 'median': median, 'mean': statistics.mean(times),
+        }
+        print(f'{name:<28} {minimum * 1000:>10.1f} ms (min) {median * 1000:>10.1f} ms (median)',
+              flush=True)
+    return results
+
+
+def compare(results: Dict[str, Any], previous: Dict[str, Any]) -> None:
+    print(f'\nComparison with pyorbs {previous.get("pyorbs")} (median times):')
+    for name, result in results['benchmarks'].items():
+        if not (previous_result := previous['benchmarks'].get(name)):
+            continue
+        change = (result['median'] / previous_result['median'] - 1) * 100
+        print(f'{name:<28} {previous_result["median"] * 1000:>10.1f} ms -> '
+              f'{result["median"] * 1000:>10.1f} ms ({change:+.1f}%)')
+
+
+def _version() -> str:
+    try:
+        return metadata.version('pyorbs')
+    except metadata.PackageNotFoundError:
+        return 'unknown'
+
+
+def main(args: Sequence[str] = tuple(sys.argv[1:])) -> Union[int, str]:
+    parser = argparse.ArgumentParser(description='Run the pyorbs benchmarks offline.')
+    parser.add_argument('-k', '--select', metavar='X',
+                        help='only run the benchmarks matching the given regular expression')
+    parser.add_argument('-n', '--repeat', metavar='X', type=int, default=5,
+                        help='number of times to run each benchmark (default: 5)')
+    parser.add_argument('-o', '--output', metavar='X', type=Path,
+                        help='write the results to the given JSON file')
+    parser.add_argument('--compare', metavar='X', type=Path,
+                        help='compare the results with a previous JSON results file')
+    parser.add_argument('--quick', action='store_true', help='use a small benchmark corpus')
+    parser.add_argument('--verbose', action='store_true', help='show orb command output')
+    arguments = parser.parse_args(args)
+
+    names = [
+        name for name in BENCHMARKS
+        if not arguments.select or re.search(arguments.select, name)
+    ]
+    if not names:
+        return f'Error: There are no benchmarks matching "{arguments.select}"'
+
+    with tempfile.TemporaryDirectory(prefix='pyorbs-benchmarks-') as tmp_path:
+        (Path(tmp_path) / 'home').mkdir()
+        os.environ.update({
+            'HOME': str(Path(tmp_path) / 'home'),  # isolating the orbs from shell startup files
+            'SHELL': which('bash'),
+            'XDG_CACHE_HOME': str(Path(tmp_path) / 'cache'),
+            'PYORBS_DEFAULT_REQUIREMENTS': '',
+            'PIP_DISABLE_PIP_VERSION_CHECK': '1',
+        })
+        os.environ.pop('PYORBS_CURRENT_ORB', None)
+        workspace = Workspace(
+            path=Path(tmp_path), sizes=QUICK_SIZES if arguments.quick else SIZES,
+            verbose=arguments.verbose,
+        )
+        try:
+            benchmarks = run_benchmarks(workspace, names=names, repeat=max(1, arguments.repeat))
+        except (ValueError, RuntimeError, subprocess.CalledProcessError) as error:
+            return f'Error: {error}'
+
+    results = {
+        'pyorbs': _version(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'created': datetime.now(timezone.utc).isoformat(),
+        'sizes': workspace.sizes,
+        'repeat': max(1, arguments.repeat),
+        'benchmarks': benchmarks,
+    }
+    if arguments.output:
+        arguments.output.write_text(json.dumps(results, indent=2) + '\n')
+        print(f'Results are written to "{arguments.output}"')
+    if arguments.compare:
+        compare(results, previous=json.loads(arguments.compare.read_text()))
+    return 0
@@ -0,0 +1,233 @@
+# The API uses the implementation of the orb command, capturing its messages instead of printing
+# them and returning structured results instead of exit codes
+import hashlib
+import time
+from contextlib import contextmanager
+from io import StringIO
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional
+
+from pyorbs.errors import OrbError
+from pyorbs.orb import Orb
+
+
+class OrbInfo(NamedTuple):
+    name: str
+    path: Path
+    python: Optional[str]
+    requirements: Optional[Path]
+    lockfile_hash: Optional[str]
+    size: Optional[int]
+    created: Optional[float]
+    updated: Optional[float]
+    activated: Optional[float]
+
+    @classmethod
+    def from_entry(cls, name: str, path: Path, entry: Dict[str, Any]) -> 'OrbInfo':
+        return cls(
+            name=name,
+            path=path / name,
+            python=entry.get('python'),
+            requirements=Path(entry['requirements']) if entry.get('requirements') else None,
+            lockfile_hash=entry.get('lockfile_hash'),
+            size=entry.get('size'),
+            created=entry.get('created'),
+            updated=entry.get('updated'),
+            activated=entry.get('activated'),
+        )
+
+
+class MakeResult(NamedTuple):
+    orb: OrbInfo
+    duration: float
+    output: str
+
+
+class RequirementsStatus(NamedTuple):
+    requirements: Path
+    lockfile: Optional[Path]
+    outdated: bool
+    changed: bool
+    status: str
+
+
+class FreezeResult(NamedTuple):
+    requirements: Path
+    lockfile: Path
+    lockfile_hash: Optional[str]
+    frozen: bool
+    duration: float
+
+
+def _check_name(name: str) -> None:
+    if not name or name.startswith(('-', '.')):
+        raise OrbError(f'Invalid orb name "{name}"')
+
+
+@contextmanager
+def _errors() -> Iterator[None]:
+    try:
+        yield
+    except (ValueError, RuntimeError) as error:
+        if isinstance(error, OrbError):
+            raise
+        raise OrbError(str(error)) from error  # e.g. invalid options
+
+
+class Orbs:
+    def __init__(  # pylint: disable=too-many-arguments
+        self,
+        path: Path,
+        executable: Optional[str] = None,
+        cache: bool = True,
+        store: bool = True,
+        offline: bool = False,
+        interpreter_lockfile: bool = False,
+        optimize: int = 0,
+    ):
+        """
+        Manage the orbs of an orb storage folder programmatically.
+
+        The methods can be called concurrently from several threads (and processes), as orbs and
+        the shared parts of the storage folder are locked the same way as by the orb command.
+        Messages and the output of the commands are captured instead of being printed, and errors
+        are raised as subclasses of :class:`~pyorbs.errors.OrbError`.
+
+        Args:
+            path: The orb storage path to use.
+            executable: The default Python executable to use (default: sys.executable).
+            cache: Whether to use the pip cache and the requirements cache.
+            store: Whether to use the orb store.
+            offline: Whether to install packages from the local wheelhouse only.
+            interpreter_lockfile: Whether to use lockfiles specific to the version of the Python
+                executable.
+            optimize: The optimization level of the bytecode compiled for the packages of orbs.
+
+        """
+        if optimize not in (0, 1, 2):
+            raise OrbError(f'Invalid optimization level "{optimize}"')
+        self.path = Path(path).expanduser().absolute()
+        self.executable = executable
+        self.options: Dict[str, Any] = {
+            'optimize': optimize, 'no_cache': not cache, 'no_store': not store,
+            'offline': offline, 'interpreter_lockfile': interpreter_lockfile,
+        }
+
+    def _orb(
+        self, requirements: Optional[Path] = None, executable: Optional[str] = None,
+        output: Optional[StringIO] = None, **options: Any,
+    ) -> Orb:
+        options = {**self.options, **options, 'path': self.path}
+        if requirements:
+            options['requirements'] = Path(requirements).absolute()
+        if executable := executable or self.executable:
+            options['executable'] = executable
+        return Orb(default_requirements=[], output=output or StringIO(), options=options)
+
+    def _info(self, orb: Orb, name: str) -> OrbInfo:
+        index = orb.updated_index()  # includes the recorded activations
+        return OrbInfo.from_entry(name=name, path=self.path, entry=index.orbs.get(name, {}))
+
+    def make(
+        self, name: str, requirements: Optional[Path] = None, executable: Optional[str] = None,
+        update: bool = False,
+    ) -> MakeResult:
+        """
+        Make an orb (or update it), returning its details.
+
+        Args:
+            name: The name of the orb.
+            requirements: The requirements file to use (which is required for updating orbs).
+            executable: The Python executable to use.
+            update: Whether to update an existing orb.
+
+        """
+        _check_name(name)
+        output = StringIO()
+        start = time.perf_counter()
+        with _errors():
+            orb = self._orb(
+                name=name, requirements=requirements, executable=executable, output=output,
+            )
+            orb.make(update=update, capture=True)
+            info = self._info(orb, name=name)
+        return MakeResult(orb=info, duration=time.perf_counter() - start, output=output.getvalue())
+
+    def update(
+        self, name: str, requirements: Path, executable: Optional[str] = None,
+    ) -> MakeResult:
+        """
+        Update an orb, returning its details.
+        """
+        return self.make(name=name, requirements=requirements, executable=executable, update=True)
+
+    def freeze(
+        self, requirements: Path, executable: Optional[str] = None, resolve: bool = False,
+        hashes: bool = False,
+    ) -> List[FreezeResult]:
+        """
+        Freeze requirements (or all requirements files in a folder) when their lockfiles are
+        missing or outdated.
+
+        Args:
+            requirements: The requirements file or folder to freeze.
+            executable: The Python executable to use.
+            resolve: Whether to freeze the requirements by resolving them without installing them.
+            hashes: Whether to record the hashes of the packages in the lockfiles.
+
+        """
+        with _errors():
+            orb = self._orb(
+                requirements=requirements, executable=executable, resolve=resolve, hashes=hashes,
+            )
+            changed = {item.path for item in orb.requirements() if item.changed}
+            orb.freeze(executable=executable or self.executable, capture=True)
+            results = []
+            for item in orb.requirements():
+                if not item.path or not item.lockfile:
+                    continue
+                lockfile_hash = (
+                    hashlib.sha256(item.lockfile.read_bytes()).hexdigest()
+                    if item.lockfile.exists() else None
+                )
+                frozen = item.path in changed and not item.changed
+                duration = orb.freeze_durations.get(item.path, 0.0) if frozen else 0.0
+                results.append(FreezeResult(
+                    requirements=item.path, lockfile=item.lockfile, lockfile_hash=lockfile_hash,
+                    frozen=frozen, duration=duration,
+                ))
+        return results
+
+    def test(self, requirements: Path) -> List[RequirementsStatus]:
+        """
+        Return the status of the lockfiles of requirements (or of all requirements files in a
+        folder).
+        """
+        with _errors():
+            return [
+                RequirementsStatus(
+                    requirements=item.path, lockfile=item.lockfile, outdated=item.outdated,
+                    changed=item.changed, status=item.status,
+                )
+                for item in self._orb(requirements=requirements).requirements()
+                if item.path
+            ]
+
+    def list(self) -> List[OrbInfo]:
+        """
+        Return the details of the orbs in the orb storage folder.
+        """
+        with _errors():
+            index = self._orb().updated_index()
+            return [
+                OrbInfo.from_entry(name=name, path=self.path, entry=entry)
+                for name, entry in sorted(index.orbs.items())
+            ]
+
+    def destroy(self, name: str) -> None:
+        """
+        Destroy an orb.
+        """
+        _check_name(name)
+        with _errors():
+            self._orb(name=name).destroy()
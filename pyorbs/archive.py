@@ -0,0 +1,154 @@
+import json
+import os
+import tarfile
+from io import BytesIO
+from pathlib import Path
+from typing import Any, Dict, Optional, cast
+
+from pyorbs.store import interpreter_info, relocate
+
+ARCHIVE_METADATA = 'pyorbs-archive.json'
+ARCHIVE_VERSION = 1
+
+
+def export_orb(
+    orb: Path, archive: Path, name: str, lockfile_hash: Optional[str] = None,
+    requirements: Optional[str] = None,
+) -> None:
+    """
+    Write an orb to a compressed archive that can be imported on other machines.
+
+    The archive starts with the metadata needed to check and relocate the orb, followed by the
+    files of the orb (hardlinked files are only stored once).
+
+    Args:
+        orb: The folder of the orb to export.
+        archive: The path of the archive to write.
+        name: The name of the orb.
+        lockfile_hash: The hash of the lockfile the orb was made from.
+        requirements: The requirements file the orb was made from.
+
+    """
+    python = orb / 'bin/python'
+    metadata = {
+        'version': ARCHIVE_VERSION,
+        'name': name,
+        'path': str(orb),
+        'interpreter': {
+            'executable': os.readlink(python) if python.is_symlink() else str(python),
+            **interpreter_info(python),
+        },
+        'lockfile_hash': lockfile_hash,
+        'requirements': requirements,
+    }
+    content = (json.dumps(metadata, indent=2) + '\n').encode()
+    tmp_archive = archive.with_name(f'.{archive.name}.{os.getpid()}')
+    try:
+        with tarfile.open(tmp_archive, 'w:gz', compresslevel=6) as tar:
+            info = tarfile.TarInfo(ARCHIVE_METADATA)
+            info.size = len(content)
+            tar.addfile(info, BytesIO(content))
+            for item in sorted(orb.iterdir()):
+                tar.add(item, arcname=item.name)
+    except BaseException:
+        tmp_archive.unlink(missing_ok=True)
+        raise
+    os.replace(tmp_archive, archive)
+
+
+def _check_metadata(
+    member: Optional[tarfile.TarInfo], tar: tarfile.TarFile, archive: Path,
+) -> Dict[str, Any]:
+    if not member or member.name != ARCHIVE_METADATA or not (file := tar.extractfile(member)):
+        raise ValueError(f'Invalid orb archive "{archive}"')
+    metadata = json.loads(file.read())
+    if metadata.get('version') != ARCHIVE_VERSION:
+        raise ValueError(f'Unsupported orb archive version in "{archive}"')
+    return cast(Dict[str, Any], metadata)
+
+
+def read_metadata(archive: Path) -> Dict[str, Any]:
+    """
+    Return the metadata of an orb archive (without reading the rest of the archive).
+    """
+    try:
+        with tarfile.open(archive, 'r|gz') as tar:
+            return _check_metadata(tar.next(), tar=tar, archive=archive)
+    except (OSError, tarfile.TarError) as error:
+        raise ValueError(f'Invalid orb archive "{archive}" ({error})') from error
+
+
+def check_interpreter(orb: Path, metadata: Dict[str, Any]) -> None:
+    """
+    Check that the interpreter of an imported orb is compatible with the one it was made with.
+
+    The Python version may only differ in its patch level, which keeps the same ABI.
+    """
+    interpreter = metadata['interpreter']
+    required = f'Python {interpreter["python"]} on {interpreter["platform"]} is required'
+    if not (orb / 'bin/python').exists():
+        raise ValueError(
+            f'Python executable "{interpreter["executable"]}" is not available ({required})'
+        )
+    info = interpreter_info(orb / 'bin/python')
+    if (
+        info['python'].split('.')[:2] != interpreter['python'].split('.')[:2]
+        or info['platform'] != interpreter['platform']
+    ):
+        raise ValueError(
+            f'Python executable "{interpreter["executable"]}" is not compatible with the orb '
+            f'(Python {info["python"]} on {info["platform"]} is available, {required})'
+        )
+
+
+def _check_member(member: tarfile.TarInfo, target: Path) -> None:
+    """
+    Check that extracting an archive member only creates a file inside the target folder (for
+    Python versions without extraction filters).
+
+    Symbolic links may refer to absolute paths (e.g. the interpreter of the orb), but no files are
+    extracted through them.
+    """
+    root = os.path.realpath(target)
+
+    def inside(path: str) -> bool:
+        return os.path.commonpath([root, os.path.realpath(path)]) == root
+
+    name = os.path.normpath(member.name)
+    if os.path.isabs(name) or name.split(os.sep)[0] == '..' or not (
+        inside(os.path.join(root, os.path.dirname(name)))
+    ):
+        raise tarfile.TarError(f'Member "{member.name}" is outside of the orb')
+    if not (member.isreg() or member.isdir() or member.issym() or member.islnk()):
+        raise tarfile.TarError(f'Member "{member.name}" is not a file, folder or link')
+    if member.islnk() and (
+        os.path.isabs(member.linkname) or not inside(os.path.join(root, member.linkname))
+    ):
+        raise tarfile.TarError(f'Member "{member.name}" links to a file outside of the orb')
+
+
+def import_orb(archive: Path, target: Path) -> Dict[str, Any]:
+    """
+    Extract an orb archive to an empty folder and relocate it, returning the archive metadata.
+
+    Args:
+        archive: The path of the archive to import.
+        target: The folder to extract the orb to.
+
+    """
+    try:
+        # The archive is read as a stream as it is extracted in a single pass
+        with tarfile.open(archive, 'r|gz') as tar:
+            filtered = hasattr(tarfile, 'tar_filter')  # not available before Python 3.8.17
+            if filtered:
+                tar.extraction_filter = tarfile.tar_filter
+            metadata = _check_metadata(tar.next(), tar=tar, archive=archive)
+            while member := tar.next():
+                if not filtered:
+                    _check_member(member, target=target)
+                tar.extract(member, path=target)
+    except (OSError, tarfile.TarError) as error:
+        raise ValueError(f'Invalid orb archive "{archive}" ({error})') from error
+    check_interpreter(target, metadata=metadata)
+    relocate(target, old=Path(metadata['path']), new=target)
+    return metadata
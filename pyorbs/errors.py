@@ -0,0 +1,39 @@
+from typing import Optional
+
+
+class OrbError(Exception):
+    """
+    Base class of the errors raised by pyorbs.
+    """
+
+
+class OrbNotFoundError(OrbError, ValueError):
+    """
+    The orb does not exist.
+    """
+
+
+class RequirementsError(OrbError, ValueError):
+    """
+    The requirements file is missing or invalid.
+    """
+
+
+class LockfileError(OrbError, RuntimeError):
+    """
+    The lockfile of a requirements file is invalid or outdated.
+    """
+
+
+class CommandError(OrbError, RuntimeError):
+    def __init__(self, message: str, output: Optional[str] = None):
+        """
+        A command (e.g. installing the requirements of an orb) failed.
+
+        Args:
+            message: The error message.
+            output: The captured output of the command.
+
+        """
+        super().__init__(message)
+        self.output = output
@@ -0,0 +1,33 @@
+import argparse
+import re
+import time
+from typing import Optional, Sequence, TextIO
+
+
+def print_table(rows: Sequence[Sequence[str]], file: Optional[TextIO] = None) -> None:
+    widths = [max(len(row[column]) for row in rows) for column in range(len(rows[0]))]
+    for row in rows:
+        print(
+            '  '.join(value.ljust(width) for value, width in zip(row, widths)).rstrip(),
+            file=file,
+        )
+
+
+def format_size(size: float) -> str:
+    for unit in ('B', 'kB', 'MB', 'GB'):
+        if size < 1000:
+            break
+        size /= 1000
+    else:
+        unit = 'TB'
+    return f'{size:.0f} {unit}' if unit == 'B' else f'{size:.1f} {unit}'
+
+
+def parse_size(size: str) -> int:
+    if not (match := re.fullmatch(r'([0-9]+(?:\.[0-9]+)?) *([kmgt]?)b?', size.strip().lower())):
+        raise argparse.ArgumentTypeError(f'Invalid size "{size}"')
+    return int(float(match.group(1)) * 1000 ** ' kmgt'.index(match.group(2) or ' '))
+
+
+def format_time(timestamp: Optional[float]) -> str:
+    return time.strftime('%Y-%m-%d %H:%M', time.localtime(timestamp)) if timestamp else '-'
@@ -0,0 +1,152 @@
+import os
+import shutil
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, ContextManager, Iterator, List, Optional
+
+from pyorbs.locking import file_lock
+from pyorbs.store import clone, relocate
+
+
+class Generations:
+    def __init__(self, path: Path, name: str, keep: int = 2):
+        """
+        The generations of an orb.
+
+        Orbs are built in a new generation folder, and the orb path is a symbolic link to the
+        current generation which is switched atomically once a build is complete. The absolute
+        paths embedded in the virtual environment refer to the generation folder, so processes
+        using an earlier generation are not affected by the switch.
+
+        Args:
+            path: The orb storage path.
+            name: The name of the orb.
+            keep: The number of previous generations to keep.
+
+        """
+        self.link = path / name
+        self.folder = path / '.generations' / name
+        self.keep = keep
+
+    def lock(
+        self, shared: bool = False, blocking: bool = True,
+        on_wait: Optional[Callable[[], None]] = None,
+    ) -> ContextManager[bool]:
+        """
+        Lock the orb, so that it is only changed by one process at a time.
+        """
+        return file_lock(
+            self.folder.with_name(f'.{self.folder.name}.lock'), shared=shared, blocking=blocking,
+            on_wait=on_wait,
+        )
+
+    def numbers(self) -> List[int]:
+        if not self.folder.exists():
+            return []
+        return sorted(int(item.name) for item in self.folder.iterdir() if item.name.isdigit())
+
+    def generation(self, number: int) -> Path:
+        return self.folder / str(number)
+
+    @property
+    def current(self) -> Optional[Path]:
+        """
+        Return the folder of the current generation (or the orb folder for orbs made by earlier
+        versions).
+        """
+        if self.link.is_symlink():
+            return self.folder / Path(os.readlink(self.link)).name
+        return self.link if self.link.is_dir() else None
+
+    def stage(self) -> Path:
+        """
+        Create the folder of a new generation.
+        """
+        self.folder.mkdir(parents=True, exist_ok=True)
+        number = max(self.numbers(), default=0) + 1
+        while True:  # pylint: disable=while-used
+            try:
+                (generation := self.generation(number)).mkdir()
+                return generation
+            except FileExistsError:  # staged by another process in the meantime
+                number += 1
+
+    @staticmethod
+    def copy(source: Path, target: Path) -> None:
+        """
+        Copy a generation to a staged generation folder.
+
+        The files are hardlinked rather than copied, as the files of orbs are replaced rather than
+        changed in place (so changing the copy does not affect the source generation).
+        """
+        target.rmdir()
+        clone(source, target, link=True)
+        relocate(target, old=source, new=target)
+
+    def switch(self, generation: Path) -> None:
+        """
+        Make a generation the current one atomically.
+        """
+        if self.link.is_dir() and not self.link.is_symlink():  # orbs made by earlier versions
+            legacy = self.generation(0)
+            self.link.rename(legacy)
+            relocate(legacy, old=self.link, new=legacy)
+        tmp_link = self.link.with_name(
+            f'.{self.link.name}.{os.getpid()}.{threading.get_ident()}'
+        )
+        tmp_link.symlink_to(generation.relative_to(self.link.parent))
+        os.replace(tmp_link, self.link)
+
+    @contextmanager
+    def build(self) -> Iterator[Path]:
+        """
+        Yield the folder of a new generation and switch to it once the build is complete.
+
+        The generation is removed when the build fails, leaving the current generation intact.
+        """
+        generation = self.stage()
+        try:
+            yield generation
+        except BaseException:
+            shutil.rmtree(generation, ignore_errors=True)
+            raise
+        self.switch(generation)
+        self.prune()
+
+    def previous(self) -> Optional[Path]:
+        """
+        Return the latest generation that is older than the current one.
+        """
+        older = self.older()
+        return older[-1] if older else None
+
+    def older(self) -> List[Path]:
+        """
+        Return the generations that are older than the current one (from the oldest one).
+        """
+        if not (current := self.current) or current == self.link:
+            return []
+        return [
+            self.generation(number) for number in self.numbers() if number < int(current.name)
+        ]
+
+    def prune(self) -> None:
+        """
+        Remove the generations that are older than the previous ones to keep.
+
+        Generations newer than the current one (e.g. ones that are being built) are kept.
+        """
+        older = self.older()
+        for generation in older[:max(0, len(older) - self.keep)]:
+            shutil.rmtree(generation)
+
+    def remove(self) -> None:
+        """
+        Remove the orb with all of its generations.
+        """
+        if self.link.is_symlink():
+            self.link.unlink()
+        elif self.link.exists():
+            shutil.rmtree(self.link)
+        shutil.rmtree(self.folder, ignore_errors=True)
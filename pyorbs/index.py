@@ -0,0 +1,158 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional, cast
+
+from pyorbs.locking import file_lock
+
+
+def python_version(orb: Path) -> Optional[str]:
+    """
+    Return the Python version of an orb (based on its virtual environment configuration).
+    """
+    config = orb / 'pyvenv.cfg'
+    if not config.exists():
+        return None
+    search = re.search(r'^version(?:_info)?\s*=\s*(\S+)', config.read_text(), re.MULTILINE)
+    return search.group(1) if search else None
+
+
+def disk_usage(path: Path) -> int:
+    """
+    Return the disk space used by a folder (counting hardlinked files only once).
+    """
+    inodes = set()
+    usage = 0
+    for root, folders, files in os.walk(path):
+        for name in folders + files:
+            file_stat = os.lstat(os.path.join(root, name))
+            if file_stat.st_ino not in inodes:
+                inodes.add(file_stat.st_ino)
+                usage += file_stat.st_blocks * 512
+    return usage
+
+
+class OrbIndex:
+    def __init__(self, path: Path):
+        """
+        Metadata of the orbs in an orb storage folder.
+
+        Args:
+            path: The path of the index file.
+
+        """
+        self.path = path
+        self._orbs: Optional[Dict[str, Dict[str, Any]]] = None
+        self._changes: Dict[str, Optional[Dict[str, Any]]] = {}
+
+    def _read(self) -> Dict[str, Dict[str, Any]]:
+        try:
+            return cast(Dict[str, Dict[str, Any]], json.loads(self.path.read_text()))
+        except (FileNotFoundError, ValueError):  # the index is rebuilt when missing or corrupted
+            return {}
+
+    @property
+    def orbs(self) -> Dict[str, Dict[str, Any]]:
+        if self._orbs is None:
+            self._orbs = self._read()
+        return self._orbs
+
+    def _change(self, name: str, values: Optional[Dict[str, Any]]) -> None:
+        if values is not None and (changes := self._changes.get(name)) is not None:
+            changes.update(values)
+        else:
+            self._changes[name] = values
+
+    def index(  # pylint: disable=too-many-arguments
+        self, name: str, orb: Path, requirements: Optional[Path], lockfile: Optional[Path],
+        update: bool = False, lockfile_hash: Optional[str] = None,
+    ) -> None:
+        """
+        Add an orb to the index (or update its entry).
+
+        Args:
+            name: The name of the orb.
+            orb: The path of the orb.
+            requirements: The requirements file the orb was made from.
+            lockfile: The lockfile the orb was made from.
+            update: Whether the orb was updated (in which case its creation time is kept).
+            lockfile_hash: The hash of the lockfile (used when the lockfile is not available,
+                e.g. for imported orbs).
+
+        """
+        now = time.time()
+        entry = self.orbs.get(name, {}) if update else {}
+        self.orbs[name] = values = {
+            'python': python_version(orb),
+            'requirements': str(requirements) if requirements else None,
+            'lockfile_hash': (
+                hashlib.sha256(lockfile.read_bytes()).hexdigest()
+                if lockfile and lockfile.exists() else lockfile_hash
+            ),
+            'size': disk_usage(orb),
+            'created': entry.get('created', now),
+            'updated': now,
+            'activated': entry.get('activated'),
+        }
+        self._change(name, values)
+
+    def activated(self, name: str, timestamp: Optional[float] = None) -> None:
+        """
+        Record the activation of an orb (at the given time or now).
+        """
+        self.orbs.setdefault(name, {})['activated'] = timestamp or time.time()
+        self._change(name, {'activated': self.orbs[name]['activated']})
+
+    def collect_activations(self, folder: Path) -> bool:
+        """
+        Record the activations of orbs that are marked by the modification times of the files in
+        a folder, returning whether any activations were recorded.
+
+        Orbs are activated often, so their activations are marked by touching a file (which is
+        much faster than updating the index) and are added to the index later.
+        """
+        if not folder.exists():
+            return False
+        changed = False
+        for marker in folder.iterdir():
+            if (entry := self.orbs.get(marker.name)) is None:
+                continue
+            if (activated := marker.stat().st_mtime) > (entry.get('activated') or 0):
+                self.activated(marker.name, timestamp=activated)
+                changed = True
+        return changed
+
+    def last_used(self, name: str) -> float:
+        entry = self.orbs[name]
+        return cast(float, max(entry.get(key) or 0 for key in ('created', 'updated', 'activated')))
+
+    def remove(self, name: str) -> None:
+        self.orbs.pop(name, None)
+        self._change(name, None)
+
+    def save(self) -> None:
+        """
+        Apply the changes to the index file atomically.
+
+        The changes are applied to the current contents of the index file, so that concurrent
+        changes made by other processes are kept.
+        """
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with file_lock(self.path.with_name(f'.{self.path.name}.lock')):
+            orbs = self._read()
+            for name, values in self._changes.items():
+                if values is None:
+                    orbs.pop(name, None)
+                else:
+                    orbs.setdefault(name, {}).update(values)
+            tmp_path = self.path.with_name(
+                f'.{self.path.name}.{os.getpid()}.{threading.get_ident()}'
+            )
+            tmp_path.write_text(json.dumps(orbs, indent=2, sort_keys=True) + '\n')
+            os.replace(tmp_path, self.path)
+        self._orbs = orbs
+        self._changes = {}
@@ -0,0 +1,50 @@
+import fcntl
+import os
+from _thread import get_ident  # threading is not imported, as it is not needed for activation
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Iterator, Optional
+
+
+@contextmanager
+def file_lock(
+    path: Path, shared: bool = False, blocking: bool = True,
+    on_wait: Optional[Callable[[], None]] = None,
+) -> Iterator[bool]:
+    """
+    Hold an advisory lock on a file (which is created when missing) for the duration of the
+    context, yielding whether the lock was acquired.
+
+    Locks are released when the process holding them exits, so they are never left behind by
+    processes that are interrupted.
+
+    Args:
+        path: The path of the lock file.
+        shared: Whether to acquire a shared lock rather than an exclusive one.
+        blocking: Whether to wait for the lock when it is held by another process (otherwise the
+            lock is not acquired).
+        on_wait: The function to call before waiting for the lock.
+
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    operation = fcntl.LOCK_SH if shared else fcntl.LOCK_EX
+    with path.open('a') as lock:
+        try:
+            fcntl.flock(lock, operation | fcntl.LOCK_NB)
+        except BlockingIOError:
+            if not blocking:
+                yield False
+                return
+            if on_wait:
+                on_wait()
+            fcntl.flock(lock, operation)
+        yield True
+
+
+def write_file(path: Path, text: str) -> None:
+    """
+    Write a file by replacing it, so that other hardlinks to it are not affected.
+    """
+    tmp_path = path.with_name(f'.{path.name}.{os.getpid()}.{get_ident()}')
+    tmp_path.write_text(text)
+    os.replace(tmp_path, path)
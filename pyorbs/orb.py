@@ -1,45 +1,70 @@
+# Modules that are not needed for orb activation and listing are imported where they are used in
+# order to keep the startup time of the orb command low
+# pylint: disable=import-outside-toplevel, too-many-lines
 import argparse
 import os
-import shutil
-import subprocess
 import sys
-import tempfile
-from importlib import metadata
+import time
+from contextlib import contextmanager, nullcontext
 from pathlib import Path
-from typing import Any, Callable, Dict, List, Optional, Sequence, Set, TypeVar, Union, cast
+from typing import (
+    TYPE_CHECKING, Any, Callable, ContextManager, Dict, Iterator, List, Optional, Sequence, Set,
+    TextIO, Tuple, TypeVar, Union, cast,
+)
 
-from pyorbs.requirements import Requirements
-from pyorbs.shell import SHELL_TYPES, current_shell_type, execute, which
+from pyorbs.errors import CommandError, OrbNotFoundError, RequirementsError
+from pyorbs.formatting import format_size, format_time, parse_size, print_table
+from pyorbs.shell import SHELL_TYPES, current_shell, current_shell_type, execute, which
 from pyorbs.templates import render
 
+if TYPE_CHECKING:
+    import subprocess
+    import threading
+
+    from pyorbs.generations import Generations
+    from pyorbs.index import OrbIndex
+    from pyorbs.requirements import Requirements, RequirementsCache
+    from pyorbs.spec import OrbSpec
+    from pyorbs.store import Store
+    from pyorbs.timings import Timings
+    from pyorbs.usage import StorageUsage
+
 DEFAULT_REQUIREMENTS = ('requirements.txt', 'requirements/dev.txt')
+DEFAULT_SPEC = 'pyorbs.ini'
 ActionCallable = TypeVar('ActionCallable', bound=Callable[..., Any])
 
 
 class Action:  # pylint: disable=too-few-public-methods
     REGISTRY: Dict[str, 'Action'] = {}
 
-    def __init__(self, method: ActionCallable, short: Optional[str] = None):
+    def __init__(
+        self, method: ActionCallable, short: Optional[str] = None, name: Optional[str] = None,
+    ):
         if not method.__doc__:
             raise RuntimeError(f'Action method "{method}" must have a docstring')
         self.doc = method.__doc__.strip().splitlines()[0].rstrip('.')
         self.doc = self.doc[:1].lower() + self.doc[1:]
-        self.flags = ([f'-{short}'] if short else []) + [f'--{method.__name__}']
+        self.dest = method.__name__
+        self.flags = ([f'-{short}'] if short else []) + [f'--{name or method.__name__}']
 
 
-def action(short: Optional[str] = None) -> Callable[[ActionCallable], ActionCallable]:
+def action(
+    short: Optional[str] = None, name: Optional[str] = None,
+) -> Callable[[ActionCallable], ActionCallable]:
     def register_action(method: ActionCallable) -> ActionCallable:
-        Action.REGISTRY[method.__name__] = Action(method=method, short=short)
+        Action.REGISTRY[method.__name__] = Action(method=method, short=short, name=name)
         return method
     return register_action
 
 
-class Orb:
+class Orb:  # pylint: disable=too-many-public-methods
     def __init__(
         self,
         args: Optional[Sequence[str]] = None,
         default_requirements: Optional[Sequence[str]] = None,
         default_path: Optional[Path] = None,
+        output: Optional[TextIO] = None,
+        options: Optional[Dict[str, Any]] = None,
     ):
         """
         Manage Python virtual environments.
@@ -48,6 +73,9 @@ class Orb:
             args: The command-line arguments to use.
             default_requirements: The default requirements to use.
             default_path: The default orb storage path to use.
+            output: The stream to write messages to (default: the standard output).
+            options: The values of the options to use instead of parsing command-line arguments
+                (by destination, e.g. ``no_store``), while the other options keep their defaults.
 
         """
         xdg_data_home = Path(os.getenv('XDG_DATA_HOME', Path.home() / '.local/share'))
@@ -64,7 +92,7 @@ class Orb:
         parser = argparse.ArgumentParser(description=description)
         group = parser.add_argument_group(title='actions').add_mutually_exclusive_group()
         for value in Action.REGISTRY.values():
-            group.add_argument(*value.flags, action='store_true', help=value.doc)
+            group.add_argument(*value.flags, dest=value.dest, action='store_true', help=value.doc)
 
         parser.add_argument('name', nargs='?',
                             help='name of the orb (default: current orb or glowing orb)')
@@ -76,13 +104,106 @@ class Orb:
                             help='the Python executable to use (default: sys.executable)')
         parser.add_argument('--path', metavar='X', type=Path, default=default_path,
                             help='orb storage path (default: $XDG_DATA_HOME/pyorbs)')
+        parser.add_argument('-j', '--jobs', metavar='X', type=int, default=1,
+                            help='number of requirements files to freeze or orbs to build in '
+                            'parallel (default: 1)')
+        parser.add_argument('--spec', metavar='X', type=Path, default=Path(DEFAULT_SPEC),
+                            help=f'spec file of the orbs to build (default: {DEFAULT_SPEC})')
+        parser.add_argument('--matrix', metavar='X', type=lambda value: value.split(','),
+                            help='comma-separated Python executables to make an orb for each in '
+                            'parallel (named <name>-pyXY, using interpreter-specific lockfiles)')
+        parser.add_argument('--interpreter-lockfile', action='store_true',
+                            help='use a lockfile specific to the version of the Python executable '
+                            '(e.g. requirements.txt.py311.lock)')
+        parser.add_argument('--optimize', metavar='X', type=int, choices=(0, 1, 2),
+                            default=self._default_optimize(),
+                            help='optimization level of the bytecode compiled for the packages of '
+                            'orbs (default: $PYORBS_OPTIMIZE or 0)')
+        parser.add_argument('--compile-jobs', metavar='X', type=int, default=0,
+                            help='number of processes compiling bytecode in parallel (default: '
+                            'number of CPUs)')
+        parser.add_argument('--resolve', action='store_true',
+                            help='freeze requirements by resolving them without installing them')
+        parser.add_argument('--hashes', action='store_true',
+                            help='record the hashes of the packages in lockfiles')
         parser.add_argument('--no-cd', action='store_true', help='do not change directory')
         parser.add_argument('--no-cache', action='store_true', help='do not use cache')
+        parser.add_argument('--no-store', action='store_true',
+                            help='do not use the orb store')
+        parser.add_argument('--wheelhouse', action='store_true',
+                            help='add the packages of the lockfile to the local wheelhouse')
+        parser.add_argument('--offline', action='store_true',
+                            help='install packages from the local wheelhouse only')
         parser.add_argument('--shell', action='store_true', help='activate the orb in a shell')
         parser.add_argument('--bare', action='store_true', help='use the bare requirements file')
+        parser.add_argument('--long', action='store_true', help='list orbs with their details')
+        parser.add_argument('--max-size', metavar='X', type=parse_size,
+                            default=os.environ.get('PYORBS_GC_MAX_SIZE'),
+                            help='total size of orbs to keep when collecting garbage '
+                            '(e.g. 10GB, default: $PYORBS_GC_MAX_SIZE)')
+        parser.add_argument('--max-age', metavar='X', type=float,
+                            default=os.environ.get('PYORBS_GC_MAX_AGE'),
+                            help='days since the last use of orbs to keep when collecting '
+                            'garbage (default: $PYORBS_GC_MAX_AGE)')
+        parser.add_argument('--all', action='store_true',
+                            help='show the outdated packages of all orbs')
+        parser.add_argument('--index-url', metavar='X',
+                            help='package index URL or local simple index folder to check for '
+                            'outdated packages (default: the index URLs of the lockfile or the '
+                            'pip configuration)')
+        parser.add_argument('--index-ttl', metavar='X', type=float,
+                            default=os.environ.get('PYORBS_INDEX_TTL', 60),
+                            help='minutes for which the cached package index versions are used '
+                            '(default: $PYORBS_INDEX_TTL or 60)')
+        parser.add_argument('--generations', metavar='X', type=int,
+                            default=os.environ.get('PYORBS_GENERATIONS', 2),
+                            help='number of previous generations of orbs to keep for rolling '
+                            'back (default: $PYORBS_GENERATIONS or 2)')
+        parser.add_argument('--archive', metavar='X', type=Path,
+                            help='orb archive path to export to or import from (default for '
+                            'exporting: <name>.tar.gz)')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='only show the orbs that would be destroyed')
+        parser.add_argument('--timings', action='store_true',
+                            help='show the time spent in each phase of the action')
+        parser.add_argument('--trace', metavar='X', type=Path,
+                            help='write the phases of the action to a Chrome trace file')
 
-        self._args = parser.parse_args(args or [])
+        self._args = self._parse(parser, args=args, options=options)
+        self._output = output
         self._default_requirements = [Path(requirement) for requirement in default_requirements]
+        self._timings: Optional['Timings'] = None
+        # The time spent freezing each requirements file (by path) by the last freeze
+        self.freeze_durations: Dict[Path, float] = {}
+        if self._args.timings or self._args.trace:
+            from pyorbs.timings import Timings
+            self._timings = Timings()
+
+    @staticmethod
+    def _parse(
+        parser: argparse.ArgumentParser, args: Optional[Sequence[str]],
+        options: Optional[Dict[str, Any]],
+    ) -> argparse.Namespace:
+        if options is None:
+            return parser.parse_args(args or [])
+        namespace = parser.parse_args([])  # the defaults of the options
+        for dest, value in options.items():
+            if not hasattr(namespace, dest):
+                raise ValueError(f'Unknown option "{dest}"')
+            setattr(namespace, dest, value)
+        return namespace
+
+    @staticmethod
+    def _default_optimize() -> int:
+        # Defaults are not checked against the choices of options, so they are checked here
+        if (optimize := os.environ.get('PYORBS_OPTIMIZE', '0')) not in ('0', '1', '2'):
+            raise ValueError(
+                f'Invalid optimization level "{optimize}" in $PYORBS_OPTIMIZE (must be 0, 1 or 2)'
+            )
+        return int(optimize)
+
+    def _print(self, *values: object, flush: bool = False) -> None:
+        print(*values, file=self._output or sys.stdout, flush=flush)
 
     def _path(self) -> Path:
         return cast(Path, self._args.path).expanduser()
@@ -95,8 +216,8 @@ class Orb:
         )
         if not name:
             raise ValueError('The orb name must be specified')
-        if check and name not in self._orbs():
-            raise ValueError(f'Unknown orb name "{name}"')
+        if check and (name.startswith('.') or not (self._path() / name).is_dir()):
+            raise OrbNotFoundError(f'Unknown orb name "{name}"')
         return name
 
     @staticmethod
@@ -106,9 +227,34 @@ class Orb:
     def _orbs(self) -> Set[str]:
         orb_path = self._path()
         if orb_path.exists():
-            return set(path.stem for path in orb_path.iterdir() if path.is_dir())
+            with os.scandir(orb_path) as entries:  # avoids a stat call for each entry
+                return set(
+                    Path(entry.name).stem for entry in entries
+                    if entry.is_dir() and not entry.name.startswith('.')
+                )
         return set()
 
+    def index(self) -> 'OrbIndex':
+        """
+        Return the index of the orbs in the orb storage folder (as last saved).
+        """
+        from pyorbs.index import OrbIndex
+
+        return OrbIndex(self._path() / '.index.json')
+
+    def _requirements_cache(self) -> Optional['RequirementsCache']:
+        from pyorbs.requirements import RequirementsCache
+
+        if self._args.no_cache:
+            return None
+        xdg_cache_home = Path(os.getenv('XDG_CACHE_HOME', Path.home() / '.cache'))
+        return RequirementsCache(xdg_cache_home / 'pyorbs/requirements.json')
+
+    def _store(self) -> 'Store':
+        from pyorbs.store import Store
+
+        return Store(self._path() / '.store')
+
     def _glowing_file(self) -> Path:
         return self._path() / 'glowing'
 
@@ -122,28 +268,82 @@ class Orb:
                 return value
         return next(iter(Action.REGISTRY))
 
-    def _requirements(self, path: Optional[Path] = None) -> List[Requirements]:
+    def requirements(
+        self, path: Optional[Path] = None, python_tag: Optional[str] = None,
+    ) -> List['Requirements']:
+        """
+        Return the requirements files to use (or all requirements files in a folder).
+
+        Args:
+            path: The requirements file or folder (default: the requirements option).
+            python_tag: The version tag of the interpreter to use specific lockfiles for.
+
+        """
+        from pyorbs.requirements import Requirements
+
         path = path or self._args.requirements
-        if path and path.is_dir():  # pylint: disable=consider-ternary-expression
-            requirements = [
-                Requirements(path=item, allow_outdated=True) for item in sorted(path.iterdir())
-                if item.is_file() and item.suffix != '.lock'
-                and not item.name.startswith('.')
-            ]
-        else:
-            requirements = [Requirements(path=path, allow_outdated=True)]
+        python_tag = python_tag or self._python_tag(which(self._args.executable))
+        with self._phase('process requirements'):
+            cache = self._requirements_cache()
+            if path and path.is_dir():  # pylint: disable=consider-ternary-expression
+                requirements = [
+                    Requirements(
+                        path=item, allow_outdated=True, cache=cache, python_tag=python_tag,
+                    )
+                    for item in sorted(path.iterdir())
+                    if item.is_file() and item.suffix != '.lock'
+                    and not item.name.startswith('.')
+                ]
+            else:
+                requirements = [Requirements(
+                    path=path, allow_outdated=True, cache=cache, python_tag=python_tag,
+                )]
+            if cache:
+                cache.save()
         if not requirements:
-            raise ValueError(f'There are no requirements files in path "{path}"')
+            raise RequirementsError(f'There are no requirements files in path "{path}"')
         return requirements
 
+    def _python_tag(self, executable: str) -> Optional[str]:
+        from pyorbs.store import python_tag
+
+        return python_tag(executable) if self._args.interpreter_lockfile else None
+
+    def _phase(self, name: str, **args: str) -> ContextManager[None]:
+        return self._timings.phase(name, **args) if self._timings else nullcontext()
+
+    def _report_timings(self) -> None:
+        if not self._timings:
+            return
+        if self._args.timings:
+            self._print('\n' + self._timings.summary())
+        if self._args.trace:
+            self._timings.write_trace(self._args.trace)
+            self._print(f'Trace is written to "{self._args.trace}"')
+
     def act(self) -> int:
-        result = getattr(self, self._action())() or 0
-        if isinstance(result, subprocess.CompletedProcess):
-            return result.returncode
+        action_name = self._action()
+        try:
+            with self._phase(action_name):
+                result = getattr(self, action_name)() or 0
+        finally:
+            self._report_timings()
+        if hasattr(result, 'returncode'):  # completed process
+            return cast(int, result.returncode)
         if isinstance(result, bool):
             return int(result)
         return result
 
+    def _execute(
+        self, command: str, error: str, capture: bool = False,
+    ) -> 'subprocess.CompletedProcess[str]':
+        with self._phase('execute', command=command):
+            process = execute(command=command, capture=capture)
+        if process.returncode:
+            output = f'{process.stdout}{process.stderr}'.rstrip() if capture else None
+            raise CommandError(error + (f'\n{output}' if output else ''), output=output)
+        return process
+
     @action(short='a')
     def activate(  # pylint: disable=too-many-arguments
         self,
@@ -171,95 +371,713 @@ class Orb:
         if not init.exists():
             raise RuntimeError(f'Orb activation file "{init}" not found')
         if not capture:
-            print(f'Activating orb "{name}"...')
+            self._print(f'Activating orb "{name}"...')
         if not command:
             self.glow(name=name)
+        elif not capture:
+            self._record_activation(name=name)
         if command and not capture:
-            print(f'Running "{command}"...')
+            self._print(f'Running "{command}"...')
 
         os.environ['PYORBS_NEW_SHELL'] = str(int(self._args.shell and not command))
         os.environ['PYORBS_NO_CD'] = str(int(no_cd if no_cd is not None else self._args.no_cd))
 
-        return execute(init=init, command=command, replace=not capture, capture=capture)
+        # The current process is not replaced when timing, so that the timings can be reported
+        replace = not capture and not self._timings
+        with self._phase('execute', command=command or f'{current_shell()} (interactive)'):
+            return execute(init=init, command=command, replace=replace, capture=capture)
 
     @action(short='l')
     def list(self) -> None:
         """
         List orbs.
         """
+        if self._args.long:
+            self._list_long()
+            return
         orbs = self._orbs()
         if glowing := self._glowing_orb():
             orbs = set(f'{orb} *' if orb == glowing else orb for orb in orbs)
-        print('\n'.join(sorted(orbs)) or 'There are no orbs')
+        self._print('\n'.join(sorted(orbs)) or 'There are no orbs')
+
+    def updated_index(self) -> 'OrbIndex':
+        """
+        Return the index of the orbs, updated with the orbs added or removed outside of pyorbs and
+        with the recorded activations.
+        """
+        index = self.index()
+        # Orbs that are not indexed yet (e.g. made by earlier versions) are added to the index and
+        # orbs that no longer exist are removed from it
+        orbs = self._orbs()
+        missing = [name for name in sorted(orbs) if 'created' not in index.orbs.get(name, {})]
+        removed = [name for name in index.orbs if name not in orbs]
+        for name in missing:
+            index.index(
+                name=name, orb=self._path() / name, requirements=None, lockfile=None, update=True,
+            )
+        for name in removed:
+            index.remove(name)
+        activated = index.collect_activations(self._activations())
+        if missing or removed or activated:
+            index.save()
+        return index
+
+    def _list_long(self) -> None:
+        index = self.updated_index()
+        if not index.orbs:
+            self._print('There are no orbs')
+            return
+        glowing = self._glowing_orb()
+        rows = [('Name', 'Python', 'Size', 'Created', 'Activated', 'Requirements')]
+        rows += [(
+            f'{name} *' if name == glowing else name,
+            entry.get('python') or '-',
+            format_size(entry['size']) if entry.get('size') is not None else '-',
+            format_time(entry.get('created')),
+            format_time(entry.get('activated')),
+            entry.get('requirements') or '-',
+        ) for name, entry in sorted(index.orbs.items())]
+        print_table(rows, file=self._output)
+
+    def _activations(self) -> Path:
+        return self._path() / '.activations'
+
+    def _record_activation(self, name: str) -> None:
+        # The index is only updated when listing orbs or collecting garbage (see
+        # OrbIndex.collect_activations), so that activating orbs stays fast
+        activations = self._activations()
+        activations.mkdir(exist_ok=True)
+        (activations / name).touch()
+
+    def _forget_activations(self, name: str) -> None:
+        (self._activations() / name).unlink(missing_ok=True)
 
     @action(short='m')
-    def make(  # pylint: disable=too-many-arguments, too-many-locals
+    def make(  # pylint: disable=too-many-arguments
         self,
         name: Optional[str] = None,
         path: Optional[Path] = None,
         requirements_path: Optional[Path] = None,
         update: bool = False,
         quiet: bool = False,
+        capture: bool = False,
+        cache_dir: Optional[Path] = None,
+        executable: Optional[str] = None,
+        python_tag: Optional[str] = None,
     ) -> None:
         """
         Make an orb.
+
+        Args:
+            name: The name of the orb to make.
+            path: The orb storage path to use.
+            requirements_path: The requirements file to use.
+            update: Whether to update an existing orb.
+            quiet: Whether to suppress progress messages.
+            capture: Whether to capture the output of the installation commands.
+            cache_dir: The pip cache folder to use.
+            executable: The Python executable to use.
+            python_tag: The version tag of the interpreter-specific lockfile to use.
+
         """
+        from pyorbs.generations import Generations
+
+        if self._args.matrix and not name:
+            self._make_matrix(update=update)
+            return
         name = name or self._name(use_current=update, use_glowing=update, check=update)
         path = path or self._path()
-        requirements = Requirements(
-            path=requirements_path or self._args.requirements,
-            default_paths=self._default_requirements,
-            bare=self._args.bare,
-            required=update,
-            allow_outdated=update,
+        executable = which(executable or self._args.executable)
+        python_tag = python_tag or self._python_tag(executable)
+        requirements = self._orb_requirements(
+            path=requirements_path, update=update, python_tag=python_tag,
         )
 
-        executable = which(self._args.executable)
         if not quiet:
-            print(
+            self._print(
                 f'{"Updating" if update else "Making"} orb "{name}" using "{requirements}"...'
                 if requirements else f'Making empty orb "{name}"'
             )
-            print(f'Python executable: {executable}')
+            self._print(f'Python executable: {executable}')
+
+        # Creating virtual environment (in a new generation of the orb)
+        path.mkdir(parents=True, exist_ok=True)
+        generations = Generations(path=path, name=name, keep=self._args.generations)
+        current = generations.current
+        with generations.lock(on_wait=self._waiting(f'orb "{name}" to be released', quiet)):
+            if self._made_meanwhile(
+                generations=generations, before=current, executable=executable,
+                requirements_path=requirements_path, update=update, python_tag=python_tag,
+            ):
+                if not quiet:
+                    self._print(f'Orb "{name}" was made by another process in the meantime')
+                return
+            self._make_generation(
+                generations=generations, requirements=requirements, executable=executable,
+                update=update, quiet=quiet, capture=capture, cache_dir=cache_dir,
+            )
+            if not self._args.no_store:
+                self._store().prune_bases(executable)
+            if path == self._path():
+                self._index_orb(name=name, requirements=requirements, update=update)
+
+        if not quiet:
+            self._print(f'Orb "{name}" is ready for use')
+
+    def _make_matrix(self, update: bool) -> None:
+        """
+        Make an orb for each executable of the matrix in parallel.
 
-        # Creating virtual environment
-        if not path.exists():
-            path.mkdir(parents=True, exist_ok=True)
-        if execute(command=f'{executable} -m venv --clear "{path / name}"').returncode:
-            raise RuntimeError('Unable to create virtual environment')
+        The orbs are named after the version tag of their interpreter (e.g. test-py311), use
+        interpreter-specific lockfiles (as the pinned versions may differ per interpreter) and
+        share the pip cache and the store.
+        """
+        import tempfile
 
-        # Creating activation scripts
-        bin_dir = path / f'{name}/bin'
+        from pyorbs.spec import OrbSpec
+        from pyorbs.store import python_tag
+
+        name = self._name(use_current=False, use_glowing=False, check=False)
+        specs: List[OrbSpec] = []
+        for executable in self._args.matrix:
+            executable = which(executable)
+            spec = OrbSpec(
+                name=f'{name}-{python_tag(executable)}', requirements=self._args.requirements,
+                executable=executable, options=['--interpreter-lockfile'],
+            )
+            if spec.name in [other.name for other in specs]:
+                raise ValueError(f'Orb "{spec.name}" is in the matrix more than once')
+            specs.append(spec)
+        if update and (missing := [
+            spec.name for spec in specs if not (self._path() / spec.name).exists()
+        ]):
+            raise ValueError(f'Invalid orb names {", ".join(missing)}')
+
+        # Orbs are made with a shared pip cache even when caching is disabled
+        with tempfile.TemporaryDirectory(prefix='pyorbs-') as tmp_path:
+            self._build_orbs(
+                specs, show_executables=True, jobs=len(specs),
+                cache_dir=Path(tmp_path) / 'cache' if self._args.no_cache else None,
+            )
+
+    def _make_generation(  # pylint: disable=too-many-arguments, too-many-locals
+        self,
+        generations: 'Generations',
+        requirements: 'Requirements',
+        executable: str,
+        update: bool,
+        quiet: bool,
+        capture: bool,
+        cache_dir: Optional[Path],
+    ) -> None:
+        """
+        Make a new generation of an orb and switch to it once it is complete.
+        """
+        import json
+
+        from pyorbs.locking import write_file
+        from pyorbs.store import interpreter_id
+
+        name, current = generations.link.name, generations.current
+        in_storage = generations.link.parent == self._path()  # i.e. not a temporary orb
+        use_store = in_storage and not self._args.no_store
+        with self._lock_store(
+            requirements=requirements, executable=executable, use_store=use_store, quiet=quiet,
+        ), generations.build() as orb:
+            store_key, stored = self._materialize(
+                orb=orb, requirements=requirements, executable=executable,
+                use_store=use_store, quiet=quiet,
+            )
+            sync = (
+                not stored and update and requirements.locked and current is not None
+                and self._metadata(current).get('interpreter') == interpreter_id(executable)
+            )
+            options = self._pip_options(cache_dir=cache_dir)
+            install = bool(requirements) and not stored and not sync
+            with self._prefetch(
+                requirements=requirements if install else None, executable=executable,
+                options=options, quiet=quiet,
+            ) as prefetched_options:
+                if sync and current:
+                    with self._phase('copy orb'):
+                        generations.copy(source=current, target=orb)
+                elif not stored:
+                    self._create(orb=orb, executable=executable, options=options, capture=capture)
+
+                # Creating activation scripts
+                with self._phase('render activation scripts'):
+                    self._render_activation_scripts(orb=orb, name=name)
+
+                # Installing requirements
+                activate = f'source "{orb / f"bin/activate_orb.{current_shell_type()}"}"'
+                if sync and requirements.lockfile:
+                    with self._phase('synchronize orb'):
+                        changed = self._sync(
+                            orb=orb, lockfile=requirements.lockfile, activate=activate,
+                            options=options, quiet=quiet, capture=capture,
+                        )
+                    # All packages are compiled when the optimization level is changed
+                    recompile = self._metadata(orb).get('optimize', 0) != self._args.optimize
+                    if in_storage and (changed or recompile):
+                        self._compile(
+                            orb=orb, packages=None if recompile else changed, quiet=quiet,
+                            capture=capture,
+                        )
+                elif install:
+                    self._install(
+                        requirements=requirements, activate=activate, options=options,
+                        install_options=prefetched_options(), capture=capture,
+                    )
+                    if in_storage:
+                        self._compile(orb=orb, packages=None, quiet=quiet, capture=capture)
+                    if requirements.changed:
+                        store_key = self._generate_lockfile(
+                            requirements=requirements, activate=activate, options=options,
+                            executable=executable if use_store else None,
+                        )
+
+            # Populating wheelhouse
+            if self._args.wheelhouse and not self._args.bare:
+                self._populate_wheelhouse(
+                    lockfile=requirements.lockfile, activate=activate, options=options,
+                    capture=capture,
+                )
+
+            write_file(orb / 'pyorbs.json', json.dumps({
+                'interpreter': interpreter_id(executable),
+                'executable': executable,
+                'python_tag': requirements.python_tag,
+                'optimize': self._args.optimize,
+                'build': self._build_key(requirements=requirements, executable=executable),
+            }))
+            if use_store and not stored:  # orbs from the store are hardlinked to it already
+                with self._phase('store orb'):
+                    self._store_orb(orb=orb, key=store_key, quiet=quiet)
+
+    def _build_key(self, requirements: 'Requirements', executable: str) -> Optional[str]:
+        """
+        Return the key identifying the orbs made from the same lockfile and interpreter.
+        """
+        from pyorbs.store import Store
+
+        if self._args.bare or not requirements.lockfile or not requirements.lockfile.exists():
+            return None
+        return Store.key(
+            lockfile=requirements.lockfile, executable=executable,
+            optimize=self._args.optimize,
+        )
+
+    def _made_meanwhile(  # pylint: disable=too-many-arguments
+        self, generations: 'Generations', before: Optional[Path], executable: str,
+        requirements_path: Optional[Path], update: bool, python_tag: Optional[str],
+    ) -> bool:
+        """
+        Return whether an identical orb was made by another process while waiting for the orb
+        lock (in which case it is used rather than making the orb again).
+        """
+        if (current := generations.current) == before or not current:
+            return False
+        # The lockfile might have been generated by the other process
+        requirements = self._orb_requirements(
+            path=requirements_path, update=update, python_tag=python_tag,
+        )
+        build_key = self._build_key(requirements=requirements, executable=executable)
+        return requirements.locked and build_key is not None and (
+            self._metadata(current).get('build') == build_key
+        )
+
+    @contextmanager
+    def _lock_store(
+        self, requirements: 'Requirements', executable: str, use_store: bool, quiet: bool,
+    ) -> Iterator[None]:
+        """
+        Lock the store while making an orb, and lock the store entry of the orb so that other
+        processes making an identical orb wait for it and use it from the store.
+        """
+        from pyorbs.store import Store
+
+        if self._args.no_store:
+            yield
+            return
+        store = self._store()
+        with store.lock(shared=True):
+            if not use_store or not requirements.locked or not requirements.lockfile:
+                yield
+                return
+            entry = store.entry(Store.key(
+                lockfile=requirements.lockfile, executable=executable,
+                optimize=self._args.optimize,
+            ))
+            with store.entry_lock(entry, on_wait=self._waiting('an identical orb', quiet)):
+                yield
+
+    def _waiting(self, message: str, quiet: bool) -> Optional[Callable[[], None]]:
+        return None if quiet else lambda: self._print(f'Waiting for {message}...', flush=True)
+
+    def _materialize(  # pylint: disable=too-many-arguments
+        self, orb: Path, requirements: 'Requirements', executable: str, use_store: bool,
+        quiet: bool,
+    ) -> Tuple[Optional[str], bool]:
+        """
+        Create an orb from the store when possible, returning its store key and whether it was
+        found in the store.
+        """
+        from pyorbs.store import Store
+
+        if not requirements.locked or not requirements.lockfile or not use_store:
+            return None, False
+        store_key = Store.key(
+            lockfile=requirements.lockfile, executable=executable,
+            optimize=self._args.optimize,
+        )
+        with self._phase('look up store'):
+            stored = self._store().materialize(key=store_key, target=orb)
+        if stored and not quiet:
+            self._print('Using orb from the store')
+        return store_key, stored
+
+    @contextmanager
+    def _prefetch(
+        self, requirements: Optional['Requirements'], executable: str, options: str, quiet: bool,
+    ) -> Iterator[Callable[[], str]]:
+        """
+        Download the packages to install while the virtual environment is being created.
+
+        Yields a function that waits for the downloads and returns the pip options to use for
+        installing the packages (which include the downloaded packages when successful, and
+        which do not use the package index when all locked packages were downloaded as wheels).
+        """
+        if not requirements or self._args.offline:  # there is nothing to download
+            yield lambda: options
+            return
+
+        import tempfile
+        import threading
+
+        with tempfile.TemporaryDirectory(prefix='pyorbs-') as tmp_path:
+            result: Dict[str, Any] = {}
+
+            def download() -> None:
+                start = time.perf_counter()
+                no_deps = ' --no-deps' if requirements.locked else ''
+                command = (
+                    f'{executable} -m pip download {options} --quiet{no_deps} '
+                    f'--dest "{tmp_path}" --requirement "{requirements}"'
+                )
+                with self._phase('prefetch packages', command=command):
+                    result['success'] = not execute(command=command, capture=True).returncode
+                result['elapsed'] = time.perf_counter() - start
+
+            def wait() -> str:
+                start = time.perf_counter()
+                thread.join()
+                waited = time.perf_counter() - start
+                if not result.get('success'):  # e.g. pip is not available for the executable
+                    return options
+                if not quiet:
+                    self._print(
+                        f'Prefetched packages in {result["elapsed"]:.1f}s '
+                        f'({max(0, result["elapsed"] - waited):.1f}s saved by downloading '
+                        'while creating the virtual environment)'
+                    )
+                # Locked packages are installed without dependencies, so all of them have been
+                # downloaded and the index does not need to be queried again, unless source
+                # distributions need to be built (which requires their build dependencies)
+                wheels = all(file.suffix == '.whl' for file in Path(tmp_path).iterdir())
+                no_index = '--no-index ' if requirements.locked and wheels else ''
+                return f'{options} {no_index}--find-links "{tmp_path}"'.strip()
+
+            thread = threading.Thread(target=download, daemon=True)
+            thread.start()
+            try:
+                yield wait
+            finally:
+                thread.join()
+
+    def _index_orb(self, name: str, requirements: 'Requirements', update: bool) -> None:
+        if not update:
+            self._forget_activations(name)
+        with self._phase('index orb'):
+            index = self.index()
+            index.index(
+                name=name, orb=self._path() / name, requirements=requirements.path,
+                lockfile=None if self._args.bare else requirements.lockfile, update=update,
+            )
+            index.save()
+
+    def _orb_requirements(
+        self, path: Optional[Path], update: bool, python_tag: Optional[str] = None,
+    ) -> 'Requirements':
+        from pyorbs.requirements import Requirements
+
+        with self._phase('process requirements'):
+            cache = self._requirements_cache()
+            requirements = Requirements(
+                path=path or self._args.requirements,
+                default_paths=self._default_requirements,
+                bare=self._args.bare,
+                required=update,
+                allow_outdated=update,
+                cache=cache,
+                python_tag=python_tag,
+            )
+            if cache:
+                cache.save()
+        return requirements
+
+    def _generate_lockfile(
+        self, requirements: 'Requirements', activate: str, options: str,
+        executable: Optional[str],
+    ) -> Optional[str]:
+        """
+        Generate the lockfile of an orb, returning its store key when an executable is given.
+        """
+        from pyorbs.store import Store
+
+        # See https://bugs.launchpad.net/ubuntu/+source/python-pip/+bug/1635463
+        freeze = 'pip freeze --all --exclude-editable | grep -v "pkg[-_]resources"'
+        with self._phase('generate lockfile'):
+            frozen = self._execute(
+                command=f'{activate} && {freeze}', error='Unable to freeze requirements',
+                capture=True,
+            ).stdout
+            if self._args.hashes:
+                frozen = self._hash_requirements(
+                    requirements=requirements, frozen=frozen, activate=activate, options=options,
+                )
+            requirements.update_lockfile(requirements=frozen)
+        self._print(f'Frozen requirements are written to "{requirements.lockfile}"')
+        if not requirements.lockfile or not executable:
+            return None
+        return Store.key(
+            lockfile=requirements.lockfile, executable=executable,
+            optimize=self._args.optimize,
+        )
+
+    def _hash_requirements(
+        self, requirements: 'Requirements', frozen: str, activate: str, options: str,
+    ) -> str:
+        import json
+        import tempfile
+
+        from pyorbs.packages import hashed_requirements, reported_hashes
+
+        with tempfile.TemporaryDirectory(prefix='pyorbs-') as tmp_path:
+            pins, report = Path(tmp_path) / 'pins.txt', Path(tmp_path) / 'report.json'
+            pins.write_text('\n'.join(requirements.options + [frozen]))
+            self._execute(
+                command=(
+                    f'{activate} && pip install {options} --dry-run --ignore-installed --no-deps '
+                    f'--quiet --report "{report}" --requirement "{pins}"'
+                ),
+                error='Unable to determine the hashes of packages', capture=True,
+            )
+            hashes = reported_hashes(json.loads(report.read_text()))
+        return '\n'.join(hashed_requirements(frozen.splitlines(), hashes=hashes)) + '\n'
+
+    def _create(self, orb: Path, executable: str, options: str, capture: bool) -> None:
+        from pyorbs.store import Store
+
+        if self._args.no_store:
+            with self._phase('create virtual environment'):
+                self._execute(
+                    command=f'{executable} -m venv --clear "{orb}"',
+                    error='Unable to create virtual environment', capture=capture,
+                )
+            return
+        base = self._base(executable, options=options, capture=capture)
+        with self._phase('restore base environment'):
+            Store.restore(base, target=orb)
+
+    def _install(
+        self, requirements: 'Requirements', activate: str, options: str, install_options: str,
+        capture: bool,
+    ) -> None:
+        error = 'Unable to install requirements'
+        # Base environments are seeded with upgraded packaging tools, but they are upgraded again
+        # unless they are pinned by a lockfile (as the base might have been seeded a while ago)
+        if self._args.no_store or not requirements.locked:
+            with self._phase('upgrade pip'):
+                self._execute(
+                    command=f'{activate} && pip install {options} --no-compile --upgrade pip '
+                    'setuptools wheel',
+                    error=error, capture=capture,
+                )
+        # Lockfiles pin all dependencies, so they are installed without dependency resolution
+        no_deps = ' --no-deps' if requirements.locked else ''
+        with self._phase('install requirements'):
+            self._execute(
+                command=f'{activate} && pip install {install_options} --no-compile '
+                f'--upgrade{no_deps} --requirement "{requirements}"', error=error, capture=capture,
+            )
+        if requirements.locked and requirements.lockfile:
+            self._check_lockfile(lockfile=requirements.lockfile, activate=activate)
+
+    def _populate_wheelhouse(
+        self, lockfile: Optional[Path], activate: str, options: str, capture: bool,
+    ) -> None:
+        if not lockfile or not lockfile.exists():
+            return
+        wheels = self._store().wheels
+        with self._phase('populate wheelhouse'):
+            self._execute(
+                command=(
+                    f'{activate} && pip wheel {options} --find-links "{wheels}" --no-deps '
+                    f'--wheel-dir "{wheels}" --requirement "{lockfile}"'
+                ),
+                error='Unable to populate the wheelhouse', capture=capture,
+            )
+
+    def _store_orb(self, orb: Path, key: Optional[str], quiet: bool) -> None:
+        store = self._store()
+        reclaimed = store.deduplicate(orb)
+        if key and store.add(key=key, source=orb):
+            # Only the relocated files of the stored orb are not linked to objects yet
+            reclaimed += store.deduplicate(store.entry(key))
+        if reclaimed and not quiet:
+            self._print(f'Deduplicated orb files ({format_size(reclaimed)} reclaimed)')
+
+    @staticmethod
+    def _render_activation_scripts(orb: Path, name: str) -> None:
+        from pyorbs.locking import write_file
+
+        bin_dir = orb / 'bin'
+        bin_dir.mkdir(parents=True, exist_ok=True)
         for shell_type in SHELL_TYPES:
             shell_suffix = f'.{shell_type}' if shell_type != 'bash' else ''
             activate_orb = f'activate_orb.{shell_type}'
-            (bin_dir / activate_orb).write_text(render(activate_orb, context={
+            write_file(bin_dir / activate_orb, render(activate_orb, context={
                 'name': name, 'cwd': os.getcwd(),
                 'init_file': str(bin_dir / activate_orb),
                 'activate_script': str((bin_dir / 'activate').with_suffix(shell_suffix)),
             }))
 
-        # Installing requirements
-        if requirements:
-            cache = '--no-cache-dir' if self._args.no_cache else ''
-            activate_orb = f'activate_orb.{current_shell_type()}'
-            command = ' '.join([
-                f'source "{bin_dir / activate_orb}"',
-                f'&& pip install {cache} --upgrade pip setuptools wheel',
-                f'&& pip install {cache} --upgrade --requirement "{requirements}"',
-            ])
-            if execute(command=command).returncode:
-                raise RuntimeError('Unable to install requirements')
-
-            # Generating lockfile
-            if requirements.changed:
-                # See https://bugs.launchpad.net/ubuntu/+source/python-pip/+bug/1635463
-                freeze = 'pip freeze --all --exclude-editable | grep -v "pkg[-_]resources"'
-                process = self.activate(name=name, path=path, command=freeze, capture=True)
-                requirements.update_lockfile(requirements=process.stdout)
+    def _pip_options(self, cache_dir: Optional[Path] = None) -> str:
+        options = []
+        if cache_dir:
+            options.append(f'--cache-dir "{cache_dir}"')
+        elif self._args.no_cache:
+            options.append('--no-cache-dir')
+        if self._args.offline:
+            options.append(f'--no-index --find-links "{self._store().wheels}"')
+        return ' '.join(options)
+
+    def _base(self, executable: str, options: str, capture: bool) -> Path:
+        import shutil
 
+        store = self._store()
+        if (base := store.base(executable)).exists():
+            return base
+        # Processes that need the same base environment wait for the one creating it
+        with store.entry_lock(base):
+            if base.exists():
+                return base
+            staging = store.staging(base)
+            try:
+                with self._phase('create base environment'):
+                    self._execute(
+                        command=f'{executable} -m venv --clear "{staging}"',
+                        error='Unable to create virtual environment', capture=capture,
+                    )
+                    with self._phase('upgrade pip'):
+                        self._execute(
+                            command=f'"{staging}/bin/python" -m pip install {options} '
+                            '--upgrade pip setuptools wheel',
+                            error='Unable to create virtual environment', capture=capture,
+                        )
+            except RuntimeError:
+                shutil.rmtree(staging, ignore_errors=True)
+                raise
+            store.commit(staging, base)
+        return base
+
+    def _sync(  # pylint: disable=too-many-arguments, too-many-locals
+        self, orb: Path, lockfile: Path, activate: str, options: str, quiet: bool, capture: bool,
+    ) -> List[str]:
+        """
+        Synchronize an orb with a lockfile, returning the names of the installed packages.
+        """
+        import tempfile
+
+        from pyorbs.packages import lockfile_changes, requirement_name
+
+        changed, removed = lockfile_changes(orb, lockfile)
         if not quiet:
-            print(f'Orb "{name}" is ready for use')
+            self._print(f'Synchronizing orb ({len(changed)} to install, {len(removed)} to remove)')
+        if not changed and not removed:
+            return []
+
+        with tempfile.TemporaryDirectory(prefix='pyorbs-') as tmp_path:
+            # The lockfile pins all dependencies, so only the changed packages are installed
+            lockfile_options = [
+                line for line in lockfile.read_text().splitlines() if line.startswith('-')
+            ]
+            changes = Path(tmp_path) / 'changes.txt'
+            changes.write_text('\n'.join(lockfile_options + changed) + '\n')
+            command = ' '.join([activate] + (
+                [f'&& pip uninstall --yes {" ".join(removed)}'] if removed else []
+            ) + (
+                [
+                    f'&& pip install {options} --no-compile --upgrade --no-deps '
+                    f'--requirement "{changes}"'
+                ] if changed else []
+            ))
+            self._execute(command=command, error='Unable to synchronize orb', capture=capture)
+        self._check_lockfile(lockfile=lockfile, activate=activate)
+        return [requirement_name(requirement) for requirement in changed]
+
+    def _compile(
+        self, orb: Path, packages: Optional[List[str]], quiet: bool, capture: bool,
+    ) -> None:
+        """
+        Compile the bytecode of the installed packages of an orb (or only the given packages).
+
+        Packages are installed without compiling them, so that the files of all packages can be
+        compiled in parallel instead.
+        """
+        import shlex
+        import tempfile
+
+        from pyorbs.packages import COMPILE_SCRIPT, distribution_files
+
+        if not (files := distribution_files(orb, names=packages)):
+            return
+        start = time.perf_counter()
+        with tempfile.TemporaryDirectory(prefix='pyorbs-') as tmp_path, \
+                self._phase('compile bytecode'):
+            (file_list := Path(tmp_path) / 'files.txt').write_text(
+                ''.join(f'{file}\n' for file in files)
+            )
+            self._execute(
+                command=(
+                    f'"{orb}/bin/python" -c {shlex.quote(COMPILE_SCRIPT)} '
+                    f'{self._args.optimize} {self._args.compile_jobs} < "{file_list}"'
+                ),
+                error='Unable to compile bytecode', capture=capture,
+            )
+        if not quiet:
+            self._print(
+                f'Compiled {len(files)} module{"s" if len(files) != 1 else ""} in '
+                f'{time.perf_counter() - start:.1f}s'
+            )
+
+    def _check_lockfile(self, lockfile: Path, activate: str) -> None:
+        # Packages are installed from lockfiles without resolving their dependencies, so missing
+        # dependencies must be reported instead of leaving a broken orb behind silently
+        with self._phase('check dependencies'):
+            self._execute(
+                command=f'{activate} && pip check', capture=True,
+                error=f'Lockfile "{lockfile}" is incomplete (it must pin all dependencies)',
+            )
+
+    @staticmethod
+    def _metadata(orb: Path) -> Dict[str, Any]:
+        import json
+
+        metadata_file = orb / 'pyorbs.json'
+        if not metadata_file.exists():
+            return {}
+        return cast(Dict[str, Any], json.loads(metadata_file.read_text()))
 
     @action(short='u')
     def update(self) -> None:
@@ -268,39 +1086,481 @@ class Orb:
         """
         self.make(update=True)
 
+    @action()
+    def rollback(self) -> None:
+        """
+        Switch an orb back to its previous generation.
+        """
+        from pyorbs.generations import Generations
+
+        name = self._name(use_current=False)
+        generations = Generations(path=self._path(), name=name)
+        with generations.lock(on_wait=self._waiting(f'orb "{name}" to be released', False)):
+            if not (previous := generations.previous()):
+                raise ValueError(f'Orb "{name}" does not have a previous generation')
+            generations.switch(previous)
+            self._print(f'Orb "{name}" is rolled back to generation {previous.name}')
+            index = self.index()
+            entry = index.orbs.get(name, {})
+            index.index(
+                name=name, orb=self._path() / name, lockfile=None, update=True,
+                requirements=Path(entry['requirements']) if entry.get('requirements') else None,
+            )
+            index.save()
+
+    @action()
+    def export(self) -> None:
+        """
+        Export an orb as an archive that can be imported on other machines.
+        """
+        from pyorbs.archive import export_orb
+        from pyorbs.generations import Generations
+
+        name = self._name(use_current=False)
+        archive = self._args.archive or Path(f'{name}.tar.gz')
+        entry = self.index().orbs.get(name, {})
+        self._print(f'Exporting orb "{name}" to "{archive}"...')
+        generations = Generations(path=self._path(), name=name)
+        # The orb is locked so that its current generation is not pruned while it is exported
+        with generations.lock(shared=True), self._phase('export orb'):
+            export_orb(
+                orb=cast(Path, generations.current), archive=archive, name=name,
+                lockfile_hash=entry.get('lockfile_hash'), requirements=entry.get('requirements'),
+            )
+        self._print(f'Orb "{name}" is exported')
+
+    @action(name='import')
+    def import_(self) -> None:
+        """
+        Import an orb from an archive made by the export action.
+        """
+        import json
+
+        from pyorbs.archive import import_orb, read_metadata
+        from pyorbs.generations import Generations
+        from pyorbs.locking import write_file
+        from pyorbs.store import interpreter_id
+
+        if not (archive := self._args.archive):
+            raise ValueError('The orb archive must be specified')
+        metadata = read_metadata(archive)
+        name = self._args.name or metadata['name']
+        if name.startswith('.'):
+            raise ValueError(f'Invalid orb name "{name}"')
+        self._print(f'Importing orb "{name}" from "{archive}"...')
+
+        path = self._path()
+        path.mkdir(parents=True, exist_ok=True)
+        generations = Generations(path=path, name=name, keep=self._args.generations)
+        store = self._store()
+        with generations.lock(on_wait=self._waiting(f'orb "{name}" to be released', False)):
+            with generations.build() as orb:
+                with self._phase('extract orb'):
+                    metadata = import_orb(archive=archive, target=orb)
+                with self._phase('render activation scripts'):
+                    self._render_activation_scripts(orb=orb, name=name)
+                write_file(orb / 'pyorbs.json', json.dumps({
+                    'interpreter': interpreter_id(str(orb / 'bin/python')),
+                }))
+                if not self._args.no_store:
+                    with self._phase('store orb'), store.lock(shared=True):
+                        self._store_orb(orb=orb, key=None, quiet=False)
+
+            with self._phase('index orb'):
+                index = self.index()
+                index.index(
+                    name=name, orb=path / name, lockfile=None, update=True,
+                    requirements=(
+                        Path(metadata['requirements']) if metadata['requirements'] else None
+                    ),
+                    lockfile_hash=metadata['lockfile_hash'],
+                )
+                index.save()
+        self._print(f'Orb "{name}" is ready for use')
+
     @action(short='d')
     def destroy(self) -> None:
         """
         Destroy an orb.
         """
+        from pyorbs.generations import Generations
+
         name = self._name(use_current=False, use_glowing=False)
         if self._current_orb() == name:
             raise RuntimeError('The orb must be deactivated first for this operation')
-        print(f'Destroying orb "{name}"...')
+        self._print(f'Destroying orb "{name}"...')
         if self._glowing_orb() == name:
             self._glowing_file().unlink(missing_ok=True)
-            print('No orb shall glow now')
-        shutil.rmtree(self._path() / name)
+            self._print('No orb shall glow now')
+        generations = Generations(path=self._path(), name=name)
+        with generations.lock(on_wait=self._waiting(f'orb "{name}" to be released', False)):
+            generations.remove()
+            index = self.index()
+            index.remove(name)
+            index.save()
+            self._forget_activations(name)
+        self._prune_store()
+
+    def _prune_store(self) -> None:
+        """
+        Remove the stored orbs that are not used by the current generation of any orb, and the
+        objects that are no longer used.
+        """
+        store = self._store()
+        store.prune_entries(keys={
+            key for name in self._orbs()
+            if (key := self._metadata(self._path() / name).get('build'))
+        })
+        store.prune_objects()
+
+    @action()
+    def dedup(self) -> None:
+        """
+        Deduplicate the files of all orbs using hardlinks.
+        """
+        store = self._store()
+        paths = [self._path() / name for name in sorted(self._orbs())] + store.environments()
+        reclaimed = sum(store.deduplicate(path) for path in paths)
+        store.prune_objects()
+        self._print(f'Deduplicated orb files ({format_size(reclaimed)} reclaimed)')
+
+    @action()
+    def gc(self) -> None:
+        """
+        Destroy the least recently used orbs that exceed the maximum size or age.
+        """
+        from pyorbs.usage import StorageUsage
+
+        max_size, max_age = self._args.max_size, self._args.max_age
+        if max_size is None and max_age is None:
+            raise ValueError('The maximum size or age of orbs must be specified')
+        index = self.updated_index()
+        with self._phase('measure disk usage'):
+            usage = StorageUsage(self._path(), keys={
+                name: self._metadata(self._path() / name).get('build') for name in index.orbs
+            })
+        usage.release(usage.unused())  # removed when pruning the store
+        protected = {self._glowing_orb(), self._current_orb()}
+        names = [name for name in sorted(index.orbs, key=index.last_used) if name not in protected]
+        now = time.time()
+        expired = [
+            name for name in names
+            if max_age is not None and now - index.last_used(name) > max_age * 86400
+        ]
+
+        # The previous generations of orbs are removed before destroying orbs due to their size
+        expired_size = usage.freed(part for name in expired for part in usage.orb(name))
+        for name in names:
+            if max_size is None or usage.size - expired_size <= max_size:
+                break
+            if name not in expired:
+                self._collect_generations(name=name, usage=usage)
+        destroyed = []
+        for name in names:
+            too_large = max_size is not None and usage.size > max_size
+            if (name in expired or too_large) and self._collect_orb(name, index, usage):
+                destroyed.append(name)
+        if not self._args.dry_run:
+            if destroyed:
+                index.save()
+            self._prune_store()
+
+        self._print(
+            f'{len(destroyed) or "No"} orb{"s" if len(destroyed) != 1 else ""} '
+            f'{"would be" if self._args.dry_run else "were"} destroyed '
+            f'({format_size(usage.size)} remaining)'
+        )
+        if max_size is not None and usage.size > max_size:
+            self._print(
+                'The remaining orbs exceed the maximum size (the glowing and current orbs are '
+                'never destroyed)'
+            )
+
+    def _collect_orb(self, name: str, index: 'OrbIndex', usage: 'StorageUsage') -> bool:
+        """
+        Destroy an orb when collecting garbage, returning whether it was destroyed.
+        """
+        from pyorbs.generations import Generations
+
+        self._print(
+            f'{"Would destroy" if self._args.dry_run else "Destroying"} orb "{name}" '
+            f'(last used {format_time(index.last_used(name))}, '
+            f'{format_size(usage.freed(usage.orb(name)))})'
+        )
+        # Orbs that are being made or changed by other processes are kept
+        generations = Generations(path=self._path(), name=name)
+        with generations.lock(blocking=False) as locked:
+            if locked and not self._args.dry_run:
+                generations.remove()
+                index.remove(name)
+                self._forget_activations(name)
+        if not locked:
+            self._print(f'Orb "{name}" is in use by another process and is kept')
+            return False
+        usage.remove_orb(name)
+        return True
+
+    def _collect_generations(self, name: str, usage: 'StorageUsage') -> None:
+        """
+        Remove the previous generations of an orb when collecting garbage.
+        """
+        from pyorbs.generations import Generations
+
+        generations = Generations(path=self._path(), name=name, keep=0)
+        if not (older := generations.older()):
+            return
+        self._print(
+            f'{"Would remove" if self._args.dry_run else "Removing"} the previous generations of '
+            f'orb "{name}" ({format_size(usage.freed(older))})'
+        )
+        with generations.lock(blocking=False) as locked:
+            if locked and not self._args.dry_run:
+                generations.prune()
+        if not locked:
+            self._print(f'Orb "{name}" is in use by another process and is kept')
+            return
+        usage.release(older)
+
+    @action()
+    def build(self) -> None:
+        """
+        Make or update the orbs of a spec file.
+        """
+        from pyorbs.spec import read_spec
+
+        specs = read_spec(self._args.spec)
+        if self._args.name:
+            specs = [spec for spec in specs if spec.name == self._args.name]
+            if not specs:
+                raise ValueError(f'Unknown orb name "{self._args.name}" in "{self._args.spec}"')
+        self._build_orbs(specs)
+
+    def _build_orbs(  # pylint: disable=too-many-locals
+        self, specs: List['OrbSpec'], show_executables: bool = False,
+        cache_dir: Optional[Path] = None, jobs: Optional[int] = None,
+    ) -> None:
+        import threading
+        from concurrent.futures import ThreadPoolExecutor
+        from functools import partial
+
+        width = max(len(spec.name) for spec in specs)
+        lock = threading.Lock()
+        build_orb = partial(self._build_orb, width=width, lock=lock, cache_dir=cache_dir)
+        with ThreadPoolExecutor(max_workers=jobs or max(1, self._args.jobs)) as executor:
+            results = list(executor.map(build_orb, specs))
+
+        self._print('\nBuild summary:')
+        for spec, (return_code, elapsed) in zip(specs, results):
+            status = 'failed' if return_code else 'ok'
+            executable = f'  {spec.executable}' if show_executables else ''
+            self._print(f'  {spec.name:<{width}}  {status:<6}  {elapsed:.1f}s{executable}')
+        if failed := [spec.name for spec, (return_code, _) in zip(specs, results) if return_code]:
+            raise RuntimeError(f'Unable to build orbs {", ".join(failed)}')
+
+    def _build_orb(
+        self, spec: 'OrbSpec', width: int, lock: 'threading.Lock', cache_dir: Optional[Path],
+    ) -> Tuple[int, float]:
+        import subprocess
+
+        # Orbs are built in separate processes so that their output can be told apart
+        exists = (self._path() / spec.name).is_dir()
+        args = [
+            sys.executable, '-m', 'pyorbs', '--update' if exists else '--make', spec.name,
+            '--path', str(self._path()), '--executable', spec.executable or self._args.executable,
+        ]
+        if spec.requirements:
+            args += ['--requirements', str(spec.requirements)]
+        # The options that affect the lockfiles are passed on as well, so that the orbs are made
+        # the same way as by making them separately
+        for option in (
+            'bare', 'no_cache', 'no_store', 'wheelhouse', 'offline', 'hashes', 'resolve',
+            'interpreter_lockfile',
+        ):
+            if getattr(self._args, option) and not (option == 'no_cache' and cache_dir):
+                args.append(f'--{option.replace("_", "-")}')
+        for option in ('optimize', 'compile_jobs'):
+            if getattr(self._args, option):
+                args += [f'--{option.replace("_", "-")}', str(getattr(self._args, option))]
+        args += spec.options
+        env = {**os.environ, 'PIP_CACHE_DIR': str(cache_dir)} if cache_dir else None
+
+        start = time.perf_counter()
+        with subprocess.Popen(  # nosec: trusted input
+            args, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, env=env,
+        ) as process:
+            prefix = f'[{spec.name}]'.ljust(width + 2)
+            for line in process.stdout or []:
+                with lock:
+                    self._print(f'{prefix} {line.rstrip()}', flush=True)
+        return process.returncode, time.perf_counter() - start
 
     @action(short='f')
-    def freeze(self, path: Optional[Path] = None) -> None:
+    def freeze(  # pylint: disable=too-many-locals
+        self, path: Optional[Path] = None, executable: Optional[str] = None,
+        capture: bool = False, python_tag: Optional[str] = None,
+    ) -> None:
         """
         Freeze requirements.
         """
-        for requirements in self._requirements(path=path):
+        import tempfile
+        from concurrent.futures import ThreadPoolExecutor, as_completed
+
+        executable = which(executable or self._args.executable)
+        outdated = []
+        for requirements in self.requirements(
+            path=path, python_tag=python_tag or self._python_tag(executable),
+        ):
             skip_freeze = (
                 self._args.requirements and self._args.requirements.is_dir()
                 and requirements.lockfile and not requirements.lockfile.exists()
             )
             if skip_freeze or not requirements.changed:
-                print(requirements.status)
+                self._print(requirements.status)
             else:
-                print(f'Freezing requirements "{requirements}"...')
-                with tempfile.TemporaryDirectory(prefix='pyorbs-') as tmp_path:
-                    self.make(
-                        name='frozen', path=Path(tmp_path), requirements_path=requirements.path,
-                        update=True, quiet=True,
-                    )
+                outdated.append(requirements)
+
+        jobs = max(1, self._args.jobs)
+        failed = []
+        self.freeze_durations = {}
+        with tempfile.TemporaryDirectory(prefix='pyorbs-') as tmp_path, \
+                ThreadPoolExecutor(max_workers=jobs) as executor:
+            # Files are frozen with a shared pip cache even when caching is disabled
+            cache_dir = Path(tmp_path) / 'cache' if self._args.no_cache else None
+            futures = {}
+            for index, requirements in enumerate(outdated):
+                self._print(f'Freezing requirements "{requirements}"...')
+                futures[executor.submit(
+                    self._freeze_requirements, requirements=requirements,
+                    path=Path(tmp_path) / str(index), capture=capture or jobs > 1,
+                    cache_dir=cache_dir, executable=executable,
+                )] = requirements
+            for future in as_completed(futures):
+                try:
+                    future.result()
+                except RuntimeError as error:
+                    if jobs == 1:
+                        raise
+                    failed.append(str(futures[future].path))
+                    self._print(f'Freezing requirements "{futures[future]}" failed: {error}')
+        if failed:
+            raise RuntimeError(f'Unable to freeze requirements {", ".join(failed)}')
+
+    def _freeze_requirements(  # pylint: disable=too-many-arguments
+        self, requirements: 'Requirements', path: Path, capture: bool, cache_dir: Optional[Path],
+        executable: str,
+    ) -> None:
+        start = time.perf_counter()
+        with self._phase('freeze requirements', path=str(requirements.path)):
+            if self._args.resolve:
+                self._resolve_requirements(
+                    requirements=requirements, path=path, capture=capture, cache_dir=cache_dir,
+                    executable=executable,
+                )
+            else:
+                self.make(
+                    name='frozen', path=path, requirements_path=requirements.path, update=True,
+                    quiet=True, capture=capture, cache_dir=cache_dir, executable=executable,
+                    python_tag=requirements.python_tag,
+                )
+        if requirements.path:
+            self.freeze_durations[requirements.path] = time.perf_counter() - start
+
+    def _resolve_requirements(  # pylint: disable=too-many-arguments
+        self, requirements: 'Requirements', path: Path, capture: bool, cache_dir: Optional[Path],
+        executable: str,
+    ) -> None:
+        import json
+
+        from pyorbs.packages import hashed_requirements, reported_hashes, reported_requirements
+
+        # The packages that would be installed in a new orb are resolved together with the
+        # packaging tools (which are also installed in orbs) without installing anything
+        path.mkdir(parents=True, exist_ok=True)
+        report = path / 'report.json'
+        self._execute(
+            command=(
+                f'{executable} -m pip install '
+                f'{self._pip_options(cache_dir=cache_dir)} --dry-run --ignore-installed --quiet '
+                f'--report "{report}" pip setuptools wheel --requirement "{requirements.path}"'
+            ),
+            error='Unable to resolve requirements', capture=capture,
+        )
+        resolved_report = json.loads(report.read_text())
+        resolved = reported_requirements(resolved_report)
+        if self._args.hashes:
+            resolved = hashed_requirements(resolved, hashes=reported_hashes(resolved_report))
+        requirements.update_lockfile(requirements='\n'.join(resolved) + '\n')
+        self._print(f'Frozen requirements are written to "{requirements.lockfile}"')
+
+    @action()
+    def watch(self) -> None:
+        """
+        Watch requirements and keep their lockfiles and the orbs made from them up to date.
+        """
+        from pyorbs.watch import Watcher
+
+        paths = [requirements.path for requirements in self.requirements() if requirements.path]
+        graphs: Dict[Path, Set[Path]] = {}
+        with Watcher() as watcher:
+            self._print(
+                f'Watching {len(paths)} requirements file{"s" if len(paths) != 1 else ""} using '
+                f'{"inotify" if watcher.inotify else "polling"} (press Ctrl+C to stop)...'
+            )
+            try:
+                while True:  # pylint: disable=while-used
+                    graphs = {path: self._requirements_graph(path, graphs) for path in paths}
+                    watcher.watch(file for files in graphs.values() for file in files)
+                    changed = watcher.wait()
+                    for path in [path for path, files in graphs.items() if files & changed]:
+                        try:
+                            self._synchronize(path)
+                        except (RuntimeError, ValueError) as error:
+                            self._print(f'Unable to synchronize requirements "{path}" ({error})')
+            except KeyboardInterrupt:
+                self._print('Stopped watching requirements')
+
+    def _requirements_graph(self, path: Path, graphs: Dict[Path, Set[Path]]) -> Set[Path]:
+        """
+        Return the absolute paths of the files in the include graph of a requirements file (or
+        its previous graph when it cannot be processed, e.g. while an included file is missing).
+        """
+        try:
+            files = self.requirements(path=path)[0].files
+        except (RuntimeError, ValueError):
+            return graphs.get(path, {Path(os.path.abspath(path))})
+        return {Path(os.path.abspath(file)) for file in files}
+
+    def _synchronize(self, path: Path) -> None:
+        """
+        Refreeze a changed requirements file and update the orbs made from it.
+        """
+        # Each lockfile is frozen once, and all orbs made from it are updated afterwards (using
+        # their own interpreters, as orbs made with different interpreters can share a lockfile)
+        executable = which(self._args.executable)
+        lockfiles: Dict[Optional[str], List[Tuple[str, str]]] = {}
+        for name, entry in sorted(self.updated_index().orbs.items()):
+            requirements_path = entry.get('requirements')
+            if requirements_path and Path(requirements_path).resolve() == path.resolve():
+                metadata = self._metadata(self._path() / name)
+                orb = (name, metadata.get('executable', executable))
+                lockfiles.setdefault(metadata.get('python_tag'), []).append(orb)
+
+        for python_tag, orbs in (lockfiles or {self._python_tag(executable): []}).items():
+            requirements = self.requirements(path=path, python_tag=python_tag)[0]
+            if not requirements.changed:
+                # Only changes of comments or whitespace were made (for example)
+                self._print(f'Requirements "{path}" are unchanged')
+                continue
+            # The requirements are frozen first, so that the orbs are updated from the new
+            # lockfile (which only installs and removes the changed packages of each orb)
+            self.freeze(
+                path=path, executable=orbs[0][1] if orbs else executable, python_tag=python_tag,
+            )
+            for name, orb_executable in orbs:
+                self.make(
+                    name=name, requirements_path=requirements.path, update=True,
+                    executable=orb_executable, python_tag=python_tag,
+                )
 
     @action(short='t')
     def test(self, path: Optional[Path] = None, quiet: bool = False) -> bool:
@@ -308,33 +1568,81 @@ class Orb:
         Test requirements.
         """
         outdated = False
-        for requirements in self._requirements(path=path):
+        for requirements in self.requirements(path=path):
             if requirements.outdated:
                 outdated = True
             if not quiet:
-                print(requirements.status)
+                self._print(requirements.status)
         return outdated
 
+    def _index_urls(self, name: str) -> List[str]:
+        """
+        Return the package indexes that the packages of an orb are installed from.
+        """
+        from pyorbs.outdated import pip_config, pip_index_urls
+        from pyorbs.requirements import parse_requirements
+
+        if self._args.offline:
+            return [str(self._store().wheels)]
+        orb = self._path() / name
+        options: List[str] = []
+        base = None
+        if requirements_path := self.index().orbs.get(name, {}).get('requirements'):
+            python_tag = self._metadata(orb).get('python_tag')
+            suffix = f'.{python_tag}.lock' if python_tag else '.lock'
+            lockfile = Path(requirements_path).with_name(Path(requirements_path).name + suffix)
+            if lockfile.exists():
+                options = parse_requirements(lockfile.read_text(encoding='utf-8')).options
+                base = lockfile.parent
+        if self._args.index_url:  # takes precedence over the lockfile and the pip configuration
+            options.append(f'--index-url {self._args.index_url}')
+        return pip_index_urls(options, config=pip_config(orb / 'bin/python'), base=base)
+
     @action(short='i')
     def info(self) -> None:
         """
         Show outdated packages.
         """
-        name = self._name()
-        print(f'Orb "{name}"')
-        outdated = self.activate(
-            name=name, command='pip list --outdated', capture=True,
-        ).stdout
-        print('\n' + (outdated.strip() or 'All packages are up-to-date'))
+        from pyorbs.outdated import IndexSnapshot, outdated_packages
+
+        names = sorted(self._orbs()) if self._args.all else [self._name()]
+        if not names:
+            self._print('There are no orbs')
+            return
+        # The snapshots of the package indexes are shared by the orbs using the same indexes
+        xdg_cache_home = Path(os.getenv('XDG_CACHE_HOME', Path.home() / '.cache'))
+        cache = None if self._args.no_cache else xdg_cache_home / 'pyorbs/index.json'
+        snapshots: Dict[Tuple[str, ...], IndexSnapshot] = {}
+        try:
+            for number, name in enumerate(names):
+                self._print(('\n' if number else '') + f'Orb "{name}"\n')
+                with self._phase('check outdated packages', orb=name):
+                    if (urls := tuple(self._index_urls(name))) not in snapshots:
+                        snapshots[urls] = IndexSnapshot(
+                            index_urls=urls, path=cache, ttl=float(self._args.index_ttl) * 60,
+                        )
+                    outdated = outdated_packages(self._path() / name, snapshot=snapshots[urls])
+                if not outdated:
+                    self._print('All packages are up-to-date')
+                    continue
+                print_table([('Package', 'Version', 'Latest')] + [
+                    tuple(package) for package in outdated
+                ], file=self._output)
+        finally:
+            for snapshot in snapshots.values():
+                snapshot.save()
 
     @action(short='g')
     def glow(self, name: Optional[str] = None) -> None:
         """
         Toggle orb glow.
         """
+        from pyorbs.locking import write_file
+
         name = name or self._name(use_glowing=False)
-        self._glowing_file().write_text(name)
-        print(f'Orb "{name}" is glowing now')
+        write_file(self._glowing_file(), name)  # replaced atomically for concurrent processes
+        self._record_activation(name=name)
+        self._print(f'Orb "{name}" is glowing now')
 
     @staticmethod
     @action(short='v')
@@ -342,6 +1650,8 @@ class Orb:
         """
         Show version.
         """
+        from importlib import metadata
+
         print(metadata.version('pyorbs'))
 
     @staticmethod
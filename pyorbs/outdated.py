@@ -0,0 +1,339 @@
+import ast
+import json
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from html.parser import HTMLParser
+from pathlib import Path
+from subprocess import CalledProcessError, run
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple, cast
+from urllib.error import HTTPError, URLError
+from urllib.parse import unquote, urljoin, urlparse
+from urllib.request import urlopen
+
+from pyorbs.index import python_version
+from pyorbs.packages import canonical_name, installed_packages
+
+DEFAULT_INDEX_URL = 'https://pypi.org/simple'
+VERSION_PATTERN = re.compile(
+    r'v?(?:(?P<epoch>[0-9]+)!)?(?P<release>[0-9]+(?:\.[0-9]+)*)'
+    r'(?:[-_.]?(?P<pre>a|b|c|rc|alpha|beta|pre|preview)[-_.]?(?P<pre_number>[0-9]*))?'
+    r'(?:-(?P<post_implicit>[0-9]+)|[-_.]?(?:post|rev|r)[-_.]?(?P<post>[0-9]*))?'
+    r'(?:[-_.]?dev[-_.]?(?P<dev>[0-9]*))?'
+    r'(?:\+[a-z0-9]+(?:[-_.][a-z0-9]+)*)?',
+    re.IGNORECASE,
+)
+PRE_RELEASES = {'a': 0, 'alpha': 0, 'b': 1, 'beta': 1, 'c': 2, 'rc': 2, 'pre': 2, 'preview': 2}
+ARCHIVE_SUFFIXES = ('.tar.gz', '.tar.bz2', '.tar.xz', '.tgz', '.zip')
+INDEX_OPTION_PATTERN = re.compile(
+    r'(-i|--index-url|--extra-index-url|-f|--find-links)(?:\s*=\s*|\s+)(\S+)'
+)
+PIP_CONFIG_KEYS = ('index-url', 'extra-index-url', 'find-links', 'no-index')
+VersionKey = Tuple[Any, ...]
+
+
+class OutdatedPackage(NamedTuple):
+    name: str
+    version: str
+    latest: str
+
+
+def version_key(version: str) -> Optional[VersionKey]:
+    """
+    Return a key for sorting versions (or None when the version is not a valid PEP 440 version).
+    """
+    if not (match := VERSION_PATTERN.fullmatch(version.strip())):
+        return None
+    release = tuple(int(part) for part in match['release'].split('.'))
+    while len(release) > 1 and release[-1] == 0:
+        release = release[:-1]
+    post = match['post_implicit'] or match['post']
+    if match['pre']:
+        pre: Tuple[float, int] = (
+            PRE_RELEASES[match['pre'].lower()], int(match['pre_number'] or 0),
+        )
+    elif match['dev'] is not None and post is None:
+        pre = (-1, 0)  # development releases come before pre-releases
+    else:
+        pre = (float('inf'), 0)
+    return (
+        int(match['epoch'] or 0), release, pre,
+        int(post) if post is not None else -1,
+        int(match['dev']) if match['dev'] is not None else float('inf'),
+    )
+
+
+def is_prerelease(version: str) -> bool:
+    key = version_key(version)
+    return key is not None and (key[2][0] != float('inf') or key[4] != float('inf'))
+
+
+def python_compatible(requires_python: Optional[str], python: Optional[str]) -> bool:
+    """
+    Return whether a Python version satisfies a ``Requires-Python`` specifier.
+
+    Specifiers that cannot be interpreted are considered to be satisfied.
+    """
+    if not requires_python or not python or not (python_key := version_key(python)):
+        return True
+    python_release = python_key[1]
+    for specifier in requires_python.split(','):
+        if not (match := re.fullmatch(r'\s*(~=|===|==|!=|<=|>=|<|>)\s*(\S+)\s*', specifier)):
+            continue
+        operator, version = match.groups()
+        if version.endswith('.*'):
+            prefix = tuple(int(part) for part in version[:-2].split('.') if part.isdigit())
+            matches = tuple(int(part) for part in python.split('.')[:len(prefix)]) == prefix
+            if (operator == '==' and not matches) or (operator == '!=' and matches):
+                return False
+            continue
+        if not (specifier_key := version_key(version)):
+            continue
+        release = specifier_key[1]
+        satisfied = {
+            '~=': python_release >= release and python_release[:max(len(release) - 1, 1)]
+            == release[:max(len(release) - 1, 1)],
+            '===': python == version, '==': python_release == release,
+            '!=': python_release != release, '<=': python_release <= release,
+            '>=': python_release >= release, '<': python_release < release,
+            '>': python_release > release,
+        }[operator]
+        if not satisfied:
+            return False
+    return True
+
+
+def file_version(name: str, filename: str) -> Optional[str]:
+    """
+    Return the version of a distribution file of a project (or None if it is not one).
+    """
+    if filename.endswith('.whl'):
+        parts = filename[:-4].split('-')
+        if len(parts) >= 5 and canonical_name(parts[0]) == name:
+            return parts[1]
+        return None
+    for suffix in ARCHIVE_SUFFIXES:
+        if filename.endswith(suffix):
+            project, _, version = filename[:-len(suffix)].rpartition('-')
+            return version if project and canonical_name(project) == name else None
+    return None
+
+
+def pip_config(python: Path) -> Dict[str, str]:
+    """
+    Return the pip configuration of an interpreter that determines the package indexes used.
+
+    The ``install`` section of the configuration files takes precedence over the ``global`` one,
+    and the ``PIP_*`` environment variables take precedence over both (they are used on their own
+    when pip cannot be run).
+    """
+    try:
+        output = run(  # nosec: trusted input
+            [str(python), '-m', 'pip', 'config', 'list'], capture_output=True, text=True,
+            check=True,
+        ).stdout
+    except (CalledProcessError, OSError):
+        output = ''
+    sections: Dict[str, Dict[str, str]] = {'global': {}, 'install': {}}
+    for line in output.splitlines():
+        key, _, value = line.partition('=')
+        section, _, name = key.partition('.')
+        if section in sections and name in PIP_CONFIG_KEYS:
+            try:
+                sections[section][name] = str(ast.literal_eval(value))
+            except (SyntaxError, ValueError):
+                continue
+    config = {**sections['global'], **sections['install']}
+    for name in PIP_CONFIG_KEYS:
+        if (variable := f'PIP_{name.replace("-", "_").upper()}') in os.environ:
+            config[name] = os.environ[variable]
+    return config
+
+
+def pip_index_urls(
+    options: Sequence[str], config: Dict[str, str], base: Optional[Path] = None,
+) -> List[str]:
+    """
+    Return the package indexes that pip installs from (the same way pip determines them).
+
+    Local find-links folders are included as flat folders of distribution files, while find-links
+    URLs are left out, as they are not simple package indexes.
+
+    Args:
+        options: The options of the requirements file (which take precedence over the pip
+            configuration, with later options overriding earlier ones).
+        config: The pip configuration (as returned by ``pip_config``).
+        base: The folder that relative find-links paths of the requirements file refer to.
+
+    """
+    index_url = config.get('index-url', DEFAULT_INDEX_URL)
+    extra_urls = config.get('extra-index-url', '').split()
+    find_links = [Path(link) for link in config.get('find-links', '').split()]
+    no_index = config.get('no-index', '').lower() in ('1', 'true', 'yes', 'on')
+    for option in options:
+        if option == '--no-index':
+            no_index = True
+        elif match := INDEX_OPTION_PATTERN.fullmatch(option):
+            name, value = match.groups()
+            if name in ('-i', '--index-url'):
+                index_url = value
+            elif name == '--extra-index-url':
+                extra_urls.append(value)
+            else:
+                find_links.append((base or Path()) / value)
+    urls = [] if no_index else [index_url, *extra_urls]
+    urls += [str(link) for link in find_links if not urlparse(str(link)).scheme and link.is_dir()]
+    return list(dict.fromkeys(urls))
+
+
+class _ProjectPageParser(HTMLParser):
+    def __init__(self) -> None:
+        super().__init__()
+        self.files: List[Tuple[str, Optional[str], bool]] = []
+
+    def handle_starttag(self, tag: str, attrs: List[Tuple[str, Optional[str]]]) -> None:
+        if tag != 'a' or not (values := dict(attrs)).get('href'):
+            return
+        filename = unquote(urlparse(values['href'] or '').path.rsplit('/', 1)[-1])
+        self.files.append((filename, values.get('data-requires-python'), 'data-yanked' in values))
+
+
+class IndexSnapshot:
+    def __init__(
+        self, index_urls: Sequence[str], path: Optional[Path] = None, ttl: float = 3600,
+        workers: int = 16,
+    ):
+        """
+        A cached snapshot of the versions of projects available on package indexes.
+
+        Args:
+            index_urls: The URLs of the simple package indexes to use (local folders containing a
+                simple package index or flat folders of distribution files can be used as well).
+            path: The path of the snapshot cache file (the snapshot is not cached when omitted).
+            ttl: The number of seconds for which the cached versions of a project are used.
+            workers: The number of index pages to fetch in parallel.
+
+        """
+        self.index_urls = list(index_urls)
+        self.path = path
+        self.ttl = ttl
+        self.workers = workers
+        self._key = ' '.join(self.index_urls)
+        self._projects: Dict[str, Dict[str, Any]] = {}
+        if path:
+            try:
+                self._projects = json.loads(path.read_text()).get(self._key, {})
+            except (FileNotFoundError, ValueError):
+                pass
+        self._lock = threading.Lock()
+
+    def _fetch_page(self, index_url: str, name: str) -> List[Tuple[str, Optional[str], bool]]:
+        if not urlparse(index_url).scheme or index_url.startswith('file:'):
+            folder = Path(unquote(urlparse(index_url).path))
+            if (project := folder / name).is_dir():  # simple index folder
+                if not (page := project / 'index.html').exists():
+                    return [(item.name, None, False) for item in project.iterdir()]
+                content = page.read_text(errors='replace')
+            elif folder.is_dir():  # flat folder of distribution files
+                return [(item.name, None, False) for item in folder.iterdir()]
+            else:
+                return []
+        else:
+            url = urljoin(index_url.rstrip('/') + '/', f'{name}/')
+            try:
+                with urlopen(url, timeout=30) as response:  # nosec: the index URL is trusted
+                    content = response.read().decode('utf-8', errors='replace')
+            except HTTPError as error:
+                if error.code == 404:
+                    return []  # the project is not available on this index
+                raise RuntimeError(f'Unable to fetch "{url}" ({error})') from error
+            except (URLError, OSError) as error:
+                raise RuntimeError(f'Unable to fetch "{url}" ({error})') from error
+        parser = _ProjectPageParser()
+        parser.feed(content)
+        return parser.files
+
+    def _fetch(self, name: str) -> None:
+        versions: Dict[str, Optional[str]] = {}
+        for index_url in self.index_urls:
+            for filename, requires_python, yanked in self._fetch_page(index_url, name):
+                if not yanked and (version := file_version(name, filename)):
+                    versions.setdefault(version, requires_python)
+        with self._lock:
+            self._projects[name] = {'fetched': time.time(), 'versions': versions}
+
+    def update(self, names: Iterable[str]) -> None:
+        """
+        Fetch the versions of the given projects unless they are cached and fresh.
+        """
+        now = time.time()
+        stale = sorted(set(
+            name for name in map(canonical_name, names)
+            if now - self._projects.get(name, {}).get('fetched', 0) > self.ttl
+        ))
+        if not stale:
+            return
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            for future in [executor.submit(self._fetch, name) for name in stale]:
+                future.result()
+
+    def latest(self, name: str, python: Optional[str] = None, pre: bool = False) -> Optional[str]:
+        """
+        Return the latest version of a project compatible with the given Python version.
+
+        Args:
+            name: The name of the project.
+            python: The Python version to use for the compatibility check.
+            pre: Whether to consider pre-releases and development releases.
+
+        """
+        self.update([name])
+        versions = self._projects[canonical_name(name)]['versions']
+        candidates = [
+            (key, version) for version, requires_python in versions.items()
+            if (key := version_key(version)) and (pre or not is_prerelease(version))
+            and python_compatible(requires_python, python)
+        ]
+        return max(candidates)[1] if candidates else None
+
+    def save(self) -> None:
+        """
+        Write the snapshot to the cache file atomically.
+        """
+        if not self.path:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        try:
+            snapshots = json.loads(self.path.read_text())
+        except (FileNotFoundError, ValueError):
+            snapshots = {}
+        snapshots[self._key] = self._projects
+        tmp_path = self.path.with_name(
+            f'.{self.path.name}.{os.getpid()}.{threading.get_ident()}'
+        )
+        tmp_path.write_text(json.dumps(snapshots, sort_keys=True) + '\n')
+        os.replace(tmp_path, self.path)
+
+
+def outdated_packages(orb: Path, snapshot: IndexSnapshot) -> List[OutdatedPackage]:
+    """
+    Return the packages installed in an orb that have newer versions on the package indexes.
+
+    Editable packages are ignored. Pre-releases are only considered for packages with a
+    pre-release installed.
+    """
+    packages = [
+        package for package in installed_packages(orb).values()
+        if not package.editable and package.version and version_key(package.version)
+    ]
+    snapshot.update(package.name for package in packages)
+    python = python_version(orb)
+    outdated = []
+    for package in sorted(packages, key=lambda package: canonical_name(package.name)):
+        version = cast(str, package.version)
+        latest = snapshot.latest(package.name, python=python, pre=is_prerelease(version))
+        if latest and version_key(latest) > version_key(version):  # type: ignore[operator]
+            outdated.append(OutdatedPackage(name=package.name, version=version, latest=latest))
+    return outdated
@@ -0,0 +1,177 @@
+import csv
+import json
+import os
+import re
+from email.parser import HeaderParser
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+# Compiles the files listed on the standard input in parallel (using the given optimization level
+# and number of processes), writing checked hash-based bytecode files that remain valid when the
+# modification times of the source files change (e.g. when they are deduplicated or relocated)
+COMPILE_SCRIPT = '''\
+import compileall, functools, py_compile, sys
+from concurrent.futures import ProcessPoolExecutor
+compile_file = functools.partial(
+    compileall.compile_file, force=True, quiet=2, optimize=int(sys.argv[1]),
+    invalidation_mode=py_compile.PycInvalidationMode.CHECKED_HASH,
+)
+with ProcessPoolExecutor(int(sys.argv[2]) or None) as executor:
+    list(executor.map(compile_file, sys.stdin.read().splitlines(), chunksize=64))
+'''
+
+
+class Package(NamedTuple):
+    name: str
+    version: Optional[str]
+    requirement: str
+    editable: bool = False
+
+
+def canonical_name(name: str) -> str:
+    return re.sub(r'[-_.]+', '-', name).lower()
+
+
+def requirement_name(requirement: str) -> str:
+    return canonical_name(re.split(r'[\s\[=<>!~;@]', requirement.strip(), maxsplit=1)[0])
+
+
+def site_packages(orb: Path) -> Path:
+    for path in sorted((orb / 'lib').glob('python*/site-packages')):
+        return path
+    raise RuntimeError(f'Orb "{orb}" does not have a site-packages folder')
+
+
+def installed_packages(orb: Path) -> Dict[str, Package]:
+    """
+    Return the packages installed in an orb (based on their distribution metadata).
+    """
+    packages = {}
+    for dist_info in site_packages(orb).glob('*.dist-info'):
+        if not (metadata_file := dist_info / 'METADATA').exists():
+            continue
+        metadata = HeaderParser().parsestr(metadata_file.read_text(errors='replace'))
+        name, version = metadata['Name'], metadata['Version']
+        direct_url_file = dist_info / 'direct_url.json'
+        direct_url = json.loads(direct_url_file.read_text()) if direct_url_file.exists() else {}
+        packages[canonical_name(name)] = Package(
+            name=name, version=version, requirement=f'{name}=={version}',
+            editable=bool(direct_url.get('dir_info', {}).get('editable')),
+        )
+    return packages
+
+
+def distribution_files(orb: Path, names: Optional[Iterable[str]] = None) -> List[Path]:
+    """
+    Return the Python source files installed in an orb (based on the records of its
+    distributions), optionally only those of the given packages.
+    """
+    keys = None if names is None else {canonical_name(name) for name in names}
+    files = []
+    for site in (orb / 'lib').glob('python*/site-packages'):
+        for dist_info in site.glob('*.dist-info'):
+            name = canonical_name(dist_info.name.split('-', 1)[0])
+            if (keys is not None and name not in keys) or not (dist_info / 'RECORD').exists():
+                continue
+            with (dist_info / 'RECORD').open(newline='', errors='replace') as record:
+                for row in csv.reader(record):
+                    path = os.path.normpath(row[0]) if row else ''
+                    if path.endswith('.py') and not path.startswith(('..', '/')):
+                        files.append(site / path)
+    return sorted(files)
+
+
+def locked_packages(lockfile: Path) -> Dict[str, Package]:
+    """
+    Return the packages pinned in a lockfile.
+
+    Packages which are not pinned to a specific version (e.g. direct references) have no version.
+    """
+    packages = {}
+    for line in lockfile.read_text().splitlines():
+        if not line.strip() or line.startswith(('#', '-')):
+            continue
+        pattern = r'([A-Za-z0-9][A-Za-z0-9._-]*)\s*(?:\[[^\]]*\])?\s*(==\s*([^\s;]+))?'
+        if match := re.match(pattern, line):
+            packages[canonical_name(match.group(1))] = Package(
+                name=match.group(1), version=match.group(3), requirement=line.strip(),
+            )
+    return packages
+
+
+def lockfile_changes(orb: Path, lockfile: Path) -> Tuple[List[str], List[str]]:
+    """
+    Return the requirements to install and the packages to remove to synchronize an orb.
+
+    Editable packages are never removed.
+    """
+    installed = installed_packages(orb)
+    locked = locked_packages(lockfile)
+    changed = [
+        package.requirement for key, package in locked.items()
+        if not package.version or key not in installed
+        or package.version != installed[key].version
+    ]
+    removed = [
+        package.name for key, package in installed.items()
+        if key not in locked and not package.editable
+    ]
+    return changed, removed
+
+
+def reported_requirements(report: Dict[str, Any]) -> List[str]:
+    """
+    Return the requirements of the packages in a pip installation report.
+
+    The requirements are formatted and ordered the same way as by ``pip freeze --all
+    --exclude-editable``.
+    """
+    requirements = []
+    for item in report['install']:
+        name, version = item['metadata']['name'], item['metadata']['version']
+        download_info = item.get('download_info', {})
+        if download_info.get('dir_info', {}).get('editable'):
+            continue
+        if not item.get('is_direct'):
+            requirements.append((name, f'{name}=={version}'))
+        elif vcs_info := download_info.get('vcs_info'):
+            url = f'{vcs_info["vcs"]}+{download_info["url"]}@{vcs_info["commit_id"]}'
+            requirements.append((name, f'{name} @ {url}'))
+        else:
+            requirements.append((name, f'{name} @ {download_info["url"]}'))
+    requirements.sort(key=lambda requirement: requirement[0].lower())
+    return [requirement for _, requirement in requirements]
+
+
+def reported_hashes(report: Dict[str, Any]) -> Dict[str, List[str]]:
+    """
+    Return the hashes of the distribution files in a pip installation report by package name.
+    """
+    hashes = {}
+    for item in report['install']:
+        archive_info = item.get('download_info', {}).get('archive_info', {})
+        digests = archive_info.get('hashes') or {}
+        if not digests and '=' in archive_info.get('hash', ''):  # reports of older pip versions
+            algorithm, digest = archive_info['hash'].split('=', 1)
+            digests = {algorithm: digest}
+        if digests:
+            hashes[canonical_name(item['metadata']['name'])] = [
+                f'{algorithm}:{digest}' for algorithm, digest in sorted(digests.items())
+            ]
+    return hashes
+
+
+def hashed_requirements(requirements: List[str], hashes: Dict[str, List[str]]) -> List[str]:
+    """
+    Add hash options to pinned requirements.
+    """
+    hashed = []
+    for requirement in requirements:
+        if not requirement.strip():
+            continue
+        name = requirement_name(requirement)
+        if name not in hashes:
+            raise RuntimeError(f'Unable to determine the hash of package "{name}"')
+        hash_options = ' '.join(f'--hash={value}' for value in hashes[name])
+        hashed.append(f'{requirement.strip()} {hash_options}')
+    return hashed
@@ -1,44 +1,224 @@
 import hashlib
+import json
+import os
 import re
+import threading
+from collections import deque
 from pathlib import Path
-from typing import List, Optional, Sequence
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple, cast
 
+from pyorbs.errors import LockfileError, RequirementsError
 from pyorbs.templates import render
 
+CACHE_VERSION = 2
+INCLUDE_PATTERN = re.compile(r'(-r|-c|--requirement|--constraint)(?:\s*=\s*|\s*)(\S.*)')
+
+
+class ParsedRequirements(NamedTuple):
+    includes: List[Tuple[str, str]]
+    options: List[str]
+    requirements: List[str]
+
+    def normalized(self) -> str:
+        """
+        Return the semantic form of the requirements (ignoring comments, whitespace and order).
+        """
+        return '\n'.join(
+            sorted(f'-{kind} {file}' for kind, file in self.includes)
+            + sorted(self.options) + sorted(self.requirements)
+        )
+
+
+def _normalize_requirement(line: str) -> str:
+    if not (match := re.match(r'([A-Za-z0-9][A-Za-z0-9._-]*)(.*)', line)):
+        return line
+    name = re.sub(r'[-_.]+', '-', match.group(1)).lower()
+    return name + re.sub(r'\s*([<>=!~,;@\[\]]+)\s*', r'\1', match.group(2))
+
+
+def parse_requirements(text: str) -> ParsedRequirements:
+    """
+    Parse the contents of a requirements file.
+
+    Comments and line continuations are handled the same way as by pip. Includes are returned as
+    pairs of the kind of the include (``r`` or ``c``) and the referred file.
+    """
+    parsed = ParsedRequirements(includes=[], options=[], requirements=[])
+    for line in re.sub(r'\\\n', '', text).splitlines():
+        if not (line := ' '.join(re.sub(r'(^|\s)#.*$', '', line).split())):
+            continue
+        if match := INCLUDE_PATTERN.fullmatch(line):
+            kind = 'c' if match.group(1) in ('-c', '--constraint') else 'r'
+            parsed.includes.append((kind, match.group(2)))
+        elif line.startswith('-'):
+            parsed.options.append(line)
+        else:
+            parsed.requirements.append(_normalize_requirement(line))
+    return parsed
+
+
+class RequirementsCache:
+    def __init__(self, path: Path):
+        """
+        Persistent cache of processed requirements files.
+
+        Entries are keyed by the path, modification time, size and inode of each file, so that
+        unchanged requirements files can be validated without reading them.
+
+        Args:
+            path: The path of the cache file.
+
+        """
+        self.path = path
+        self._changed = False
+        try:
+            self._data: Dict[str, Any] = json.loads(path.read_text())
+        except (OSError, ValueError):
+            self._data = {}
+        if self._data.get('version') != CACHE_VERSION:
+            self._data = {'version': CACHE_VERSION}
+        self._files = self._data.setdefault('files', {})
+        self._graphs = self._data.setdefault('graphs', {})
+
+    @staticmethod
+    def signature(path: Path) -> List[int]:
+        stat = path.stat()
+        return [stat.st_mtime_ns, stat.st_size, stat.st_ino]
+
+    def file(self, path: Path) -> Optional[Dict[str, Any]]:
+        entry = self._files.get(str(path.absolute()))
+        try:
+            return entry if entry and entry['signature'] == self.signature(path) else None
+        except OSError:
+            return None
+
+    def update_file(self, path: Path, signature: List[int], **values: Any) -> None:
+        self._files[str(path.absolute())] = {'signature': signature, **values}
+        self._changed = True
+
+    def graph(self, path: Path, digests: List[str]) -> Optional[str]:
+        entry = self._graphs.get(str(path.absolute()))
+        return entry['legacy_hash'] if entry and entry['digests'] == digests else None
+
+    def update_graph(self, path: Path, digests: List[str], legacy_hash: str) -> None:
+        self._graphs[str(path.absolute())] = {'digests': digests, 'legacy_hash': legacy_hash}
+        self._changed = True
+
+    def save(self) -> None:
+        if not self._changed:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(
+            f'.{self.path.name}.{os.getpid()}.{threading.get_ident()}'
+        )
+        tmp_path.write_text(json.dumps(self._data))
+        os.replace(tmp_path, self.path)
+        self._changed = False
+
 
 class ProcessedRequirements:  # pylint: disable=too-few-public-methods
-    def __init__(self, path: Path, lockfile: Path):
-        stored_hash = self._get_stored_hash(lockfile) if lockfile.exists() else None
+    def __init__(self, path: Path, lockfile: Path, cache: Optional[RequirementsCache] = None):
+        stored_hash = self._get_stored_hash(lockfile, cache) if lockfile.exists() else None
 
         # Derive current hash and options (including from dependencies)
-        current_hash = hashlib.sha256()
-        options: List[str] = []
-        done = {path: False}
-        while not all(done.values()):  # pylint: disable=while-used
-            requirements = [entry for entry, processed in done.items() if not processed][0]
+        processed = self._process_cached(path, cache) if cache else None
+        current_hash, legacy_hash, options, files = processed or self._process(path, cache)
+
+        # Set public properties (lockfiles storing the hash of the raw contents of the requirements
+        # files, as generated by earlier versions, remain valid as long as the files are unchanged)
+        self.current_hash = current_hash
+        self.options = options
+        self.files = files
+        self.outdated = lockfile.exists() and stored_hash not in (current_hash, legacy_hash)
+
+    @staticmethod
+    def _walk(
+        path: Path, read: Callable[[Path], Optional[Dict[str, Any]]],
+    ) -> Optional[Tuple[List[Path], List[Dict[str, Any]]]]:
+        files, entries = [], []
+        queue = deque([path])
+        queued = {path}
+        while queue:  # pylint: disable=while-used
+            requirements = queue.popleft()
+            if not (entry := read(requirements)):
+                return None
+            files.append(requirements)
+            entries.append(entry)
+            for file in entry['includes']:
+                if '://' not in file and (include := requirements.parent / file) not in queued:
+                    queued.add(include)
+                    queue.append(include)
+        return files, entries
+
+    @staticmethod
+    def _hashes(
+        path: Path, files: List[Path], entries: List[Dict[str, Any]],
+    ) -> Tuple[str, List[str]]:
+        # The includes are part of the normalized contents of each file, so the hash of the sorted
+        # files and their digests depends on the include graph but not on the order of the
+        # includes (the paths are relative to the requirements file, so that it can be moved)
+        digests = sorted(
+            f'{os.path.normpath(os.path.relpath(file, path.parent))} {entry["normalized_digest"]}'
+            for file, entry in zip(files, entries)
+        )
+        current_hash = hashlib.sha256('\n'.join(digests).encode(encoding='utf-8')).hexdigest()
+        return current_hash, [option for entry in entries for option in entry['options']]
+
+    @classmethod
+    def _process_cached(
+        cls, path: Path, cache: RequirementsCache,
+    ) -> Optional[Tuple[str, str, List[str], List[Path]]]:
+        if not (walked := cls._walk(path, read=cache.file)):
+            return None
+        files, entries = walked
+        if not (legacy_hash := cache.graph(path, [entry['digest'] for entry in entries])):
+            return None
+        current_hash, options = cls._hashes(path, files=files, entries=entries)
+        return current_hash, legacy_hash, options, files
+
+    @classmethod
+    def _process(
+        cls, path: Path, cache: Optional[RequirementsCache] = None,
+    ) -> Tuple[str, str, List[str], List[Path]]:
+        legacy_hash = hashlib.sha256()
+
+        def read(requirements: Path) -> Dict[str, Any]:
             if not requirements.exists():
                 raise RuntimeError(
                     f'Requirements file "{requirements}" not found (referenced by "{path}")'
                 )
+            signature = RequirementsCache.signature(requirements)
             text = requirements.read_text()
-            current_hash.update(text.encode(encoding='utf-8'))
-            options.extend(re.findall(r'^(-[^rc].*)$', text, re.MULTILINE))
-            done.update({
-                requirements.parent / file: False
-                for file in re.findall(r'^-[rc] (.+)$', text, re.MULTILINE)
-                if requirements.parent / file not in done
-            })
-            done[requirements] = True
-
-        # Set public properties
-        self.current_hash = current_hash.hexdigest()
-        self.options = options
-        self.outdated = lockfile.exists() and self.current_hash != stored_hash
+            legacy_hash.update(text.encode(encoding='utf-8'))
+            parsed = parse_requirements(text)
+            entry = {
+                'digest': hashlib.sha256(text.encode(encoding='utf-8')).hexdigest(),
+                'normalized_digest': hashlib.sha256(
+                    parsed.normalized().encode(encoding='utf-8')
+                ).hexdigest(),
+                'options': parsed.options,
+                'includes': [file for _, file in parsed.includes],
+            }
+            if cache:
+                cache.update_file(requirements, signature=signature, **entry)
+            return entry
+
+        files, entries = cast(Tuple[List[Path], List[Dict[str, Any]]], cls._walk(path, read=read))
+        if cache:
+            digests = [entry['digest'] for entry in entries]
+            cache.update_graph(path, digests=digests, legacy_hash=legacy_hash.hexdigest())
+        current_hash, options = cls._hashes(path, files=files, entries=entries)
+        return current_hash, legacy_hash.hexdigest(), options, files
 
     @staticmethod
-    def _get_stored_hash(lockfile: Path) -> str:
+    def _get_stored_hash(lockfile: Path, cache: Optional[RequirementsCache] = None) -> str:
+        if cache and (entry := cache.file(lockfile)):
+            return str(entry['hash'])
+        signature = RequirementsCache.signature(lockfile)
         if not (search := re.search(r'#[\s]*Requirements hash: (.+)', lockfile.read_text())):
-            raise RuntimeError(f'Invalid lockfile "{lockfile}"')
+            raise LockfileError(f'Invalid lockfile "{lockfile}"')
+        if cache:
+            cache.update_file(lockfile, signature=signature, hash=search.group(1))
         return search.group(1)
 
 
@@ -50,6 +230,8 @@ class Requirements:
         bare: bool = False,
         required: bool = True,
         allow_outdated: bool = False,
+        cache: Optional[RequirementsCache] = None,
+        python_tag: Optional[str] = None,
     ):
         """
         Represent a requirements file.
@@ -60,12 +242,17 @@ class Requirements:
             bare: Whether to use the bare requirements file.
             required: Whether the requirements file must be provided.
             allow_outdated: Whether to allow an outdated requirements file.
+            cache: The cache to use for processing the requirements file.
+            python_tag: The version tag of the interpreter (e.g. py311) to use a specific lockfile
+                for (e.g. requirements.txt.py311.lock), as the pinned versions may differ per
+                interpreter.
 
         Attributes:
             changed: Whether the requirements lockfile is up-to-date.
 
         """
         self.path = path or self._default_path(default_paths or [])
+        self.python_tag = python_tag
         self.lockfile: Optional[Path] = None
         self.outdated = False
         self.changed = False
@@ -74,19 +261,20 @@ class Requirements:
 
         if self.path:
             if not self.path.exists():
-                raise ValueError(f'Requirements file "{self.path}" not found')
+                raise RequirementsError(f'Requirements file "{self.path}" not found')
             if not self.path.is_file():
-                raise ValueError(f'Invalid requirements file "{self.path}"')
+                raise RequirementsError(f'Invalid requirements file "{self.path}"')
 
-            self.lockfile = self.path.with_name(self.path.name + '.lock')
+            suffix = f'.{python_tag}.lock' if python_tag else '.lock'
+            self.lockfile = self.path.with_name(self.path.name + suffix)
 
             if not bare:
-                self._processed = ProcessedRequirements(self.path, self.lockfile)
+                self._processed = ProcessedRequirements(self.path, self.lockfile, cache=cache)
                 self.outdated = self._processed.outdated
                 self.changed = not self.lockfile.exists() or self.outdated
 
             if not allow_outdated and self.outdated:
-                raise RuntimeError(self.status)
+                raise LockfileError(self.status)
 
             self._effective_path = self.path if bare or self.changed else self.lockfile
         elif required:
@@ -99,6 +287,23 @@ class Requirements:
             return f'Requirements lockfile of "{self.path}" is {status_text}'
         return f'Requirements file "{self.path}" does not have a lockfile'
 
+    @property
+    def options(self) -> List[str]:
+        return self._processed.options if self._processed else []
+
+    @property
+    def files(self) -> List[Path]:
+        """
+        Return the requirements file with the requirements files it includes (directly or not).
+        """
+        if self._processed:
+            return self._processed.files
+        return [self.path] if self.path else []
+
+    @property
+    def locked(self) -> bool:
+        return self.lockfile is not None and self._effective_path == self.lockfile
+
     def __bool__(self) -> bool:
         return self._effective_path is not None
 
@@ -110,7 +315,6 @@ class Requirements:
             raise RuntimeError('Cannot update the lockfile of an empty or bare orb')
         header = render('lockfile_header', {'hash': self._processed.current_hash})
         self.lockfile.write_text(header + '\n'.join(self._processed.options + [requirements]))
-        print(f'Frozen requirements are written to "{self.lockfile}"')
 
     @staticmethod
     def _default_path(default_paths: Sequence[Path]) -> Optional[Path]:
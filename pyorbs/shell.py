@@ -1,8 +1,10 @@
 import os
 import sys
 from pathlib import Path
-from subprocess import CompletedProcess, run
-from typing import Optional
+from typing import TYPE_CHECKING, Optional
+
+if TYPE_CHECKING:
+    from subprocess import CompletedProcess
 
 SHELL_TYPES = ('bash', 'fish')
 
@@ -55,6 +57,7 @@ def execute(
     sys.stderr.flush()
     if replace:
         return os.execv(shell, args)  # nosec: trusted input
+    from subprocess import run  # pylint: disable=import-outside-toplevel
     return run(args, capture_output=capture, text=True, check=False)  # nosec: trusted input
 
 
@@ -62,8 +65,10 @@ def which(command: str) -> str:
     """
     Return the absolute path of the given command.
     """
-    args = ['which', command]
-    process = run(args, capture_output=True, text=True, check=False)  # nosec: trusted input
-    if process.returncode:
-        raise ValueError(f'Command "{command}" not found')
-    return process.stdout.strip()
+    # Commands are looked up directly in order to avoid starting a subprocess
+    paths = [''] if os.sep in command else os.environ.get('PATH', os.defpath).split(os.pathsep)
+    for path in paths:
+        candidate = os.path.join(path, command)
+        if os.path.isfile(candidate) and os.access(candidate, os.X_OK):
+            return os.path.abspath(candidate)
+    raise ValueError(f'Command "{command}" not found')
@@ -0,0 +1,45 @@
+import configparser
+import shlex
+from pathlib import Path
+from typing import List, NamedTuple, Optional
+
+SPEC_OPTIONS = ('requirements', 'executable', 'options')
+
+
+class OrbSpec(NamedTuple):
+    name: str
+    requirements: Optional[Path]
+    executable: Optional[str]
+    options: List[str]
+
+
+def read_spec(path: Path) -> List[OrbSpec]:
+    """
+    Read the orbs specified in a spec file.
+
+    Relative requirements paths are interpreted relative to the folder of the spec file.
+    """
+    if not path.is_file():
+        raise ValueError(f'Spec file "{path}" not found')
+    parser = configparser.ConfigParser(interpolation=None)
+    try:
+        parser.read(path)
+    except configparser.Error as error:
+        raise ValueError(f'Invalid spec file "{path}" ({error.message})') from error
+
+    specs = []
+    for name in parser.sections():
+        section = parser[name]
+        for option in section:
+            if option not in SPEC_OPTIONS:
+                raise ValueError(f'Unknown option "{option}" for orb "{name}" in "{path}"')
+        requirements = section.get('requirements')
+        specs.append(OrbSpec(
+            name=name,
+            requirements=path.parent / requirements if requirements else None,
+            executable=section.get('executable'),
+            options=shlex.split(section.get('options', '')),
+        ))
+    if not specs:
+        raise ValueError(f'There are no orbs in spec file "{path}"')
+    return specs
@@ -0,0 +1,317 @@
+import hashlib
+import os
+import shutil
+import stat
+import threading
+from pathlib import Path
+from subprocess import CalledProcessError, run
+from typing import Callable, ContextManager, Dict, List, Optional, Set
+
+from pyorbs.locking import file_lock
+
+INTERPRETER_SCRIPT = (
+    'import platform, sysconfig; print(platform.python_version()); print(sysconfig.get_platform())'
+)
+
+
+def interpreter_id(executable: str) -> str:
+    """
+    Return an identifier that changes whenever the given interpreter binary changes.
+    """
+    real_path = Path(executable).resolve()
+    file_stat = real_path.stat()
+    identity = f'{real_path}:{file_stat.st_size}:{file_stat.st_mtime_ns}'
+    return hashlib.sha256(identity.encode(encoding='utf-8')).hexdigest()
+
+
+def interpreter_info(python: Path) -> Dict[str, str]:
+    """
+    Return the Python version and platform of an interpreter.
+    """
+    try:
+        output = run(  # nosec: trusted input
+            [str(python), '-c', INTERPRETER_SCRIPT], capture_output=True, text=True, check=True,
+        ).stdout.split()
+    except (CalledProcessError, OSError) as error:
+        raise RuntimeError(f'Unable to run Python interpreter "{python}" ({error})') from error
+    return {'python': output[0], 'platform': output[1]}
+
+
+def python_tag(executable: str) -> str:
+    """
+    Return the version tag of an interpreter (e.g. py311 for Python 3.11).
+    """
+    return 'py' + ''.join(interpreter_info(Path(executable))['python'].split('.')[:2])
+
+
+def file_digest(path: Path) -> str:
+    """
+    Return the SHA-256 digest of a file (reading it in chunks to keep memory usage low).
+    """
+    digest = hashlib.sha256()
+    with path.open('rb') as file:
+        while chunk := file.read(1024 * 1024):  # pylint: disable=while-used
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def clone(source: Path, target: Path, link: bool = False) -> None:
+    """
+    Copy a directory tree, using copy-on-write where the file system supports it.
+
+    Args:
+        source: The directory tree to copy.
+        target: The path of the copy.
+        link: Whether to hardlink the files instead of copying them (which is only safe when the
+            files are replaced rather than changed in place, as pip and pyorbs do).
+
+    """
+    args = ['cp', '-a', '--link' if link else '--reflink=auto', str(source), str(target)]
+    if run(args, check=False).returncode:  # nosec: trusted input
+        raise RuntimeError(f'Unable to copy "{source}" to "{target}"')
+
+
+def relocate(path: Path, old: Path, new: Path) -> None:
+    """
+    Rewrite the absolute paths embedded in the scripts of a copied virtual environment.
+
+    Args:
+        path: The virtual environment to update.
+        old: The path the virtual environment was created at.
+        new: The path the virtual environment will be used at.
+
+    """
+    old_bytes, new_bytes = str(old).encode(), str(new).encode()
+    for file in [path / 'pyvenv.cfg', *(path / 'bin').iterdir()]:
+        if file.is_symlink() or not file.is_file():
+            continue
+        content = file.read_bytes()
+        if old_bytes in content:
+            # Files are replaced rather than written in place as they might be hardlinked
+            tmp_file = file.with_name(f'.{file.name}.tmp')
+            tmp_file.write_bytes(content.replace(old_bytes, new_bytes))
+            shutil.copymode(file, tmp_file)
+            os.replace(tmp_file, file)
+
+
+class Store:
+    def __init__(self, path: Path):
+        """
+        Content-addressed store of fully installed orbs.
+
+        Args:
+            path: The path of the store.
+
+        """
+        self.path = path
+
+    @staticmethod
+    def key(lockfile: Path, executable: str, optimize: int = 0) -> str:
+        """
+        Return the store key of an orb made from the given lockfile and interpreter (with
+        bytecode compiled using the given optimization level).
+        """
+        key = hashlib.sha256(lockfile.read_bytes())
+        key.update(interpreter_id(executable).encode(encoding='utf-8'))
+        if optimize:  # keeps the keys of orbs made by earlier versions
+            key.update(f':{optimize}'.encode(encoding='utf-8'))
+        return key.hexdigest()
+
+    @property
+    def wheels(self) -> Path:
+        """
+        Return the path of the local wheelhouse.
+        """
+        return self.path / 'wheels'
+
+    @property
+    def objects(self) -> Path:
+        """
+        Return the path of the shared object store used for deduplicating files.
+        """
+        return self.path / 'objects'
+
+    def entry(self, key: str) -> Path:
+        return self.path / 'orbs' / key
+
+    def lock(self, shared: bool = False, blocking: bool = True) -> ContextManager[bool]:
+        """
+        Lock the store, yielding whether the lock was acquired.
+
+        Processes using the store hold a shared lock, while pruning the store requires an exclusive
+        lock.
+        """
+        return file_lock(self.path / '.lock', shared=shared, blocking=blocking)
+
+    def entry_lock(
+        self, entry: Path, on_wait: Optional[Callable[[], None]] = None,
+    ) -> ContextManager[bool]:
+        """
+        Lock a store entry while it is being built, so that identical builds run only once.
+        """
+        lock = self.path / 'locks' / f'{entry.parent.name}-{entry.name}.lock'
+        return file_lock(lock, on_wait=on_wait)
+
+    @staticmethod
+    def staging(entry: Path) -> Path:
+        """
+        Return a process-specific staging path for building a store entry.
+        """
+        entry.parent.mkdir(parents=True, exist_ok=True)
+        return entry.with_name(f'.{entry.name}.{os.getpid()}.{threading.get_ident()}')
+
+    @staticmethod
+    def commit(staging: Path, entry: Path) -> None:
+        """
+        Move a staged virtual environment to its store entry.
+        """
+        relocate(staging, old=staging, new=entry)
+        try:
+            staging.rename(entry)
+        except OSError:  # another process has added the same entry in the meantime
+            shutil.rmtree(staging)
+
+    def environments(self) -> List[Path]:
+        """
+        Return the stored orbs and base environments.
+        """
+        return [
+            path for folder in ('orbs', 'bases') for path in (self.path / folder).glob('*')
+            if not path.name.startswith('.')
+        ]
+
+    def get(self, key: str) -> Optional[Path]:
+        entry = self.entry(key)
+        return entry if entry.is_dir() else None
+
+    def add(self, key: str, source: Path) -> bool:
+        """
+        Add an orb to the store (unless it is already present), returning whether it was added.
+
+        The files of the orb are hardlinked rather than copied, so that only the files that are
+        relocated take up additional space.
+        """
+        entry = self.entry(key)
+        if entry.exists():
+            return False
+        staging = self.staging(entry)
+        clone(source, staging, link=True)
+        relocate(staging, old=source, new=staging)
+        self.commit(staging, entry)
+        return True
+
+    def base(self, executable: str) -> Path:
+        """
+        Return the path of the seeded base environment of an interpreter.
+        """
+        return self.path / 'bases' / interpreter_id(executable)
+
+    def prune_bases(self, executable: str) -> None:
+        """
+        Remove the outdated base environments of an interpreter.
+
+        Nothing is removed while other processes are using the store.
+        """
+        current = self.base(executable)
+        if not current.parent.exists():
+            return
+        interpreter = Path(executable).resolve()
+        with self.lock(blocking=False) as locked:
+            for base in current.parent.iterdir() if locked else []:
+                python = base / 'bin/python'
+                if base != current and not base.name.startswith('.') and (
+                    not python.exists() or python.resolve() == interpreter
+                ):
+                    shutil.rmtree(base)
+
+    @staticmethod
+    def restore(entry: Path, target: Path, link: bool = False) -> None:
+        """
+        Create a virtual environment by copying a store entry (or by hardlinking its files).
+        """
+        if target.exists():
+            shutil.rmtree(target)
+        clone(entry, target, link=link)
+        relocate(target, old=entry, new=target)
+
+    def materialize(self, key: str, target: Path) -> bool:
+        """
+        Create an orb from the store, returning whether the key was present.
+
+        The files of the stored orb are hardlinked (as they are already linked to the objects of
+        the store), so only the relocated files take up additional space.
+        """
+        if not (entry := self.get(key)):
+            return False
+        self.restore(entry, target, link=True)
+        return True
+
+    def deduplicate(self, path: Path) -> int:
+        """
+        Replace the files in a folder with hardlinks to identical files in the object store.
+
+        Returns the number of bytes reclaimed.
+        """
+        reclaimed = 0
+        for root, _, files in os.walk(path):
+            for name in files:
+                file = Path(root) / name
+                file_stat = file.lstat()
+                # Files that are hardlinked are already linked to an object, so they are skipped
+                # without hashing them (or looking up the inodes of the objects)
+                if (
+                    not stat.S_ISREG(file_stat.st_mode) or not file_stat.st_size
+                    or file_stat.st_nlink > 1
+                ):
+                    continue
+                digest = file_digest(file)
+                mode = stat.S_IMODE(file_stat.st_mode)  # hardlinks share their permissions
+                obj = self.objects / digest[:2] / f'{digest[2:]}.{mode:o}'
+                if not obj.exists():
+                    obj.parent.mkdir(parents=True, exist_ok=True)
+                    try:
+                        os.link(file, obj)
+                    except FileExistsError:  # added by another process in the meantime
+                        pass
+                    else:
+                        continue
+                try:
+                    tmp_file = file.with_name(f'.{name}.{os.getpid()}.{threading.get_ident()}')
+                    os.link(obj, tmp_file)
+                    os.replace(tmp_file, file)
+                except OSError:  # e.g. the object store is on a different file system
+                    continue
+                reclaimed += file_stat.st_size
+        return reclaimed
+
+    def prune_entries(self, keys: Set[str]) -> None:
+        """
+        Remove the stored orbs that are not used by any orb anymore (along with the staging
+        folders left behind by interrupted processes).
+
+        Nothing is removed while other processes are using the store.
+
+        Args:
+            keys: The store keys of the orbs that are in use.
+
+        """
+        if not (self.path / 'orbs').exists():
+            return
+        with self.lock(blocking=False) as locked:
+            for entry in (self.path / 'orbs').iterdir() if locked else []:
+                if entry.name not in keys:
+                    shutil.rmtree(entry)
+
+    def prune_objects(self) -> None:
+        """
+        Remove the objects that are no longer used by any orb.
+
+        Nothing is removed while other processes are using the store (the objects are removed
+        the next time instead).
+        """
+        if not self.objects.exists():
+            return
+        with self.lock(blocking=False) as locked:
+            for obj in self.objects.glob('*/*') if locked else []:
+                if obj.stat().st_nlink == 1:
+                    obj.unlink()
@@ -4,7 +4,7 @@ _orb_completions() {
     compopt +o default
 
     # Extracting arguments
-    local path_args=("-r --requirements -e --executable --path")
+    local path_args=("-r --requirements -e --executable --path --archive")
     local args=(${COMP_WORDS[@]})
     local current=${args[${COMP_CWORD}]}
     local last=${args[-1]}
@@ -0,0 +1,77 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List
+
+
+class Timings:
+    def __init__(self) -> None:
+        """
+        Record the wall time of the phases of orb operations.
+        """
+        self.events: List[Dict[str, Any]] = []
+        self._start = time.perf_counter_ns()
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def phase(self, name: str, **args: str) -> Iterator[None]:
+        """
+        Record the wall time of a phase.
+
+        Args:
+            name: The name of the phase.
+            args: Additional information about the phase (e.g. the command executed).
+
+        """
+        start = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            event = {
+                'name': name, 'args': args, 'thread': threading.get_ident(),
+                'start': start - self._start, 'duration': time.perf_counter_ns() - start,
+            }
+            with self._lock:
+                self.events.append(event)
+
+    def summary(self) -> str:
+        """
+        Return a table of the total wall time of each phase and of each command executed.
+        """
+        phases: Dict[str, List[int]] = {}
+        for event in sorted(self.events, key=lambda event: event['start']):
+            phase = phases.setdefault(event['name'], [0, 0])
+            phase[0] += 1
+            phase[1] += event['duration']
+        width = max([len(name) for name in phases] + [5])
+        lines = [f'{"Phase":<{width}}  {"Calls":>5}  {"Time":>9}']
+        lines += [
+            f'{name:<{width}}  {calls:>5}  {duration / 1e9:>8.3f}s'
+            for name, (calls, duration) in phases.items()
+        ]
+        commands = [event for event in self.events if 'command' in event['args']]
+        if commands:
+            lines += ['', f'{"Time":>9}  Command']
+            lines += [
+                f'{event["duration"] / 1e9:>8.3f}s  {event["args"]["command"]}'
+                for event in sorted(commands, key=lambda event: event['start'])
+            ]
+        return '\n'.join(lines)
+
+    def write_trace(self, path: Path) -> None:
+        """
+        Write the recorded phases to a file in the Chrome trace event format.
+        """
+        pid = os.getpid()
+        trace = {
+            'traceEvents': [{
+                'name': event['name'], 'cat': 'pyorbs', 'ph': 'X', 'pid': pid,
+                'tid': event['thread'], 'ts': event['start'] / 1000,
+                'dur': event['duration'] / 1000, 'args': event['args'],
+            } for event in sorted(self.events, key=lambda event: event['start'])],
+            'displayTimeUnit': 'ms',
+        }
+        path.write_text(json.dumps(trace, indent=2) + '\n')
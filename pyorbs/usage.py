@@ -0,0 +1,126 @@
+import os
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set
+
+
+class StorageUsage:
+    def __init__(self, path: Path, keys: Dict[str, Optional[str]]):
+        """
+        The disk space used by an orb storage folder and the space that removing its parts frees.
+
+        Each file is counted once regardless of the number of its hardlinks, and a file is only
+        freed once all of its hardlinks are removed. The files of the object store are freed along
+        with the last file linked to them, while stored orbs are freed along with the last orb
+        made from them.
+
+        Args:
+            path: The orb storage path.
+            keys: The store keys of the current generations of the orbs (by orb name).
+
+        """
+        self.path = path
+        self.keys = keys
+        self.size = 0
+        self._sizes: Dict[int, int] = {}
+        self._links: Dict[int, int] = {}  # the number of the unreleased parts linking to a file
+        self._files: Dict[Path, List[int]] = {}  # the files of the parts of the storage folder
+        self._released: Set[Path] = set()
+        for root, folders, files in os.walk(path):  # symbolic links to orbs are not followed
+            # The parts are only determined for each file in the folders containing the parts
+            root_part = self._part(Path(root))
+            shallow = root_part in (self.path, self.path / '.store')
+            for name in folders + files:
+                part = self._part(Path(root, name)) if shallow else root_part
+                file_stat = os.lstat(os.path.join(root, name))
+                if file_stat.st_ino not in self._sizes:
+                    self._sizes[file_stat.st_ino] = file_stat.st_blocks * 512
+                    self._links[file_stat.st_ino] = 0
+                    self.size += self._sizes[file_stat.st_ino]
+                if part is not None:
+                    self._files.setdefault(part, []).append(file_stat.st_ino)
+                    self._links[file_stat.st_ino] += 1
+        # Objects that are not linked to any other file are removed when pruning the store
+        self.size -= sum(self._sizes[inode] for inode, links in self._links.items() if not links)
+
+    def _part(self, path: Path) -> Optional[Path]:
+        """
+        Return the part of the storage folder that can be removed as a whole (e.g. a generation of
+        an orb or a stored orb) that a path belongs to (or None for the files of the object store).
+        """
+        parts = path.relative_to(self.path).parts
+        if parts[:1] == ('.generations',) and len(parts) >= 3:
+            return self.path.joinpath(*parts[:3])
+        if parts[:1] == ('.store',) and len(parts) >= 3:
+            if parts[1] == 'objects':
+                return None if len(parts) >= 4 else self.path / '.store'
+            return self.path.joinpath(*parts[:3])
+        if parts[:1] == ('.store',):
+            return self.path / '.store'
+        if parts and parts[0] in self.keys:  # orbs made by earlier versions
+            return self.path / parts[0]
+        return self.path
+
+    def generations(self, name: str) -> List[Path]:
+        """
+        Return the generation folders of an orb (including the orb folder of orbs made by earlier
+        versions).
+        """
+        folder = self.path / '.generations' / name
+        return [
+            part for part in self._files
+            if part.parent == folder or part == self.path / name
+        ]
+
+    def freed(self, parts: Iterable[Path]) -> int:
+        """
+        Return the disk space that removing the given parts of the storage folder would free.
+        """
+        links: Dict[int, int] = {}
+        freed = 0
+        for part in set(parts) - self._released:
+            for inode in self._files.get(part, []):
+                links[inode] = links.get(inode, self._links[inode]) - 1
+                if not links[inode]:
+                    freed += self._sizes[inode]
+        return freed
+
+    def release(self, parts: Iterable[Path]) -> int:
+        """
+        Account for the removal of the given parts of the storage folder, returning the disk space
+        freed.
+        """
+        freed = self.freed(parts := set(parts) - self._released)
+        for part in parts:
+            for inode in self._files.get(part, []):
+                self._links[inode] -= 1
+        self._released |= parts
+        self.size -= freed
+        return freed
+
+    def unused(self) -> List[Path]:
+        """
+        Return the stored orbs that are not used by any of the remaining orbs.
+        """
+        keys = {key for name, key in self.keys.items() if key}
+        return [
+            part for part in self._files
+            if part.parent == self.path / '.store/orbs' and part.name not in keys
+        ]
+
+    def orb(self, name: str) -> List[Path]:
+        """
+        Return the parts of the storage folder that are removed along with an orb (i.e. its
+        generations and the stored orb that is not used by any other orb).
+        """
+        key = self.keys.get(name)
+        others = {other_key for other, other_key in self.keys.items() if other != name}
+        stored = [self.path / '.store/orbs' / key] if key and key not in others else []
+        return self.generations(name) + stored
+
+    def remove_orb(self, name: str) -> int:
+        """
+        Account for the removal of an orb, returning the disk space freed.
+        """
+        freed = self.release(self.orb(name))
+        self.keys.pop(name, None)
+        return freed
@@ -0,0 +1,152 @@
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import time
+from pathlib import Path
+from types import TracebackType
+from typing import Any, Dict, Iterable, Optional, Set, Tuple, Type
+
+# Events of files in watched folders (files are often replaced rather than written by editors)
+IN_CLOSE_WRITE, IN_MOVED_FROM, IN_MOVED_TO, IN_CREATE, IN_DELETE = 0x8, 0x40, 0x80, 0x100, 0x200
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+EVENT_HEADER = struct.Struct('iIII')
+Signature = Optional[Tuple[int, int, int]]
+
+
+def _signature(path: Path) -> Signature:
+    try:
+        file_stat = path.stat()
+    except OSError:
+        return None
+    return file_stat.st_mtime_ns, file_stat.st_size, file_stat.st_ino
+
+
+class Watcher:
+    def __init__(self, debounce: float = 0.5, interval: float = 1.0, inotify: bool = True):
+        """
+        Watch files for changes, using inotify when it is available and polling otherwise.
+
+        Waiting for changes does not use any CPU time with inotify, and only a stat call per file
+        and interval when polling.
+
+        Args:
+            debounce: The number of seconds without further changes after which a burst of
+                changes is reported.
+            interval: The number of seconds between polls (when inotify is not available).
+            inotify: Whether to use inotify when it is available.
+
+        """
+        self.debounce = debounce
+        self.interval = interval
+        self._files: Set[Path] = set()
+        self._signatures: Dict[Path, Signature] = {}
+        self._watches: Dict[int, Path] = {}
+        self._libc: Any = None
+        self._fd: Optional[int] = None
+        if inotify:
+            try:
+                self._libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+                fd = self._libc.inotify_init1(os.O_CLOEXEC)
+            except (OSError, AttributeError):  # e.g. not running on Linux
+                fd = -1
+            self._fd = fd if fd >= 0 else None
+
+    @property
+    def inotify(self) -> bool:
+        return self._fd is not None
+
+    def watch(self, files: Iterable[Path]) -> None:
+        """
+        Set the files to watch.
+
+        Changes of files that were already watched which have not been reported yet are kept.
+        """
+        self._files = {Path(os.path.abspath(file)) for file in files}
+        self._signatures = {
+            file: self._signatures[file] if file in self._signatures else _signature(file)
+            for file in self._files
+        }
+        if self._fd is None:
+            return
+        folders = {file.parent for file in self._files}
+        for wd, folder in list(self._watches.items()):
+            if folder not in folders:
+                self._libc.inotify_rm_watch(self._fd, wd)
+                del self._watches[wd]
+        for folder in folders - set(self._watches.values()):
+            if (wd := self._libc.inotify_add_watch(self._fd, bytes(folder), WATCH_MASK)) < 0:
+                self.close()  # e.g. the folder does not exist or the watch limit is reached
+                return
+            self._watches[wd] = folder
+
+    def _poll(self) -> Set[Path]:
+        changed = set()
+        for file in self._files:
+            if (signature := _signature(file)) != self._signatures.get(file):
+                self._signatures[file] = signature
+                changed.add(file)
+        return changed
+
+    def _changes(self, timeout: Optional[float]) -> Set[Path]:
+        """
+        Return the watched files that changed, waiting for changes for the given number of
+        seconds (or indefinitely).
+        """
+        if self._fd is None:
+            deadline = None if timeout is None else time.monotonic() + timeout
+            while not (changed := self._poll()):  # pylint: disable=while-used
+                if deadline is None:
+                    time.sleep(self.interval)
+                elif (remaining := deadline - time.monotonic()) > 0:
+                    time.sleep(min(self.interval, remaining))
+                else:
+                    break
+            return changed
+
+        if not select.select([self._fd], [], [], timeout)[0]:
+            return set()
+        data = os.read(self._fd, 65536)
+        changed = set()
+        offset = 0
+        while offset < len(data):  # pylint: disable=while-used
+            wd, _, _, length = EVENT_HEADER.unpack_from(data, offset)
+            name = data[offset + EVENT_HEADER.size:offset + EVENT_HEADER.size + length]
+            offset += EVENT_HEADER.size + length
+            folder = self._watches.get(wd)
+            if folder and (file := folder / os.fsdecode(name.rstrip(b'\0'))) in self._files:
+                changed.add(file)
+        return changed
+
+    def wait(self) -> Set[Path]:
+        """
+        Wait for changes of the watched files and return the changed files.
+
+        Changes are only reported once no further changes are made for the debounce period, so
+        that a burst of changes (e.g. when switching branches) is reported at once.
+        """
+        changed: Set[Path] = set()
+        while not changed:  # pylint: disable=while-used
+            changed = self._changes(timeout=None)
+        while more := self._changes(timeout=self.debounce):  # pylint: disable=while-used
+            changed |= more
+        return changed
+
+    def close(self) -> None:
+        """
+        Stop using inotify (the files are polled from now on).
+        """
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+            self._watches = {}
+
+    def __enter__(self) -> 'Watcher':
+        return self
+
+    def __exit__(
+        self, exc_type: Optional[Type[BaseException]], exc_value: Optional[BaseException],
+        traceback: Optional[TracebackType],
+    ) -> None:
+        self.close()
@@ -0,0 +1,36 @@
+import json
+import os
+import zipfile
+from pathlib import Path
+
+from pytest_mock import MockerFixture
+
+from benchmarks.corpus import build_wheel
+from benchmarks.run import main
+
+
+def test_build_wheel(tmp_path: Path) -> None:
+    wheel = build_wheel(tmp_path, name='bench-pkg-000', modules=2)
+    assert wheel.name == 'bench_pkg_000-1.0-py3-none-any.whl'
+    with zipfile.ZipFile(wheel) as archive:
+        record = archive.read('bench_pkg_000-1.0.dist-info/RECORD').decode()
+        assert len(record.splitlines()) == len(archive.namelist())
+
+
+def test_main(mocker: MockerFixture, tmp_path: Path) -> None:
+    mocker.patch.dict(os.environ)
+    output = tmp_path / 'results.json'
+    args = ['--quick', '--repeat', '2', '-k', '^(hash|lockfile|list)', '--output', str(output)]
+    assert main(args) == 0
+    results = json.loads(output.read_text())
+    assert set(results['benchmarks']) == {
+        'hash_deep_chain', 'hash_deep_chain_cached', 'hash_wide_fanout',
+        'hash_wide_fanout_cached', 'lockfile_test', 'lockfile_test_cached', 'list_orbs',
+    }
+    assert len(results['benchmarks']['list_orbs']['times']) == 2
+
+    assert main(['--quick', '-n', '1', '-k', 'list_orbs', '--compare', str(output)]) == 0
+
+
+def test_main_errors() -> None:
+    assert main(['-k', 'missing']) == 'Error: There are no benchmarks matching "missing"'
@@ -4,7 +4,7 @@ from shutil import copyfile
 from subprocess import CompletedProcess, run
 from typing import List, Optional, Protocol
 
-from pytest import FixtureRequest, fixture
+from pytest import FixtureRequest, TempPathFactory, fixture
 from pytest_mock import MockerFixture
 
 from pyorbs.shell import SHELL_TYPES, which
@@ -18,10 +18,14 @@ class OrbFixture(Protocol):  # pylint: disable=too-few-public-methods
 
 
 @fixture(params=SHELL_TYPES)
-def orb(mocker: MockerFixture, request: FixtureRequest, tmp_path: Path) -> OrbFixture:
+def orb(
+    mocker: MockerFixture, request: FixtureRequest,
+    tmp_path: Path, tmp_path_factory: TempPathFactory,
+) -> OrbFixture:
     mocker.patch.dict(os.environ, {
         'SHELL': SHELL[request.param],
         'PYORBS_DEFAULT_REQUIREMENTS': '',
+        'XDG_CACHE_HOME': str(tmp_path_factory.mktemp('cache')),
     })
 
     def run_orb(args: List[str], check: bool = True) -> 'CompletedProcess[str]':
@@ -63,3 +67,13 @@ def tmp_requirements(
         original = Path(requirements(version=version, lock=lock))
         return str(copyfile(original, (path or tmp_path) / original.name))
     return tmp_requirements_path
+
+
+def add_package(path: Path, name: str, version: str, editable: bool = False) -> None:
+    dist_info = path / f'lib/python3.8/site-packages/{name}-{version}.dist-info'
+    dist_info.mkdir(parents=True)
+    metadata = f'Metadata-Version: 2.1\nName: {name}\nVersion: {version}\n'
+    (dist_info / 'METADATA').write_text(metadata, encoding='utf-8')
+    if editable:
+        direct_url = '{"dir_info": {"editable": true}}'
+        (dist_info / 'direct_url.json').write_text(direct_url, encoding='utf-8')
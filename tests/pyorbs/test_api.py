@@ -0,0 +1,100 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from subprocess import CompletedProcess
+from typing import Any
+
+from pytest import CaptureFixture, raises
+from pytest_mock import MockerFixture
+
+from pyorbs.api import Orbs
+from pyorbs.errors import CommandError, LockfileError, OrbError, OrbNotFoundError
+from tests.pyorbs.conftest import RequirementsFixture, add_package
+
+
+def execute(command: str, **_kwargs: Any) -> 'CompletedProcess[str]':
+    if 'pip freeze' in command:
+        return CompletedProcess([], returncode=0, stdout='six==1.16.0\n')
+    return CompletedProcess([], returncode=0, stdout='', stderr='')
+
+
+def test_orbs(
+    mocker: MockerFixture, capsys: CaptureFixture[str], requirements: RequirementsFixture,
+    tmp_path: Path,
+) -> None:
+    mocker.patch.dict(os.environ, {'SHELL': 'bash', 'XDG_CACHE_HOME': str(tmp_path / 'cache')})
+    mocker.patch('pyorbs.orb.execute', side_effect=execute)
+    orbs = Orbs(path=tmp_path / 'orbs', store=False)
+
+    # Orbs can be made concurrently
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        results = list(executor.map(
+            lambda name: orbs.make(name=name, requirements=Path(requirements())),
+            ['first', 'second', 'third', 'fourth'],
+        ))
+    assert [result.orb.name for result in results] == ['first', 'second', 'third', 'fourth']
+    assert results[0].orb.path == tmp_path / 'orbs/first'
+    assert results[0].orb.requirements == Path(requirements())
+    assert results[0].orb.lockfile_hash
+    assert results[0].duration > 0
+    assert 'Orb "first" is ready for use' in results[0].output
+    assert not capsys.readouterr().out  # messages are not printed
+    assert [orb.name for orb in orbs.list()] == ['first', 'fourth', 'second', 'third']
+
+    add_package(tmp_path / 'orbs/first', name='six', version='1.16.0')
+    result = orbs.update(name='first', requirements=Path(requirements()))
+    assert result.orb.created == results[0].orb.created
+    orbs.destroy(name='first')
+    assert [orb.name for orb in orbs.list()] == ['fourth', 'second', 'third']
+
+
+def test_orbs_requirements(
+    mocker: MockerFixture, requirements: RequirementsFixture, tmp_path: Path,
+) -> None:
+    mocker.patch.dict(os.environ, {'SHELL': 'bash', 'XDG_CACHE_HOME': str(tmp_path / 'cache')})
+    mocker.patch('pyorbs.orb.execute', side_effect=execute)
+    orbs = Orbs(path=tmp_path / 'orbs', store=False)
+
+    statuses = orbs.test(requirements=Path(requirements('changed')))
+    assert [(status.outdated, status.changed) for status in statuses] == [(True, True)]
+    assert 'is outdated' in statuses[0].status
+
+    (path := tmp_path / 'requirements.txt').write_text('six\n')
+    frozen = orbs.freeze(requirements=path)
+    assert [(result.lockfile, result.frozen) for result in frozen] == [
+        (tmp_path / 'requirements.txt.lock', True),
+    ]
+    assert frozen[0].lockfile_hash
+    assert frozen[0].duration > 0
+    unchanged = orbs.freeze(requirements=path)[0]
+    assert not unchanged.frozen and not unchanged.duration  # already up-to-date
+    assert not orbs.test(requirements=path)[0].changed
+
+
+def test_orbs_errors(
+    mocker: MockerFixture, requirements: RequirementsFixture, tmp_path: Path,
+) -> None:
+    mocker.patch.dict(os.environ, {'SHELL': 'bash', 'XDG_CACHE_HOME': str(tmp_path / 'cache')})
+    mocker.patch('pyorbs.orb.execute', side_effect=execute)
+    orbs = Orbs(path=tmp_path / 'orbs', store=False)
+
+    with raises(OrbNotFoundError, match='Unknown orb name "missing"'):
+        orbs.update(name='missing', requirements=Path(requirements()))
+    with raises(LockfileError, match='is outdated'):
+        orbs.make(name='test', requirements=Path(requirements('changed')))
+    with raises(OrbError, match='Unknown orb name'):
+        orbs.destroy(name='missing')
+    with raises(OrbError, match='Invalid orb name "--list"'):
+        orbs.make(name='--list')
+    with raises(OrbError, match='Invalid optimization level "3"'):
+        Orbs(path=tmp_path, optimize=3)
+    with raises(OrbError, match='Command "-x" not found'):  # options are not parsed
+        orbs.make(name='test', requirements=Path(requirements()), executable='-x')
+
+    # The output of failed commands is available
+    mocker.patch('pyorbs.orb.execute', return_value=CompletedProcess(
+        [], returncode=1, stdout='Broken interpreter\n', stderr='',
+    ))
+    with raises(CommandError, match='Unable to create virtual environment') as error:
+        orbs.make(name='test', requirements=Path(requirements()))
+    assert error.value.output == 'Broken interpreter'
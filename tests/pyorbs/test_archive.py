@@ -0,0 +1,103 @@
+import os
+import sys
+import tarfile
+from io import BytesIO
+from pathlib import Path
+
+from pytest import MonkeyPatch, mark, raises
+from pytest_mock import MockerFixture
+
+from pyorbs.archive import export_orb, import_orb, read_metadata
+from tests.pyorbs.test_store import make_venv
+
+
+def test_export_import(tmp_path: Path) -> None:
+    orb = make_venv(tmp_path / 'old/orb')
+    (orb / 'lib').mkdir()
+    (orb / 'lib/module.py').write_text('value = 1\n')
+    os.link(orb / 'lib/module.py', orb / 'lib/copy.py')
+    archive = tmp_path / 'orb.tar.gz'
+    export_orb(orb=orb, archive=archive, name='test', lockfile_hash='abc')
+
+    metadata = read_metadata(archive)
+    assert metadata['name'] == 'test'
+    assert metadata['path'] == str(orb)
+    assert metadata['lockfile_hash'] == 'abc'
+    assert metadata['interpreter']['executable'] == sys.executable
+    with tarfile.open(archive) as tar:
+        assert tar.getmember('lib/module.py').islnk()  # hardlinked files are only stored once
+
+    target = tmp_path / 'new/orb'
+    target.mkdir(parents=True)
+    assert import_orb(archive=archive, target=target) == metadata
+    assert (target / 'bin/activate').read_text() == f'VIRTUAL_ENV="{target}"\n'
+    assert (target / 'bin/pip').read_text() == f'#!{target}/bin/python\n'
+    assert os.readlink(target / 'bin/python') == sys.executable
+    assert (target / 'lib/copy.py').stat().st_nlink == 2
+
+
+def test_import_incompatible(mocker: MockerFixture, tmp_path: Path) -> None:
+    orb = make_venv(tmp_path / 'orb')
+    archive = tmp_path / 'orb.tar.gz'
+    export_orb(orb=orb, archive=archive, name='test')
+
+    mocker.patch('pyorbs.archive.interpreter_info', return_value={
+        'python': '2.7.18', 'platform': 'linux-x86_64',
+    })
+    (target := tmp_path / 'incompatible').mkdir()
+    with raises(ValueError, match=r'not compatible with the orb \(Python 2\.7\.18'):
+        import_orb(archive=archive, target=target)
+
+    # Orbs can only be imported where their interpreter is available
+    (orb / 'bin/python').unlink()
+    (orb / 'bin/python').symlink_to(tmp_path / 'missing')
+    export_orb(orb=orb, archive=archive, name='test')
+    (target := tmp_path / 'missing_interpreter').mkdir()
+    with raises(ValueError, match=f'"{tmp_path / "missing"}" is not available'):
+        import_orb(archive=archive, target=target)
+
+
+def test_import_invalid(tmp_path: Path) -> None:
+    archive = tmp_path / 'orb.tar.gz'
+    with tarfile.open(archive, 'w:gz') as tar:
+        tar.add(make_venv(tmp_path / 'orb'), arcname='orb')
+    with raises(ValueError, match='Invalid orb archive'):
+        read_metadata(archive)
+    with raises(ValueError, match='Invalid orb archive'):
+        read_metadata(tmp_path / 'missing.tar.gz')
+
+
+
+@mark.parametrize('name, member_type, linkname', [
+    ('../outside.py', tarfile.REGTYPE, ''),
+    ('/tmp/absolute.py', tarfile.REGTYPE, ''),
+    ('link/outside.py', tarfile.REGTYPE, ''),  # extracted through a symbolic link
+    ('hardlink.py', tarfile.LNKTYPE, '/etc/passwd'),
+    ('hardlink.py', tarfile.LNKTYPE, '../outside.py'),
+    ('device', tarfile.CHRTYPE, ''),
+])
+def test_import_unfiltered(  # pylint: disable=too-many-arguments
+    monkeypatch: MonkeyPatch, tmp_path: Path, name: str, member_type: bytes, linkname: str,
+) -> None:
+    # Members are checked when extraction filters are not available (before Python 3.8.17)
+    monkeypatch.delattr(tarfile, 'tar_filter')
+    orb = make_venv(tmp_path / 'orb')
+    (orb / 'link').symlink_to(tmp_path)
+    (tmp_path / 'outside.py').write_text('outside = True\n')
+    archive = tmp_path / 'orb.tar.gz'
+    export_orb(orb=orb, archive=archive, name='test')
+    with tarfile.open(archive) as tar:
+        contents = [
+            (info, tar.extractfile(info).read() if info.isreg() else b'')  # type: ignore[union-attr]
+            for info in tar.getmembers()
+        ]
+    member = tarfile.TarInfo(name)
+    member.type, member.linkname = member_type, linkname
+    with tarfile.open(archive, 'w:gz') as tar:
+        for info, content in [*contents, (member, b'')]:
+            tar.addfile(info, BytesIO(content) if info.isreg() else None)
+
+    (target := tmp_path / 'target').mkdir()
+    with raises(ValueError, match='Invalid orb archive'):
+        import_orb(archive=archive, target=target)
+    assert (tmp_path / 'outside.py').read_text() == 'outside = True\n'
@@ -0,0 +1,68 @@
+import os
+from pathlib import Path
+
+from pytest import raises
+
+from pyorbs.generations import Generations
+
+
+def make_generation(generation: Path, version: str) -> None:
+    (generation / 'bin').mkdir(parents=True, exist_ok=True)
+    (generation / 'bin/activate').write_text(f'VIRTUAL_ENV="{generation}"\n')
+    (generation / 'version').write_text(version)
+
+
+def test_generations(tmp_path: Path) -> None:
+    generations = Generations(path=tmp_path, name='test', keep=1)
+    assert generations.current is None
+    assert generations.previous() is None
+    generations.prune()
+
+    for version in ('1', '2', '3'):
+        with generations.build() as generation:
+            make_generation(generation, version)
+        assert (tmp_path / 'test/version').read_text() == version
+    assert os.readlink(tmp_path / 'test') == '.generations/test/3'
+    assert generations.numbers() == [2, 3]  # one previous generation is kept
+
+    with raises(RuntimeError), generations.build() as generation:
+        make_generation(generation, '4')
+        raise RuntimeError('Unable to install requirements')
+    assert generations.numbers() == [2, 3]
+    assert (tmp_path / 'test/version').read_text() == '3'
+
+    previous = generations.previous()
+    assert previous == generations.generation(2)
+    generations.switch(previous)
+    assert (tmp_path / 'test/version').read_text() == '2'
+    assert generations.previous() is None
+
+    generations.remove()
+    assert not (tmp_path / 'test').exists()
+    assert not generations.folder.exists()
+
+
+def test_generations_legacy(tmp_path: Path) -> None:
+    legacy = tmp_path / 'test'
+    make_generation(legacy, 'legacy')
+    generations = Generations(path=tmp_path, name='test')
+    assert generations.current == legacy
+    assert generations.previous() is None
+
+    with generations.build() as generation:
+        generations.copy(source=legacy, target=generation)
+        assert (generation / 'bin/activate').read_text() == f'VIRTUAL_ENV="{generation}"\n'
+        assert (generation / 'version').stat().st_ino == (legacy / 'version').stat().st_ino
+    assert generations.current == generations.generation(1)
+    assert generations.previous() == generations.generation(0)
+
+    # Orbs made by earlier versions are kept as the initial generation
+    activate = generations.generation(0) / 'bin/activate'
+    assert activate.read_text() == f'VIRTUAL_ENV="{generations.generation(0)}"\n'
+
+    generations.remove()
+    assert not legacy.exists()
+
+    make_generation(legacy, 'legacy')
+    generations.remove()
+    assert not legacy.exists()
@@ -0,0 +1,82 @@
+import os
+from pathlib import Path
+
+from pyorbs.index import OrbIndex, disk_usage, python_version
+
+
+def test_python_version(tmp_path: Path) -> None:
+    assert python_version(tmp_path) is None
+    (tmp_path / 'pyvenv.cfg').write_text('home = /usr/bin\nversion = 3.11.7\n')
+    assert python_version(tmp_path) == '3.11.7'
+    (tmp_path / 'pyvenv.cfg').write_text('home = /usr/bin\nversion_info = 3.12.1.final.0\n')
+    assert python_version(tmp_path) == '3.12.1.final.0'
+
+
+def test_disk_usage(tmp_path: Path) -> None:
+    (tmp_path / 'file').write_bytes(b'0' * 10000)
+    usage = disk_usage(tmp_path)
+    assert usage >= 10000
+    os.link(tmp_path / 'file', tmp_path / 'link')
+    assert disk_usage(tmp_path) == usage
+
+
+def test_orb_index(tmp_path: Path) -> None:
+    orb = tmp_path / 'orb'
+    orb.mkdir()
+    (orb / 'pyvenv.cfg').write_text('version = 3.11.7\n')
+    lockfile = tmp_path / 'requirements.txt.lock'
+    lockfile.write_text('pip==23.0\n')
+
+    index = OrbIndex(tmp_path / 'index.json')
+    assert not index.orbs
+    index.index(name='orb', orb=orb, requirements=tmp_path / 'requirements.txt', lockfile=lockfile)
+    index.activated('orb')
+    index.save()
+
+    entry = OrbIndex(tmp_path / 'index.json').orbs['orb']
+    assert entry['python'] == '3.11.7'
+    assert entry['requirements'] == str(tmp_path / 'requirements.txt')
+    assert len(entry['lockfile_hash']) == 64
+    assert entry['activated'] >= entry['created']
+
+    # Updating keeps the creation and activation times
+    index.index(name='orb', orb=orb, requirements=None, lockfile=None, update=True)
+    assert index.orbs['orb']['created'] == entry['created']
+    assert index.orbs['orb']['activated'] == entry['activated']
+    assert index.orbs['orb']['lockfile_hash'] is None
+    index.index(name='orb', orb=orb, requirements=None, lockfile=None)
+    assert index.orbs['orb']['activated'] is None
+
+    index.remove('orb')
+    index.save()
+    assert not OrbIndex(tmp_path / 'index.json').orbs
+
+    (tmp_path / 'index.json').write_text('invalid')
+    assert not OrbIndex(tmp_path / 'index.json').orbs
+
+
+def test_orb_index_concurrent_changes(tmp_path: Path) -> None:
+    first, second = OrbIndex(tmp_path / 'index.json'), OrbIndex(tmp_path / 'index.json')
+    assert not first.orbs and not second.orbs
+    first.activated('first')
+    second.activated('second')
+    first.save()
+    second.save()
+    assert set(OrbIndex(tmp_path / 'index.json').orbs) == {'first', 'second'}
+    first.remove('second')
+    first.save()
+    assert set(first.orbs) == {'first'}
+
+
+def test_orb_index_activations(tmp_path: Path) -> None:
+    index = OrbIndex(tmp_path / 'index.json')
+    assert not index.collect_activations(tmp_path / 'activations')
+    (activations := tmp_path / 'activations').mkdir()
+    (activations / 'orb').touch()
+    (activations / 'unknown').touch()
+    os.utime(activations / 'orb', (1000, 1000))
+    index.activated('orb', timestamp=500)
+    assert index.collect_activations(activations)
+    assert index.orbs['orb']['activated'] == 1000
+    assert 'unknown' not in index.orbs
+    assert not index.collect_activations(activations)  # already recorded
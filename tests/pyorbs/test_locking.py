@@ -0,0 +1,52 @@
+import threading
+from pathlib import Path
+from typing import List
+
+from pyorbs.locking import file_lock, write_file
+
+
+def test_file_lock(tmp_path: Path) -> None:
+    lock = tmp_path / 'locks/test.lock'
+    with file_lock(lock) as locked:
+        assert locked and lock.exists()
+        with file_lock(lock, blocking=False) as locked:
+            assert not locked
+        with file_lock(lock, shared=True, blocking=False) as locked:
+            assert not locked
+
+    with file_lock(lock, shared=True), file_lock(lock, shared=True, blocking=False) as locked:
+        assert locked
+        with file_lock(lock, blocking=False) as locked:
+            assert not locked
+
+
+def test_file_lock_wait(tmp_path: Path) -> None:
+    lock = tmp_path / 'test.lock'
+    events: List[str] = []
+    acquired = threading.Event()
+
+    def hold_lock() -> None:
+        with file_lock(lock):
+            acquired.set()
+            events.append('released')
+
+    with file_lock(lock):
+        thread = threading.Thread(target=hold_lock)
+        thread.start()
+        assert not acquired.wait(timeout=0.1)
+        events.append('releasing')
+    thread.join()
+    assert events == ['releasing', 'released']
+
+    with file_lock(lock, on_wait=lambda: events.append('waiting')):
+        pass
+    assert events == ['releasing', 'released']
+
+
+def test_write_file(tmp_path: Path) -> None:
+    (file := tmp_path / 'file').write_text('original')
+    (link := tmp_path / 'link').hardlink_to(file)
+    write_file(file, 'changed')
+    assert file.read_text() == 'changed'
+    assert link.read_text() == 'original'
+    assert sorted(path.name for path in tmp_path.iterdir()) == ['file', 'link']
@@ -1,15 +1,23 @@
+import json
 import os
 import re
+import sys
+import time
 from pathlib import Path
-from subprocess import CompletedProcess
+from shutil import copyfile, rmtree
+from subprocess import CompletedProcess, run
 from types import SimpleNamespace
+from typing import Any, List, Set
 
-from pytest import MonkeyPatch, raises
+from pytest import CaptureFixture, MonkeyPatch, mark, raises
 from pytest_mock import MockerFixture
 
+from pyorbs.generations import Generations
 from pyorbs.orb import Orb, action, main
-from pyorbs.shell import current_shell_type
-from tests.pyorbs.conftest import OrbFixture, RequirementsFixture
+from pyorbs.requirements import Requirements
+from pyorbs.shell import current_shell_type, which
+from pyorbs.store import Store, interpreter_id
+from tests.pyorbs.conftest import OrbFixture, RequirementsFixture, add_package
 
 
 def assert_lockfiles_equal(file_1: str, file_2: str) -> None:
@@ -81,11 +89,186 @@ def test_list_and_info(orb: OrbFixture, requirements: RequirementsFixture, tmp_p
     assert 'test_orb' in orb(['-l']).stdout
     orb(['test_orb'])  # activate
     assert 'test_orb *' in orb(['-l']).stdout
+    assert re.search(r'^test_orb \* +3\.[0-9.]+ +[0-9.]+ [kMG]B ', orb(['-l', '--long']).stdout,
+                     re.MULTILINE)
     assert 'test_orb' in orb(['test_orb', '-i']).stdout
     orb(['-d', 'test_orb'])  # destroy
     assert 'no orbs' in orb(['-l']).stdout
 
 
+def test_list_long(
+    mocker: MockerFixture, capsys: CaptureFixture[str], tmp_path: Path,
+) -> None:
+    mocker.patch.dict(os.environ, {'SHELL': 'bash'})
+    mocker.patch('pyorbs.orb.execute', return_value=CompletedProcess([], returncode=0))
+    Orb(args=['-l', '--long', '--path', str(tmp_path)]).act()
+    assert capsys.readouterr().out == 'There are no orbs\n'
+
+    for name in ('first', 'second'):
+        (tmp_path / name / 'bin').mkdir(parents=True)
+        (tmp_path / name / 'bin/activate_orb.bash').touch()
+        (tmp_path / name / 'pyvenv.cfg').write_text('version = 3.11.7\n')
+    Orb(args=['-g', 'first', '--path', str(tmp_path)]).act()
+    Orb(args=['second', '-c', 'true', '--path', str(tmp_path)]).act()
+    Orb(args=['-l', '--long', '--path', str(tmp_path)]).act()  # indexing unknown orbs
+    capsys.readouterr()
+    mocker.patch('pyorbs.index.disk_usage', side_effect=AssertionError('Orbs must not be scanned'))
+    Orb(args=['-l', '--long', '--path', str(tmp_path)]).act()
+    lines = capsys.readouterr().out.splitlines()
+    assert lines[0].split() == ['Name', 'Python', 'Size', 'Created', 'Activated', 'Requirements']
+    assert lines[1].startswith('first *  3.11.7')
+    assert lines[2].startswith('second   3.11.7')
+    date = '[0-9]{4}-[0-9]{2}-[0-9]{2} [0-9]{2}:[0-9]{2}'
+    assert all(re.search(f'{date} +{date} +-$', line) for line in lines[1:])  # activated
+
+    Orb(args=['-d', 'first', '--path', str(tmp_path)]).act()
+    assert set(json.loads((tmp_path / '.index.json').read_text())) == {'second'}
+
+
+def test_info(mocker: MockerFixture, capsys: CaptureFixture[str], tmp_path: Path) -> None:
+    mocker.patch.dict(os.environ, {'XDG_CACHE_HOME': str(tmp_path / 'cache')})
+    index = tmp_path / 'index'
+    (index / 'six').mkdir(parents=True)
+    (index / 'six/index.html').write_text('<a href="six-1.17.0.tar.gz">six-1.17.0.tar.gz</a>')
+    orbs = tmp_path / 'orbs'
+    add_package(orbs / 'first', 'six', '1.16.0')
+    add_package(orbs / 'second', 'six', '1.17.0')
+    args = ['--path', str(orbs), '--index-url', str(index)]
+    Orb(args=['-i', '--all', '--path', str(tmp_path / 'empty')]).act()
+    assert capsys.readouterr().out == 'There are no orbs\n'
+
+    Orb(args=['-i', '--all'] + args).act()
+    assert capsys.readouterr().out == (
+        'Orb "first"\n\nPackage  Version  Latest\nsix      1.16.0   1.17.0\n\n'
+        'Orb "second"\n\nAll packages are up-to-date\n'
+    )
+    assert (tmp_path / 'cache/pyorbs/index.json').exists()
+
+    # The cached index snapshot is used
+    (index / 'six/index.html').write_text('<a href="six-1.18.0.tar.gz">six-1.18.0.tar.gz</a>')
+    Orb(args=['-i', 'second'] + args).act()
+    assert 'All packages are up-to-date' in capsys.readouterr().out
+    Orb(args=['-i', 'second', '--index-ttl', '0'] + args).act()
+    assert '1.18.0' in capsys.readouterr().out
+
+    # The index URLs of the lockfile of an orb are used by default
+    (other := tmp_path / 'other/six').mkdir(parents=True)
+    (other / 'index.html').write_text('<a href="six-2.0.0.tar.gz">six-2.0.0.tar.gz</a>')
+    (tmp_path / 'requirements.txt').write_text('six\n')
+    (tmp_path / 'requirements.txt.lock').write_text(f'--index-url {other.parent}\nsix==1.16.0\n')
+    (orbs / '.index.json').write_text(json.dumps({
+        'first': {'requirements': str(tmp_path / 'requirements.txt')},
+    }))
+    Orb(args=['-i', 'first', '--path', str(orbs)]).act()
+    assert '2.0.0' in capsys.readouterr().out
+    Orb(args=['-i', 'first'] + args).act()  # unless an index URL is given
+    assert '1.18.0' in capsys.readouterr().out
+
+
+def test_gc(
+    monkeypatch: MonkeyPatch, capsys: CaptureFixture[str], tmp_path: Path,
+) -> None:
+    monkeypatch.setenv('PYORBS_CURRENT_ORB', 'current')
+    now = time.time()
+    index = {}
+    for age, name in enumerate(['new', 'current', 'shiny', 'old', 'oldest']):
+        (tmp_path / name / 'bin').mkdir(parents=True)
+        (tmp_path / name / 'file').write_bytes(os.urandom(1000 ** 2))
+        used = now - (age * 10 + 1) * 86400
+        index[name] = {'created': used, 'updated': used, 'activated': None}
+    index['new']['activated'] = now
+    (tmp_path / '.index.json').write_text(json.dumps(index))
+    # The previous generations of orbs and the stored orbs are taken into account
+    generations = Generations(path=tmp_path, name='new')
+    with generations.build() as generation:
+        (generation / 'file').write_bytes(os.urandom(1000 ** 2))
+    (tmp_path / 'old/pyorbs.json').write_text(json.dumps({'build': 'old'}))
+    (stored := tmp_path / '.store/orbs/old').mkdir(parents=True)
+    (stored / 'file').hardlink_to(tmp_path / 'old/file')
+    (unused := tmp_path / '.store/orbs/unused').mkdir()
+    (unused / 'file').write_bytes(os.urandom(1000 ** 2))
+    args = ['--gc', '--path', str(tmp_path)]
+    Orb(args=['--glow', 'shiny', '--path', str(tmp_path)]).act()
+    capsys.readouterr()
+
+    with raises(ValueError, match='maximum size or age'):
+        Orb(args=args).act()
+
+    Orb(args=args + ['--max-size', '3.5MB', '--dry-run']).act()
+    output = capsys.readouterr().out
+    assert 'Would remove the previous generations of orb "new" (1.0 MB)' in output
+    assert re.findall('Would destroy orb "([a-z]+)"', output) == ['oldest', 'old']
+    assert re.search(r'2 orbs would be destroyed \(3\.[0-9] MB remaining\)', output)
+    assert all((tmp_path / name).exists() for name in index)
+    assert generations.previous() and unused.exists()
+
+    monkeypatch.setenv('PYORBS_GC_MAX_AGE', '35')
+    Orb(args=args).act()
+    output = capsys.readouterr().out
+    assert re.findall('Destroying orb "([a-z]+)"', output) == ['oldest']
+    assert 'previous generations' not in output
+    assert not (tmp_path / 'oldest').exists()
+    assert not unused.exists() and stored.exists()
+
+    with Generations(path=tmp_path, name='old').lock():  # being updated by another process
+        Orb(args=args + ['--max-size', '0']).act()
+    output = capsys.readouterr().out
+    assert 'Removing the previous generations of orb "new" (1.0 MB)' in output
+    assert re.findall('Destroying orb "([a-z]+)"', output) == ['old', 'new']
+    assert 'Orb "old" is in use by another process and is kept' in output
+    assert 'exceed the maximum size' in output
+    assert sorted(json.loads((tmp_path / '.index.json').read_text())) == [
+        'current', 'old', 'shiny',
+    ]
+
+    Orb(args=args + ['--max-age', '1000']).act()
+    assert 'No orbs were destroyed' in capsys.readouterr().out
+
+
+STARTUP_BUDGET = 0.075  # seconds over starting a bare interpreter
+STARTUP_SCRIPT = """
+import sys
+from pyorbs import orb
+orb.execute = lambda **kwargs: None  # the shell is not started when activating
+orb.Orb(sys.argv[1:]).act()
+print(" ".join(sorted(sys.modules)))
+"""
+
+
+@mark.parametrize('args', [['-a', 'test'], ['-g', 'test'], ['-l']])
+def test_startup(args: List[str], tmp_path: Path) -> None:
+    # Activating, glowing and listing orbs must be fast, so they must not import the modules
+    # needed for making orbs only (the time includes building the argument parser)
+    (tmp_path / 'test/bin').mkdir(parents=True)
+    (tmp_path / 'test/bin/activate_orb.bash').touch()
+    env = {
+        key: value for key, value in os.environ.items()
+        if key not in ('PYORBS_CURRENT_ORB', 'PYTHONDONTWRITEBYTECODE')
+    }
+    env.update({'SHELL': 'bash', 'PYTHONPYCACHEPREFIX': str(tmp_path / 'pycache')})
+
+    def duration(*python_args: str) -> float:
+        # The fastest run is used to avoid failures due to a busy machine (and the first run
+        # writes the bytecode caches)
+        durations = []
+        for _ in range(5):
+            start = time.perf_counter()
+            run([sys.executable, *python_args], capture_output=True, check=True, env=env)  # nosec
+            durations.append(time.perf_counter() - start)
+        return min(durations)
+
+    script_args = ['-c', STARTUP_SCRIPT, *args, '--path', str(tmp_path)]
+    modules = run(  # nosec: used for tests
+        [sys.executable, *script_args], capture_output=True, text=True, check=True, env=env,
+    ).stdout.split()
+    heavy_modules = {
+        'concurrent.futures', 'hashlib', 'importlib.metadata', 'json', 'subprocess', 'tempfile',
+        'threading', 'urllib.request', 'pyorbs.generations', 'pyorbs.index', 'pyorbs.outdated',
+        'pyorbs.packages', 'pyorbs.requirements', 'pyorbs.store',
+    }
+    assert not set(modules) & heavy_modules
+    assert duration(*script_args) - duration('-c', 'pass') < STARTUP_BUDGET
+
 def test_make(
     orb: OrbFixture, requirements: RequirementsFixture,
     tmp_path: Path, tmp_requirements: RequirementsFixture,
@@ -139,10 +322,426 @@ def test_make_errors(
     )
 
 
+@mark.parametrize('value', ['3', 'yes', ''])
+def test_invalid_optimize(monkeypatch: MonkeyPatch, value: str) -> None:
+    monkeypatch.setenv('PYORBS_OPTIMIZE', value)
+    assert main(['-l']) == (
+        f'Error: Invalid optimization level "{value}" in $PYORBS_OPTIMIZE (must be 0, 1 or 2)'
+    )
+
+
 def test_make_venv_error(mocker: MockerFixture, tmp_path: Path) -> None:
     mocker.patch('pyorbs.orb.execute', return_value=SimpleNamespace(returncode=1))
     with raises(RuntimeError, match='Unable to create virtual environment'):
-        Orb().make(name='test', path=tmp_path)
+        Orb(args=['--path', str(tmp_path)]).make(name='test', path=tmp_path)
+    assert not list((tmp_path / '.store/bases').iterdir())  # the staging folder is not committed
+    with raises(RuntimeError, match='Unable to create virtual environment'):
+        Orb(args=['--no-store']).make(name='test', path=tmp_path)
+
+
+def test_make_store(
+    mocker: MockerFixture, capsys: CaptureFixture[str],
+    requirements: RequirementsFixture, tmp_path: Path,
+) -> None:
+    mocker.patch.dict(os.environ, {'SHELL': 'bash'})
+    execute = mocker.patch('pyorbs.orb.execute')
+    key = Store.key(lockfile=Path(requirements(lock=True)), executable=which(sys.executable))
+    (tmp_path / '.store/orbs' / key / 'bin').mkdir(parents=True)
+    Orb(args=['-m', 'test', '-r', requirements(), '--path', str(tmp_path)]).act()
+    execute.assert_not_called()
+    assert (tmp_path / 'test/bin/activate_orb.bash').exists()
+    assert 'Using orb from the store' in capsys.readouterr().out
+    Orb(args=['-l', '--path', str(tmp_path)]).act()
+    assert capsys.readouterr().out == 'test\n'  # the store is not listed
+
+    # Stored orbs are removed once they are not used by any orb
+    Orb(args=['-d', 'test', '--path', str(tmp_path)]).act()
+    assert not (tmp_path / '.store/orbs' / key).exists()
+
+
+def test_make_packaging_tools(mocker: MockerFixture, tmp_path: Path) -> None:
+    def execute(command: str, **_kwargs: Any) -> 'CompletedProcess[str]':
+        stdout = 'six==1.16.0\n' if 'pip freeze' in command else ''
+        return CompletedProcess([], returncode=0, stdout=stdout)
+
+    mocker.patch.dict(os.environ, {'SHELL': 'bash'})
+    execute_mock = mocker.patch('pyorbs.orb.execute', side_effect=execute)
+    (Store(tmp_path / '.store').base(which(sys.executable)) / 'bin').mkdir(parents=True)
+    (requirements := tmp_path / 'requirements.txt').write_text('six\n')
+    args = ['-r', str(requirements), '--path', str(tmp_path)]
+
+    # The packaging tools of the base environment are upgraded unless pinned by the lockfile
+    for name, upgraded in (('first', True), ('second', False)):
+        execute_mock.reset_mock()
+        rmtree(tmp_path / '.store/orbs', ignore_errors=True)
+        Orb(args=['-m', name] + args).act()
+        commands = [call.kwargs['command'] for call in execute_mock.call_args_list]
+        assert any('--upgrade pip setuptools wheel' in command for command in commands) == upgraded
+
+
+def test_make_wheelhouse(
+    mocker: MockerFixture, requirements: RequirementsFixture, tmp_path: Path,
+) -> None:
+    mocker.patch.dict(os.environ, {'SHELL': 'bash'})
+    execute = mocker.patch('pyorbs.orb.execute', return_value=CompletedProcess([], returncode=0))
+    (tmp_path / 'test/bin').mkdir(parents=True)
+    args = ['-m', 'test', '-r', requirements(), '--path', str(tmp_path), '--no-store']
+    wheels = tmp_path / '.store/wheels'
+
+    Orb(args=args + ['--wheelhouse']).act()
+    assert f'--wheel-dir "{wheels}"' in execute.call_args.kwargs['command']
+
+    execute.reset_mock()
+    Orb(args=args + ['--offline']).act()
+    commands = [call.kwargs['command'] for call in execute.call_args_list]
+    assert all(
+        f'--no-index --find-links "{wheels}"' in command
+        for command in commands[1:] if not command.endswith('pip check')
+    )
+    assert not any('--wheel-dir' in command for command in commands)
+
+
+def test_build(mocker: MockerFixture, capsys: CaptureFixture[str], tmp_path: Path) -> None:
+    mocker.patch.dict(os.environ, {'SHELL': which('bash'), 'PYORBS_DEFAULT_REQUIREMENTS': ''})
+    # Fake Python executables that only create the orb folder (or fail)
+    python = tmp_path / 'python'
+    python.write_text('#!/bin/sh\nmkdir -p "$4/bin"\n')
+    broken_python = tmp_path / 'broken-python'
+    broken_python.write_text('#!/bin/sh\necho "Broken interpreter"\nexit 1\n')
+    for executable in (python, broken_python):
+        executable.chmod(0o755)
+    spec = tmp_path / 'pyorbs.ini'
+    spec.write_text(
+        f'[DEFAULT]\nexecutable = {python}\noptions = --no-store\n\n'
+        '[first]\n\n[second]\n\n'
+        f'[broken]\nexecutable = {broken_python}\n'
+    )
+    args = ['--build', '--spec', str(spec), '--path', str(tmp_path / 'orbs'), '--jobs', '3']
+
+    with raises(RuntimeError, match='Unable to build orbs broken'):
+        Orb(args=args).act()
+    output = capsys.readouterr().out
+    assert '[first]  Making empty orb "first"' in output
+    assert '[broken] Broken interpreter' in output
+    assert re.search(r'^  first   ok +[0-9.]+s$', output, re.MULTILINE)
+    assert re.search(r'^  broken  failed +[0-9.]+s$', output, re.MULTILINE)
+    assert set(json.loads((tmp_path / 'orbs/.index.json').read_text())) == {'first', 'second'}
+
+    with raises(RuntimeError, match='Unable to build orbs first'):
+        Orb(args=args + ['first']).act()  # existing orbs are updated
+    assert 'requirements file must be specified' in capsys.readouterr().out
+    with raises(ValueError, match='Unknown orb name "third"'):
+        Orb(args=args + ['third']).act()
+
+
+def test_build_options(mocker: MockerFixture, tmp_path: Path) -> None:
+    process = mocker.MagicMock(stdout=[], returncode=0)
+    popen = mocker.patch('subprocess.Popen')
+    popen.return_value.__enter__.return_value = process
+    (spec := tmp_path / 'pyorbs.ini').write_text('[first]\noptions = --no-store\n')
+    Orb(args=[
+        '--build', '--spec', str(spec), '--path', str(tmp_path), '--hashes', '--resolve',
+        '--interpreter-lockfile', '--optimize', '1',
+    ]).act()
+
+    # The options that affect the lockfiles are passed on to the orbs
+    args = popen.call_args[0][0]
+    assert args[3:5] == ['--make', 'first']
+    assert {'--hashes', '--resolve', '--interpreter-lockfile', '--no-store'} <= set(args)
+    assert args[args.index('--optimize') + 1] == '1'
+
+
+def test_make_matrix(mocker: MockerFixture, capsys: CaptureFixture[str], tmp_path: Path) -> None:
+    mocker.patch.dict(os.environ, {'SHELL': which('bash'), 'PYORBS_DEFAULT_REQUIREMENTS': ''})
+    # Fake Python executables that report their version and only create the orb folder
+    executables = []
+    for version in ('3.8.18', '3.12.1'):
+        executables.append(python := tmp_path / f'python{version}')
+        python.write_text(
+            f'#!/bin/sh\nif [ "$1" = -c ]; then echo {version}; echo linux-x86_64; exit; fi\n'
+            'mkdir -p "$4/bin"\n'
+        )
+        python.chmod(0o755)
+    matrix = ','.join(map(str, executables))
+    args = ['--path', str(tmp_path / 'orbs'), '--no-store', '--matrix', matrix]
+
+    Orb(args=args + ['--make', 'test']).act()
+    output = capsys.readouterr().out
+    assert '[test-py38]  Making empty orb "test-py38"' in output
+    assert re.search(rf'^  test-py312  ok +[0-9.]+s  {executables[1]}$', output, re.MULTILINE)
+    assert set(json.loads((tmp_path / 'orbs/.index.json').read_text())) == {
+        'test-py38', 'test-py312',
+    }
+    metadata = json.loads((tmp_path / 'orbs/test-py38/pyorbs.json').read_text())
+    assert metadata['executable'] == str(executables[0])
+    assert metadata['python_tag'] == 'py38'
+
+    with raises(ValueError, match='Invalid orb names other-py38, other-py312'):
+        Orb(args=args + ['--update', 'other']).act()
+    with raises(ValueError, match='Orb "test-py38" is in the matrix more than once'):
+        Orb(args=args + ['--matrix', f'{matrix},{executables[0]}', '--make', 'test']).act()
+
+
+def test_timings(
+    mocker: MockerFixture, capsys: CaptureFixture[str], requirements: RequirementsFixture,
+    tmp_path: Path,
+) -> None:
+    mocker.patch.dict(os.environ, {'SHELL': 'bash'})
+    execute = mocker.patch('pyorbs.orb.execute', return_value=CompletedProcess([], returncode=0))
+    (tmp_path / 'test/bin').mkdir(parents=True)
+    trace = tmp_path / 'trace.json'
+    Orb(args=[
+        '-m', 'test', '-r', requirements(), '--path', str(tmp_path), '--no-store',
+        '--timings', '--trace', str(trace),
+    ]).act()
+    output = capsys.readouterr().out
+    for phase in ('make', 'create virtual environment', 'upgrade pip', 'install requirements'):
+        assert re.search(f'^{phase} +1 +[0-9.]+s$', output, re.MULTILINE)
+    for call in execute.call_args_list:
+        assert call.kwargs['command'] in output
+    events = json.loads(trace.read_text())['traceEvents']
+    assert [event['name'] for event in events][:2] == ['make', 'process requirements']
+    assert {'prefetch packages', 'create virtual environment', 'execute'} <= {
+        event['name'] for event in events
+    }
+    assert all(event['ph'] == 'X' and event['dur'] >= 0 for event in events)
+
+    # The current process is not replaced when timing activation
+    (tmp_path / 'test/bin/activate_orb.bash').touch()
+    Orb(args=['test', '--path', str(tmp_path), '--timings']).act()
+    assert not execute.call_args.kwargs['replace']
+    assert 'bash (interactive)' in capsys.readouterr().out
+
+
+def test_make_prefetch(
+    mocker: MockerFixture, capsys: CaptureFixture[str], requirements: RequirementsFixture,
+    tmp_path: Path,
+) -> None:
+    mocker.patch.dict(os.environ, {'SHELL': 'bash'})
+    download_code = 0
+    downloads = ['six-1.16.0-py2.py3-none-any.whl']
+
+    def execute(command: str, **_kwargs: Any) -> 'CompletedProcess[str]':
+        if dest := re.search('pip download .*--dest "([^"]+)"', command):
+            for download in downloads:
+                (Path(dest.group(1)) / download).touch()
+        return CompletedProcess([], returncode=download_code if 'download' in command else 0)
+
+    execute_mock = mocker.patch('pyorbs.orb.execute', side_effect=execute)
+    (tmp_path / 'test/bin').mkdir(parents=True)
+    args = ['-m', 'test', '-r', requirements(), '--path', str(tmp_path), '--no-store']
+
+    Orb(args=args).act()
+    commands = [call.kwargs['command'] for call in execute_mock.call_args_list]
+    download = next(command for command in commands if 'pip download' in command)
+    dest = re.search('--dest "([^"]+)"', download)
+    assert dest and f'--requirement "{requirements(lock=True)}"' in download
+    install = next(command for command in commands if '--requirement' in command
+                   and 'pip install' in command)
+    # All locked packages are downloaded, so the index is not used for installing them
+    assert f'--no-index --find-links "{dest.group(1)}"' in install
+    upgrade = next(command for command in commands if '--upgrade pip' in command)
+    assert '--no-index' not in upgrade
+    assert not Path(dest.group(1)).exists()  # removed after making the orb
+    assert re.search(r'Prefetched packages in [0-9.]+s \([0-9.]+s saved', capsys.readouterr().out)
+
+    # Building source distributions may require packages that are not locked
+    execute_mock.reset_mock()
+    downloads.append('pyyaml-6.0.tar.gz')
+    Orb(args=args).act()
+    commands = [call.kwargs['command'] for call in execute_mock.call_args_list]
+    assert not any('--no-index' in command for command in commands)
+    assert any('--find-links' in command for command in commands)
+    capsys.readouterr()
+
+    execute_mock.reset_mock()
+    download_code = 1
+    Orb(args=args).act()
+    commands = [call.kwargs['command'] for call in execute_mock.call_args_list]
+    assert not any('--find-links' in command for command in commands)
+    assert 'Prefetched' not in capsys.readouterr().out
+
+    execute_mock.reset_mock()
+    Orb(args=args + ['--offline']).act()
+    commands = [call.kwargs['command'] for call in execute_mock.call_args_list]
+    assert not any('pip download' in command for command in commands)
+
+
+def test_make_lockfile_hashes(
+    mocker: MockerFixture, requirements: RequirementsFixture, tmp_path: Path,
+) -> None:
+    mocker.patch.dict(os.environ, {'SHELL': 'bash'})
+    hashes = {'six': 'sha256:abc', 'pip': 'sha256:def'}
+
+    def execute(command: str, **_kwargs: Any) -> 'CompletedProcess[str]':
+        if 'pip freeze' in command:
+            return CompletedProcess([], returncode=0, stdout='pip==23.0\nsix==1.17.0\n')
+        if match := re.search('--report "([^"]+)"', command):
+            assert '--no-deps' in command
+            Path(match.group(1)).write_text(json.dumps({'install': [{
+                'metadata': {'name': name, 'version': '1.0'},
+                'download_info': {'archive_info': {'hashes': dict([value.split(':')])}},
+            } for name, value in hashes.items()]}), encoding='utf-8')
+        return CompletedProcess([], returncode=0)
+
+    execute_mock = mocker.patch('pyorbs.orb.execute', side_effect=execute)
+    (tmp_path / 'test/bin').mkdir(parents=True)
+    path = Path(copyfile(requirements('changed'), tmp_path / 'requirements.txt'))
+    args = ['-m', 'test', '-r', str(path), '--path', str(tmp_path), '--no-store']
+    Orb(args=args + ['--hashes']).act()
+    lockfile = path.with_name('requirements.txt.lock')
+    assert lockfile.read_text(encoding='utf-8').endswith(
+        '\npip==23.0 --hash=sha256:def\nsix==1.17.0 --hash=sha256:abc\n'
+    )
+
+    # Lockfiles are installed without resolving dependencies and then checked
+    execute_mock.reset_mock()
+    Orb(args=args).act()
+    commands = [call.kwargs['command'] for call in execute_mock.call_args_list]
+    assert any(f'--no-deps --requirement "{lockfile}"' in command for command in commands)
+    assert commands[-1].endswith('pip check')
+
+    del hashes['six']
+    lockfile.unlink()
+    with raises(RuntimeError, match='hash of package "six"'):
+        Orb(args=args + ['--hashes']).act()
+
+
+def test_rollback(mocker: MockerFixture, capsys: CaptureFixture[str], tmp_path: Path) -> None:
+    mocker.patch.dict(os.environ, {'SHELL': 'bash', 'PYORBS_DEFAULT_REQUIREMENTS': ''})
+    mocker.patch('pyorbs.orb.execute', return_value=CompletedProcess([], returncode=0))
+    args = ['test', '--path', str(tmp_path), '--no-store']
+    Orb(args=['-m'] + args).act()
+    with raises(ValueError, match='does not have a previous generation'):
+        Orb(args=['--rollback'] + args).act()
+
+    Orb(args=['-m'] + args).act()
+    assert os.readlink(tmp_path / 'test') == '.generations/test/2'
+    activate_orb = (tmp_path / 'test/bin/activate_orb.bash').read_text()
+    assert str(tmp_path / '.generations/test/2/bin/activate') in activate_orb
+    Orb(args=['--rollback'] + args).act()
+    assert 'rolled back to generation 1' in capsys.readouterr().out
+    assert os.readlink(tmp_path / 'test') == '.generations/test/1'
+    assert 'test' in json.loads((tmp_path / '.index.json').read_text())
+
+    Orb(args=['-d'] + args).act()
+    assert not (tmp_path / 'test').exists()
+    assert not (tmp_path / '.generations/test').exists()
+
+
+def test_make_concurrent(
+    mocker: MockerFixture, capsys: CaptureFixture[str], requirements: RequirementsFixture,
+    tmp_path: Path,
+) -> None:
+    mocker.patch.dict(os.environ, {'SHELL': 'bash'})
+    mocker.patch('pyorbs.orb.execute', return_value=CompletedProcess([], returncode=0))
+    args = ['-m', 'test', '--path', str(tmp_path), '--no-store', '-r', requirements()]
+    lock = Generations.lock
+    made: List[bool] = []
+
+    def make_meanwhile(generations: Generations, **kwargs: Any) -> Any:
+        if not made:  # another process makes the same orb while this one waits for the lock
+            made.append(True)
+            Orb(args=args).act()
+        return lock(generations, **kwargs)
+
+    mocker.patch.object(Generations, 'lock', make_meanwhile)
+    Orb(args=args).act()
+    assert 'was made by another process in the meantime' in capsys.readouterr().out
+    assert os.readlink(tmp_path / 'test') == '.generations/test/1'
+
+    # Orbs that are made differently are made again
+    made.clear()
+    Orb(args=args[:-1] + [requirements('referred_requirements_unchanged')]).act()
+    assert 'in the meantime' not in capsys.readouterr().out
+    assert os.readlink(tmp_path / 'test') == '.generations/test/3'
+
+
+def test_export_import(
+    mocker: MockerFixture, capsys: CaptureFixture[str], tmp_path: Path,
+) -> None:
+    mocker.patch.dict(os.environ, {'SHELL': 'bash', 'PYORBS_DEFAULT_REQUIREMENTS': ''})
+    mocker.patch('pyorbs.orb.execute', return_value=CompletedProcess([], returncode=0))
+    Orb(args=['-m', 'test', '--path', str(tmp_path / 'old'), '--no-store']).act()
+    (tmp_path / 'old/test/bin/python').symlink_to(sys.executable)
+    archive = tmp_path / 'test.tar.gz'
+    export_args = ['--export', 'test', '--archive', str(archive)]
+    Orb(args=export_args + ['--path', str(tmp_path / 'old')]).act()
+    assert 'Orb "test" is exported' in capsys.readouterr().out
+
+    args = ['--import', '--path', str(tmp_path / 'new'), '--archive', str(archive)]
+    Orb(args=args + ['imported']).act()
+    assert 'Orb "imported" is ready for use' in capsys.readouterr().out
+    activate_orb = (tmp_path / 'new/imported/bin/activate_orb.bash').read_text()
+    assert str(tmp_path / 'new/.generations/imported/1/bin/activate') in activate_orb
+    assert 'PYORBS_CURRENT_ORB="imported"' in activate_orb
+    assert 'imported' in json.loads((tmp_path / 'new/.index.json').read_text())
+
+    # Importing an orb again makes a new generation of it
+    Orb(args=args).act()
+    Orb(args=args).act()
+    assert os.readlink(tmp_path / 'new/test') == '.generations/test/2'
+    with raises(ValueError, match='The orb archive must be specified'):
+        Orb(args=['--import', '--path', str(tmp_path / 'new')]).act()
+
+
+def test_dedup(capsys: CaptureFixture[str], tmp_path: Path) -> None:
+    for name in ('first', 'second'):
+        (tmp_path / name / 'bin').mkdir(parents=True)
+        (tmp_path / name / 'bin/script').write_text('#' * 2000)
+    Orb(args=['--dedup', '--path', str(tmp_path)]).act()
+    assert '(2.0 kB reclaimed)' in capsys.readouterr().out
+    assert (tmp_path / 'first/bin/script').stat().st_nlink == 3
+
+
+def test_update_sync(
+    mocker: MockerFixture, requirements: RequirementsFixture, tmp_path: Path,
+) -> None:
+    changes = []
+    compiled = []
+    incomplete: List[bool] = []
+
+    def execute(command: str, **_kwargs: Any) -> 'CompletedProcess[str]':
+        assert 'venv' not in command
+        if command.endswith('pip check'):
+            return CompletedProcess([], returncode=int(bool(incomplete)))
+        if match := re.search('compileall.* 0 0 < "(.*)"$', command, re.DOTALL):
+            compiled.extend(Path(match.group(1)).read_text(encoding='utf-8').splitlines())
+            return CompletedProcess([], returncode=0)
+        assert 'pip uninstall --yes extra &&' in command
+        if match := re.search('--no-deps --requirement "(.*)"', command):
+            changes.extend(Path(match.group(1)).read_text(encoding='utf-8').splitlines())
+        return CompletedProcess([], returncode=0)
+
+    mocker.patch.dict(os.environ, {'SHELL': 'bash'})
+    mocker.patch('pyorbs.orb.execute', side_effect=execute)
+    orb_path = tmp_path / 'test'
+    (orb_path / 'bin').mkdir(parents=True)
+    (orb_path / 'pyorbs.json').write_text(
+        json.dumps({'interpreter': interpreter_id(which(sys.executable))})
+    )
+    for name, version in {'pip': '23.0', 'setuptools': '65.0.0', 'extra': '1.0'}.items():
+        add_package(orb_path, name=name, version=version)
+    add_package(orb_path, name='project', version='1.0', editable=True)
+    for name in ('setuptools-65.0.0', 'pip-23.0'):  # the records of the installed packages
+        record = f'lib/python3.8/site-packages/{name}.dist-info/RECORD'
+        (orb_path / record).write_text(f'{name.split("-", maxsplit=1)[0]}/__init__.py,,\n')
+
+    Orb(args=['-u', 'test', '-r', requirements(), '--path', str(tmp_path), '--no-store']).act()
+    assert changes == [
+        '-i https://pypi.python.org/simple',
+        '--extra-index-url https://pypi.python.org/simple',
+        'setuptools==67.2.0',
+        'wheel==0.40.0',
+    ]
+    # Only the changed packages are compiled
+    site = tmp_path / '.generations/test/1/lib/python3.8/site-packages'
+    assert compiled == [str(site / 'setuptools/__init__.py')]
+
+    # Incomplete lockfiles are reported
+    incomplete.append(True)
+    with raises(RuntimeError, match='Lockfile .* is incomplete'):
+        Orb(args=['-u', 'test', '-r', requirements(), '--path', str(tmp_path), '--no-store']).act()
 
 
 def test_update_errors(orb: OrbFixture) -> None:
@@ -165,6 +764,47 @@ def test_freeze(
     assert_lockfiles_equal(tmp_requirements(lock=True), requirements(lock=True))  # check lockfile
 
 
+def test_freeze_resolve(
+    orb: OrbFixture, requirements: RequirementsFixture, tmp_requirements: RequirementsFixture,
+) -> None:
+    orb(['-f', '--resolve', '-r', tmp_requirements()])  # freeze
+    assert_lockfiles_equal(tmp_requirements(lock=True), requirements(lock=True))  # check lockfile
+
+
+def test_freeze_resolve_report(mocker: MockerFixture, tmp_path: Path) -> None:
+    requirements = tmp_path / 'requirements.txt'
+    requirements.write_text('-i https://example.com/simple\nsix\n')
+    report = {'install': [{
+        'metadata': {'name': name, 'version': version},
+        'download_info': {'url': 'test', 'archive_info': {'hashes': {'sha256': name}}},
+    } for name, version in (('six', '1.17.0'), ('pip', '23.0'))]}
+
+    def execute(command: str, **_kwargs: Any) -> 'CompletedProcess[str]':
+        assert '--dry-run --ignore-installed' in command
+        assert 'pip setuptools wheel --requirement' in command
+        if report:
+            report_path = Path(re.findall('--report "([^"]+)"', command)[0])
+            report_path.write_text(json.dumps(report), encoding='utf-8')
+        return CompletedProcess([], returncode=0 if report else 1)
+
+    mocker.patch('pyorbs.orb.execute', side_effect=execute)
+    make = mocker.patch('pyorbs.orb.Orb.make')
+    Orb(args=['-f', '--resolve', '-r', str(requirements)]).act()
+    make.assert_not_called()
+    lockfile = (tmp_path / 'requirements.txt.lock').read_text()
+    assert lockfile.endswith('\n-i https://example.com/simple\npip==23.0\nsix==1.17.0\n')
+
+    (tmp_path / 'requirements.txt.lock').unlink()
+    Orb(args=['-f', '--resolve', '--hashes', '-r', str(requirements)]).act()
+    lockfile = (tmp_path / 'requirements.txt.lock').read_text()
+    assert lockfile.endswith('\npip==23.0 --hash=sha256:pip\nsix==1.17.0 --hash=sha256:six\n')
+
+    report.clear()
+    requirements.write_text('six\n')
+    with raises(RuntimeError, match='Unable to resolve requirements'):
+        Orb(args=['-f', '--resolve', '-r', str(requirements)]).act()
+
+
 def test_freeze_folder_bare_skip(
     orb: OrbFixture, tmp_path: Path, tmp_requirements: RequirementsFixture,
 ) -> None:
@@ -192,6 +832,29 @@ def test_freeze_referred(
                 assert 'up-to-date' in process.stdout
 
 
+def test_freeze_parallel(
+    mocker: MockerFixture, capsys: CaptureFixture[str],
+    requirements: RequirementsFixture, tmp_path: Path,
+) -> None:
+    for name in ('first', 'second', 'unchanged'):
+        version = 'unchanged' if name == 'unchanged' else 'changed'
+        for lock in (False, True):
+            copyfile(requirements(version, lock=lock), tmp_path / f'{name}.txt{".lock" * lock}')
+
+    def make(requirements_path: Path, **kwargs: Any) -> None:
+        assert kwargs['capture']
+        if requirements_path.name == 'second.txt':
+            raise RuntimeError('Unable to install requirements')
+
+    mocker.patch('pyorbs.orb.Orb.make', side_effect=make)
+    with raises(RuntimeError, match='Unable to freeze requirements .*second.txt'):
+        Orb(args=['-f', '-r', str(tmp_path), '-j', '2']).act()
+    output = capsys.readouterr().out
+    assert re.search('Freezing requirements .*first.txt', output)
+    assert re.search('Freezing requirements .*second.txt.* failed: Unable to install', output)
+    assert re.search('unchanged.txt" is up-to-date', output)
+
+
 def test_freeze_errors(orb: OrbFixture, tmp_path: Path) -> None:
     assert_error(orb(['-f'], check=False), match='requirements file must be specified')
 
@@ -203,6 +866,87 @@ def test_freeze_errors(orb: OrbFixture, tmp_path: Path) -> None:
     )
 
 
+def test_watch(
+    mocker: MockerFixture, capsys: CaptureFixture[str], requirements: RequirementsFixture,
+    tmp_path: Path,
+) -> None:
+    copyfile(requirements(), base := tmp_path / 'base.txt')
+    (tmp_path / 'requirements.txt').write_text('-r base.txt\n')
+    Requirements(path=tmp_path / 'requirements.txt').update_lockfile('six==1.16.0\n')
+    index = {'test': {'requirements': str(tmp_path / 'requirements.txt'), 'created': 0}}
+    (tmp_path / '.index.json').write_text(json.dumps(index))
+    (tmp_path / 'test').mkdir()
+    manager = mocker.Mock()
+    manager.attach_mock(mocker.patch.object(Orb, 'make'), 'make')
+    manager.attach_mock(mocker.patch.object(Orb, 'freeze'), 'freeze')
+    watch = mocker.patch('pyorbs.watch.Watcher.watch')
+    changes = [{base}, {base}]
+
+    def wait() -> Set[Path]:
+        if not changes:
+            raise KeyboardInterrupt
+        base.write_text(f'{base.read_text()}# comment\n' if len(changes) == 2 else 'six\n')
+        return changes.pop()
+
+    mocker.patch('pyorbs.watch.Watcher.wait', side_effect=wait)
+    args = ['--watch', '--path', str(tmp_path), '-r', str(tmp_path / 'requirements.txt')]
+    Orb(args=args + ['--no-cache']).act()
+    output = capsys.readouterr().out
+    assert 'Stopped watching requirements' in output
+    assert set(watch.call_args[0][0]) == {tmp_path / 'requirements.txt', base}
+
+    # Only requirements with changed hashes are frozen, before updating the orbs made from them
+    assert f'Requirements "{tmp_path / "requirements.txt"}" are unchanged' in output
+    assert manager.mock_calls == [
+        mocker.call.freeze(
+            path=tmp_path / 'requirements.txt', executable=which(sys.executable), python_tag=None,
+        ),
+        mocker.call.make(
+            name='test', requirements_path=tmp_path / 'requirements.txt', update=True,
+            executable=which(sys.executable), python_tag=None,
+        ),
+    ]
+
+
+def test_watch_shared_lockfile(mocker: MockerFixture, tmp_path: Path) -> None:
+    (path := tmp_path / 'requirements.txt').write_text('six\n')
+    Requirements(path=path).update_lockfile('six==1.16.0\n')
+    executables = {'first': which(sys.executable), 'second': '/usr/bin/other-python'}
+    index = {}
+    for name, executable in executables.items():
+        index[name] = {'requirements': str(path), 'created': 0}
+        (tmp_path / name).mkdir()
+        (tmp_path / name / 'pyorbs.json').write_text(json.dumps({'executable': executable}))
+    (tmp_path / '.index.json').write_text(json.dumps(index))
+    make = mocker.patch.object(Orb, 'make')
+    freeze = mocker.patch.object(
+        Orb, 'freeze', side_effect=lambda **_kwargs: Requirements(
+            path=path, allow_outdated=True,
+        ).update_lockfile('six==1.17.0\n'),
+    )
+    mocker.patch('pyorbs.watch.Watcher.watch')
+    changes = [{path}]
+
+    def wait() -> Set[Path]:
+        if not changes:
+            raise KeyboardInterrupt
+        path.write_text('six>=1.17\n')
+        return changes.pop()
+
+    mocker.patch('pyorbs.watch.Watcher.wait', side_effect=wait)
+    Orb(args=['--watch', '--path', str(tmp_path), '-r', str(path), '--no-cache']).act()
+
+    # The shared lockfile is frozen once and the orbs of both interpreters are updated from it
+    freeze.assert_called_once_with(path=path, executable=executables['first'], python_tag=None)
+    assert make.call_args_list == [
+        mocker.call(
+            name=name, requirements_path=path, update=True, executable=executable,
+            python_tag=None,
+        )
+        for name, executable in executables.items()
+    ]
+
+
 def test_test(orb: OrbFixture, requirements: RequirementsFixture) -> None:
     for change, return_code in {'changed': 1, 'unchanged': 0}.items():
         assert orb(['-t', '-r', requirements(change)], check=False).returncode == return_code
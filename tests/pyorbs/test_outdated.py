@@ -0,0 +1,167 @@
+import os
+from pathlib import Path
+from subprocess import CalledProcessError, CompletedProcess
+from urllib.error import HTTPError, URLError
+
+from pytest import raises
+from pytest_mock import MockerFixture
+
+from pyorbs.outdated import (
+    DEFAULT_INDEX_URL, IndexSnapshot, OutdatedPackage, file_version, is_prerelease,
+    outdated_packages, pip_config, pip_index_urls, python_compatible, version_key,
+)
+from tests.pyorbs.conftest import add_package
+
+
+def add_project(index: Path, name: str, links: str) -> None:
+    (index / name).mkdir(parents=True)
+    (index / name / 'index.html').write_text(f'<html><body>{links}</body></html>')
+
+
+def test_version_key() -> None:
+    versions = [
+        '1.0.dev1', '1.0a1', '1.0a2.dev1', '1.0b1', '1.0rc1', '1.0', '1.0.post1', '1.0.1',
+        '1.1', '2!0.1',
+    ]
+    assert sorted(versions, key=lambda version: version_key(version) or ()) == versions
+    assert version_key('1.0') == version_key('1.0.0') == version_key('v1.0+local')
+    assert version_key('1.0-1') == version_key('1.0.post1')
+    assert version_key('invalid') is None
+    assert is_prerelease('1.0rc1')
+    assert is_prerelease('1.0.dev1')
+    assert not is_prerelease('1.0.post1')
+
+
+def test_python_compatible() -> None:
+    assert python_compatible(None, '3.8.10')
+    assert python_compatible('>=3.7', None)
+    assert python_compatible('>=3.7, <4', '3.8.10')
+    assert not python_compatible('>=3.9', '3.8.10')
+    assert python_compatible('~=3.8', '3.11.1')
+    assert not python_compatible('~=3.8.1', '3.9.0')
+    assert python_compatible('!=3.8.*', '3.9.0')
+    assert not python_compatible('!=3.8.*', '3.8.10')
+    assert not python_compatible('==3.9.*', '3.8.10')
+    assert python_compatible('invalid', '3.8.10')
+
+
+def test_file_version() -> None:
+    assert file_version('pyyaml', 'PyYAML-6.0-cp38-cp38-manylinux1_x86_64.whl') == '6.0'
+    assert file_version('zope-interface', 'zope.interface-5.5.2.tar.gz') == '5.5.2'
+    assert file_version('pyyaml', 'other-6.0-py3-none-any.whl') is None
+    assert file_version('pyyaml', 'PyYAML-6.0.exe') is None
+
+
+def test_pip_config(mocker: MockerFixture) -> None:
+    environ = {'PIP_EXTRA_INDEX_URL': 'https://env.example.com/simple'}
+    mocker.patch.dict(os.environ, environ, clear=True)
+    output = '\n'.join([
+        "global.index-url='https://global.example.com/simple'",
+        "global.timeout='60'",
+        "install.index-url='https://install.example.com/simple'",
+        "global.extra-index-url='https://extra.example.com/simple'",
+        ":env:.extra-index-url='https://env.example.com/simple'",
+    ])
+    run = mocker.patch('pyorbs.outdated.run', return_value=CompletedProcess([], 0, stdout=output))
+    assert pip_config(Path('orb/bin/python')) == {
+        'index-url': 'https://install.example.com/simple',
+        'extra-index-url': 'https://env.example.com/simple',
+    }
+    run.assert_called_once_with(
+        ['orb/bin/python', '-m', 'pip', 'config', 'list'], capture_output=True, text=True,
+        check=True,
+    )
+
+    # The environment variables are used when pip cannot be run
+    run.side_effect = CalledProcessError(1, 'pip')
+    assert pip_config(Path('orb/bin/python')) == {
+        'extra-index-url': 'https://env.example.com/simple',
+    }
+
+
+def test_pip_index_urls(tmp_path: Path) -> None:
+    (tmp_path / 'wheels').mkdir()
+    config = {'index-url': 'https://config.example.com/simple', 'extra-index-url': 'a b'}
+    assert pip_index_urls([], config={}) == [DEFAULT_INDEX_URL]
+    assert pip_index_urls([], config=config) == ['https://config.example.com/simple', 'a', 'b']
+    assert pip_index_urls([
+        '-i https://lockfile.example.com/simple', '--extra-index-url=c', '--find-links wheels',
+        '--find-links missing', '-f https://example.com/links', '--prefer-binary',
+    ], config=config, base=tmp_path) == [
+        'https://lockfile.example.com/simple', 'a', 'b', 'c', str(tmp_path / 'wheels'),
+    ]
+    assert pip_index_urls(['--no-index', '-f wheels'], config=config, base=tmp_path) == [
+        str(tmp_path / 'wheels'),
+    ]
+    assert not pip_index_urls([], config={'no-index': 'true'})
+
+
+def test_index_snapshot(tmp_path: Path) -> None:
+    index = tmp_path / 'index'
+    add_project(index, 'pyyaml', ''.join([
+        '<a href="../../files/PyYAML-5.4.tar.gz#sha256=abc">PyYAML-5.4.tar.gz</a>',
+        '<a href="PyYAML-6.0-py3-none-any.whl" data-requires-python="&gt;=3.6">x</a>',
+        '<a href="PyYAML-6.1-py3-none-any.whl" data-yanked="">x</a>',
+        '<a href="PyYAML-7.0-py3-none-any.whl" data-requires-python="&gt;=3.9">x</a>',
+        '<a href="PyYAML-8.0b1-py3-none-any.whl">x</a>',
+        '<a>missing</a>',
+    ]))
+    snapshot = IndexSnapshot(index_urls=[str(index)], path=tmp_path / 'cache/index.json')
+    assert snapshot.latest('PyYAML', python='3.8.10') == '6.0'
+    assert snapshot.latest('PyYAML', python='3.9.0') == '7.0'
+    assert snapshot.latest('PyYAML', python='3.9.0', pre=True) == '8.0b1'
+    assert snapshot.latest('unknown') is None
+    snapshot.save()
+
+    # Cached versions are used until they expire
+    add_project(index, 'unknown', '<a href="unknown-1.0.tar.gz">x</a>')
+    cached = IndexSnapshot(index_urls=[f'file://{index}'], path=tmp_path / 'cache/index.json')
+    assert cached.latest('unknown') == '1.0'  # different index URLs use separate snapshots
+    cached = IndexSnapshot(index_urls=[str(index)], path=tmp_path / 'cache/index.json')
+    assert cached.latest('unknown') is None
+    cached.ttl = 0
+    assert cached.latest('unknown') == '1.0'
+
+
+def test_index_snapshot_flat_folder(tmp_path: Path) -> None:
+    (tmp_path / 'pyyaml-6.0-py3-none-any.whl').touch()
+    (tmp_path / 'PyYAML-5.4.tar.gz').touch()
+    (tmp_path / 'other-7.0-py3-none-any.whl').touch()
+    assert IndexSnapshot(index_urls=[str(tmp_path)]).latest('pyyaml') == '6.0'
+    assert IndexSnapshot(index_urls=[str(tmp_path / 'missing')]).latest('pyyaml') is None
+
+
+def test_index_snapshot_remote(mocker: MockerFixture) -> None:
+    response = mocker.MagicMock()
+    response.__enter__.return_value.read.return_value = b'<a href="six-1.17.0.tar.gz">x</a>'
+    urlopen = mocker.patch('pyorbs.outdated.urlopen', return_value=response)
+    assert IndexSnapshot(index_urls=['https://example.com/simple']).latest('Six') == '1.17.0'
+    urlopen.assert_called_once_with('https://example.com/simple/six/', timeout=30)
+
+    urlopen.side_effect = HTTPError('url', 404, 'Not Found', mocker.Mock(), None)
+    assert IndexSnapshot(index_urls=['https://example.com/simple']).latest('six') is None
+    urlopen.side_effect = HTTPError('url', 500, 'Server Error', mocker.Mock(), None)
+    with raises(RuntimeError, match='Unable to fetch'):
+        IndexSnapshot(index_urls=['https://example.com/simple']).latest('six')
+    urlopen.side_effect = URLError('unreachable')
+    with raises(RuntimeError, match='Unable to fetch'):
+        IndexSnapshot(index_urls=['https://example.com/simple']).latest('six')
+
+
+def test_outdated_packages(tmp_path: Path) -> None:
+    orb = tmp_path / 'orb'
+    orb.mkdir()
+    (orb / 'pyvenv.cfg').write_text('version = 3.8.10\n')
+    add_package(orb, 'six', '1.16.0')
+    add_package(orb, 'PyYAML', '6.0')
+    add_package(orb, 'beta', '1.0b1')
+    add_package(orb, 'local', '1.0')
+    index = tmp_path / 'index'
+    add_project(index, 'six', '<a href="six-1.17.0.tar.gz">x</a><a href="six-1.16.0.tar.gz">x</a>')
+    add_project(index, 'pyyaml', '<a href="PyYAML-6.1.tar.gz" data-requires-python=">=3.9">x</a>')
+    add_project(index, 'beta', '<a href="beta-1.0b2.tar.gz">x</a>')
+    snapshot = IndexSnapshot(index_urls=[str(index)])
+    assert outdated_packages(orb, snapshot=snapshot) == [
+        OutdatedPackage(name='beta', version='1.0b1', latest='1.0b2'),
+        OutdatedPackage(name='six', version='1.16.0', latest='1.17.0'),
+    ]
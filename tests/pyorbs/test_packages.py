@@ -0,0 +1,153 @@
+import importlib.util
+import sys
+from pathlib import Path
+from subprocess import run
+
+from pytest import raises
+
+from pyorbs.packages import (
+    COMPILE_SCRIPT, canonical_name, distribution_files, hashed_requirements, installed_packages,
+    locked_packages, lockfile_changes, reported_hashes, reported_requirements, requirement_name,
+)
+from tests.pyorbs.conftest import add_package
+
+
+def test_canonical_name() -> None:
+    assert canonical_name('Typing_Extensions') == 'typing-extensions'
+    assert canonical_name('zope.interface') == 'zope-interface'
+
+
+def test_requirement_name() -> None:
+    assert requirement_name('Typing_Extensions>=4.0') == 'typing-extensions'
+    assert requirement_name('requests[socks] == 2.31.0 --hash=sha256:abc') == 'requests'
+    assert requirement_name('project @ https://example.com/project.zip') == 'project'
+
+
+def test_installed_packages(tmp_path: Path) -> None:
+    add_package(tmp_path, 'PyYAML', '6.0')
+    add_package(tmp_path, 'project', '1.0', editable=True)
+    (tmp_path / 'lib/python3.8/site-packages/invalid.dist-info').mkdir()
+    packages = installed_packages(tmp_path)
+    assert set(packages) == {'pyyaml', 'project'}
+    assert packages['pyyaml'].requirement == 'PyYAML==6.0'
+    assert not packages['pyyaml'].editable
+    assert packages['project'].editable
+
+
+def test_installed_packages_error(tmp_path: Path) -> None:
+    with raises(RuntimeError, match='does not have a site-packages folder'):
+        installed_packages(tmp_path)
+
+
+def test_distribution_files(tmp_path: Path) -> None:
+    site = tmp_path / 'lib/python3.8/site-packages'
+    add_package(tmp_path, 'PyYAML', '6.0')
+    (site / 'PyYAML-6.0.dist-info/RECORD').write_text('\n'.join([
+        'yaml/__init__.py,sha256=abc,100',
+        'yaml/__pycache__/__init__.cpython-38.pyc,,',
+        'PyYAML-6.0.dist-info/RECORD,,',
+        '../../../bin/script.py,sha256=abc,10',
+    ]))
+    add_package(tmp_path, 'six', '1.16.0')
+    (site / 'six-1.16.0.dist-info/RECORD').write_text('six.py,sha256=abc,100\n')
+    add_package(tmp_path, 'project', '1.0', editable=True)  # without a record
+
+    assert distribution_files(tmp_path) == [site / 'six.py', site / 'yaml/__init__.py']
+    assert distribution_files(tmp_path, names=['pyyaml']) == [site / 'yaml/__init__.py']
+    assert not distribution_files(tmp_path, names=[])
+    assert not distribution_files(tmp_path / 'missing')
+
+
+def test_compile_script(tmp_path: Path) -> None:
+    (module := tmp_path / 'module.py').write_text('value = 1\n')
+    (invalid := tmp_path / 'invalid.py').write_text('print "Python 2"\n')
+    run(
+        [sys.executable, '-c', COMPILE_SCRIPT, '1', '2'], input=f'{module}\n{invalid}\n',
+        text=True, check=True,
+    )
+    pyc = Path(importlib.util.cache_from_source(str(module), optimization=1))
+    assert pyc.read_bytes()[4:8] == b'\x03\x00\x00\x00'  # checked hash-based bytecode
+    assert not Path(importlib.util.cache_from_source(str(invalid), optimization=1)).exists()
+
+
+def test_locked_packages(tmp_path: Path) -> None:
+    lockfile = tmp_path / 'requirements.txt.lock'
+    lockfile.write_text('\n'.join([
+        '# Requirements hash: test',
+        '-i https://pypi.python.org/simple',
+        '',
+        'PyYAML==6.0',
+        'requests[socks] == 2.31.0',
+        'project @ https://example.com/project.zip',
+    ]))
+    packages = locked_packages(lockfile)
+    assert set(packages) == {'pyyaml', 'requests', 'project'}
+    assert packages['requests'].version == '2.31.0'
+    assert packages['project'].version is None
+    assert packages['project'].requirement == 'project @ https://example.com/project.zip'
+
+
+def test_reported_requirements() -> None:
+    report = {'install': [
+        {
+            'metadata': {'name': 'six', 'version': '1.17.0'}, 'is_direct': False,
+            'download_info': {'url': 'https://example.com/six-1.17.0.tar.gz', 'archive_info': {}},
+        },
+        {
+            'metadata': {'name': 'PyYAML', 'version': '6.0'},
+            'download_info': {'url': 'https://example.com/PyYAML-6.0.tar.gz'},
+        },
+        {
+            'metadata': {'name': 'project', 'version': '1.0'}, 'is_direct': True,
+            'download_info': {'url': 'https://example.com/project.zip', 'archive_info': {}},
+        },
+        {
+            'metadata': {'name': 'vcs', 'version': '2.0'}, 'is_direct': True,
+            'download_info': {
+                'url': 'https://example.com/vcs.git',
+                'vcs_info': {'vcs': 'git', 'commit_id': 'abc123'},
+            },
+        },
+        {
+            'metadata': {'name': 'editable', 'version': '0.1'}, 'is_direct': True,
+            'download_info': {'url': 'file:///project', 'dir_info': {'editable': True}},
+        },
+    ]}
+    assert reported_requirements(report) == [
+        'project @ https://example.com/project.zip',
+        'PyYAML==6.0',
+        'six==1.17.0',
+        'vcs @ git+https://example.com/vcs.git@abc123',
+    ]
+
+
+def test_lockfile_changes(tmp_path: Path) -> None:
+    add_package(tmp_path, 'six', '1.16.0')
+    add_package(tmp_path, 'extra', '1.0')
+    add_package(tmp_path, 'project', '1.0', editable=True)
+    add_package(tmp_path, 'pip', '23.0')
+    lockfile = tmp_path / 'requirements.txt.lock'
+    lockfile.write_text('six==1.17.0\npip==23.0\nwheel==0.40.0\n')
+    assert lockfile_changes(tmp_path, lockfile) == (['six==1.17.0', 'wheel==0.40.0'], ['extra'])
+
+
+def test_hashed_requirements() -> None:
+    report = {'install': [
+        {
+            'metadata': {'name': 'PyYAML', 'version': '6.0'},
+            'download_info': {'archive_info': {'hashes': {'sha256': 'abc', 'md5': 'def'}}},
+        },
+        {
+            'metadata': {'name': 'six', 'version': '1.17.0'},
+            'download_info': {'archive_info': {'hash': 'sha256=ghi'}},
+        },
+        {'metadata': {'name': 'vcs', 'version': '1.0'}, 'download_info': {'vcs_info': {}}},
+    ]}
+    hashes = reported_hashes(report)
+    assert hashes == {'pyyaml': ['md5:def', 'sha256:abc'], 'six': ['sha256:ghi']}
+    assert hashed_requirements(['PyYAML==6.0', 'six == 1.17.0', ''], hashes=hashes) == [
+        'PyYAML==6.0 --hash=md5:def --hash=sha256:abc',
+        'six == 1.17.0 --hash=sha256:ghi',
+    ]
+    with raises(RuntimeError, match='hash of package "vcs"'):
+        hashed_requirements(['vcs @ git+https://example.com/vcs.git@abc'], hashes=hashes)
@@ -1,8 +1,9 @@
 from pathlib import Path
 
 from pytest import raises
+from pytest_mock import MockerFixture
 
-from pyorbs.requirements import Requirements
+from pyorbs.requirements import Requirements, RequirementsCache, parse_requirements
 from tests.pyorbs.conftest import RequirementsFixture
 
 
@@ -25,6 +26,74 @@ def test_requirements(requirements: RequirementsFixture) -> None:
     assert item.changed
 
 
+def test_parse_requirements() -> None:
+    parsed = parse_requirements('\n'.join([
+        '# Comment',
+        '-i https://pypi.org/simple  # index',
+        '-rbase.txt',
+        '--requirement=dev.txt',
+        '--constraint constraints.txt',
+        'Typing_Extensions  >= 4.0 ; python_version < "3.9"',
+        'requests[socks] \\',
+        '    ==2.31.0',
+        'project @ https://example.com/project.zip#egg=project',
+        '',
+    ]))
+    assert parsed.includes == [('r', 'base.txt'), ('r', 'dev.txt'), ('c', 'constraints.txt')]
+    assert parsed.options == ['-i https://pypi.org/simple']
+    assert parsed.requirements == [
+        'typing-extensions>=4.0;python_version<"3.9"',
+        'requests[socks]==2.31.0',
+        'project@https://example.com/project.zip#egg=project',
+    ]
+
+
+def test_requirements_normalized_hash(tmp_path: Path) -> None:
+    path = tmp_path / 'requirements.txt'
+    path.write_text('--requirement base.txt\n-c constraints.txt\nsix\npip\n')
+    (tmp_path / 'base.txt').write_text('wheel\n')
+    (tmp_path / 'constraints.txt').write_text('pip==23.0\n')
+    Requirements(path).update_lockfile('pip==23.0\nsix==1.16.0\nwheel==0.40.0')
+
+    # Comments, whitespace and the order of lines do not affect the hash
+    path.write_text('# Requirements\n-c constraints.txt\n\npip  # installer\nsix\n-r base.txt\n')
+    (tmp_path / 'base.txt').write_text('Wheel \\\n  # comment\n')
+    assert not Requirements(path).changed
+
+    # Changes of included files are detected (including long-form includes)
+    (tmp_path / 'constraints.txt').write_text('pip==23.1\n')
+    assert Requirements(path, allow_outdated=True).outdated
+    (tmp_path / 'constraints.txt').write_text('pip==23.0\n')
+    path.write_text('--constraint base.txt\n-c constraints.txt\nsix\npip\n')
+    assert Requirements(path, allow_outdated=True).outdated
+
+
+def test_requirements_swapped_includes(tmp_path: Path) -> None:
+    path = tmp_path / 'requirements.txt'
+    path.write_text('-r base.txt\n-c constraints.txt\n')
+    (tmp_path / 'base.txt').write_text('six\n')
+    (tmp_path / 'constraints.txt').write_text('six==1.16.0\n')
+    Requirements(path).update_lockfile('six==1.16.0')
+
+    # Swapping the contents of included files changes the requirements
+    (tmp_path / 'base.txt').write_text('six==1.16.0\n')
+    (tmp_path / 'constraints.txt').write_text('six\n')
+    assert Requirements(path, allow_outdated=True).outdated
+
+
+def test_requirements_python_tag(tmp_path: Path) -> None:
+    path = tmp_path / 'requirements.txt'
+    path.write_text('six\n')
+    Requirements(path, python_tag='py38').update_lockfile('six==1.16.0')
+    assert (tmp_path / 'requirements.txt.py38.lock').exists()
+    assert not (tmp_path / 'requirements.txt.lock').exists()
+
+    # Each interpreter has its own lockfile, as the pinned versions may differ per interpreter
+    assert not Requirements(path, python_tag='py38').changed
+    assert Requirements(path, python_tag='py312').changed
+    assert Requirements(path).changed
+
+
 def test_requirements_default_paths(requirements: RequirementsFixture) -> None:
     item = Requirements(default_paths=[Path('non-existent'), Path(requirements('unchanged'))])
     assert item.path == Path(requirements('unchanged'))
@@ -35,3 +104,38 @@ def test_requirements_default_paths(requirements: RequirementsFixture) -> None:
 def test_requirements_errors() -> None:
     with raises(RuntimeError, match='Cannot update'):
         Requirements(required=False).update_lockfile('test')
+
+
+def test_requirements_cache(
+    mocker: MockerFixture, tmp_path: Path, tmp_requirements: RequirementsFixture,
+) -> None:
+    cache_path = tmp_path / 'cache/requirements.json'
+    tmp_requirements('unchanged')  # copy referred file
+    path = Path(tmp_requirements('referred_requirements_unchanged'))
+    tmp_requirements('referred_requirements_unchanged', lock=True)  # copy lockfile
+    cache = RequirementsCache(cache_path)
+    assert not Requirements(path, cache=cache).outdated
+    cache.save()
+
+    # Unchanged files are validated without reading them
+    read_text = mocker.spy(Path, 'read_text')
+    item = Requirements(path, cache=RequirementsCache(cache_path))
+    assert not item.outdated
+    assert item.status.endswith('is up-to-date')
+    assert [call.args[0] for call in read_text.call_args_list] == [cache_path]
+
+    # Changes to referred files are detected
+    (tmp_path / 'unchanged.txt').write_text('pip==23.1\n')
+    cache = RequirementsCache(cache_path)
+    assert Requirements(path, cache=cache, allow_outdated=True).outdated
+    cache.save()
+    assert Requirements(path, cache=RequirementsCache(cache_path), allow_outdated=True).outdated
+
+
+def test_requirements_cache_invalid(tmp_path: Path, requirements: RequirementsFixture) -> None:
+    cache_path = tmp_path / 'requirements.json'
+    cache_path.write_text('invalid')
+    cache = RequirementsCache(cache_path)
+    assert not Requirements(Path(requirements('unchanged')), cache=cache).outdated
+    cache.save()
+    assert 'graphs' in cache_path.read_text()
@@ -1,6 +1,5 @@
 import os
 from pathlib import Path
-from types import SimpleNamespace
 
 from pytest import raises
 from pytest_mock import MockerFixture
@@ -22,7 +21,7 @@ def test_current_shell_type_unsupported(mocker: MockerFixture) -> None:
 
 def test_execute(mocker: MockerFixture) -> None:
     mocker.patch('pyorbs.shell.current_shell', return_value='bash')
-    run = mocker.patch('pyorbs.shell.run')
+    run = mocker.patch('subprocess.run')
     execute()
     run.assert_called_with(['bash'], capture_output=False, text=True, check=False)
 
@@ -30,7 +29,7 @@ def test_execute(mocker: MockerFixture) -> None:
 def test_execute_init(mocker: MockerFixture) -> None:
     for shell in SHELL_TYPES:
         mocker.patch('pyorbs.shell.current_shell', return_value=shell)
-        run = mocker.patch('pyorbs.shell.run')
+        run = mocker.patch('subprocess.run')
         execute(init=Path('test'))
         assert run.called
 
@@ -50,7 +49,15 @@ def test_which() -> None:
     assert 'which' in which('which')
 
 
-def test_which_error(mocker: MockerFixture) -> None:
-    mocker.patch('pyorbs.shell.run', return_value=SimpleNamespace(returncode=1))
+def test_which_path(tmp_path: Path) -> None:
+    command = tmp_path / 'command'
+    command.touch(mode=0o755)
+    assert which(str(command)) == str(command)
+
+
+def test_which_error(tmp_path: Path) -> None:
+    with raises(ValueError, match='not found'):
+        which('pyorbs-non-existent-command')
+    (tmp_path / 'command').touch(mode=0o644)  # not executable
     with raises(ValueError, match='not found'):
-        which('test')
+        which(str(tmp_path / 'command'))
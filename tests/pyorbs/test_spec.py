@@ -0,0 +1,36 @@
+from pathlib import Path
+
+from pytest import raises
+
+from pyorbs.spec import OrbSpec, read_spec
+
+
+def test_read_spec(tmp_path: Path) -> None:
+    spec = tmp_path / 'pyorbs.ini'
+    spec.write_text(
+        '[DEFAULT]\nexecutable = python3.11\n\n'
+        '[first]\nrequirements = requirements/first.txt\noptions = --bare --no-store\n\n'
+        '[second]\nexecutable = python3.12\n'
+    )
+    assert read_spec(spec) == [
+        OrbSpec(
+            name='first', requirements=tmp_path / 'requirements/first.txt',
+            executable='python3.11', options=['--bare', '--no-store'],
+        ),
+        OrbSpec(name='second', requirements=None, executable='python3.12', options=[]),
+    ]
+
+
+def test_read_spec_errors(tmp_path: Path) -> None:
+    spec = tmp_path / 'pyorbs.ini'
+    with raises(ValueError, match='not found'):
+        read_spec(spec)
+    spec.write_text('invalid')
+    with raises(ValueError, match='Invalid spec file'):
+        read_spec(spec)
+    spec.write_text('[DEFAULT]\nexecutable = python3\n')
+    with raises(ValueError, match='no orbs'):
+        read_spec(spec)
+    spec.write_text('[orb]\nrequirement = requirements.txt\n')
+    with raises(ValueError, match='Unknown option "requirement"'):
+        read_spec(spec)
@@ -0,0 +1,142 @@
+import hashlib
+import sys
+from pathlib import Path
+
+from pytest import raises
+
+from pyorbs.locking import write_file
+from pyorbs.store import Store, file_digest, interpreter_id, interpreter_info, python_tag, relocate
+
+
+def make_venv(path: Path) -> Path:
+    (path / 'bin').mkdir(parents=True)
+    (path / 'pyvenv.cfg').write_text(f'command = python -m venv {path}\n')
+    (path / 'bin/activate').write_text(f'VIRTUAL_ENV="{path}"\n')
+    (path / 'bin/pip').write_text(f'#!{path}/bin/python\n')
+    (path / 'bin/python').symlink_to(sys.executable)
+    return path
+
+
+def test_interpreter_id(tmp_path: Path) -> None:
+    executable = tmp_path / 'python'
+    executable.write_text('original')
+    original_id = interpreter_id(str(executable))
+    assert interpreter_id(str(executable)) == original_id
+    executable.write_text('changed')
+    assert interpreter_id(str(executable)) != original_id
+
+
+def test_interpreter_info(tmp_path: Path) -> None:
+    info = interpreter_info(Path(sys.executable))
+    assert info['python'].startswith(f'{sys.version_info[0]}.{sys.version_info[1]}.')
+    with raises(RuntimeError, match='Unable to run Python interpreter'):
+        interpreter_info(tmp_path / 'missing')
+    assert python_tag(sys.executable) == f'py{sys.version_info[0]}{sys.version_info[1]}'
+
+
+def test_file_digest(tmp_path: Path) -> None:
+    (file := tmp_path / 'file').write_bytes(b'0' * (3 * 1024 * 1024 + 1))
+    assert file_digest(file) == hashlib.sha256(file.read_bytes()).hexdigest()
+
+
+def test_relocate(tmp_path: Path) -> None:
+    venv = make_venv(tmp_path / 'old')
+    relocate(venv, old=tmp_path / 'old', new=tmp_path / 'new')
+    assert (venv / 'bin/activate').read_text() == f'VIRTUAL_ENV="{tmp_path / "new"}"\n'
+    assert (venv / 'bin/pip').read_text() == f'#!{tmp_path / "new"}/bin/python\n'
+    assert str(tmp_path / 'new') in (venv / 'pyvenv.cfg').read_text()
+    assert (venv / 'bin/python').is_symlink()
+
+
+def test_store(tmp_path: Path) -> None:
+    lockfile = tmp_path / 'requirements.txt.lock'
+    lockfile.write_text('pip==23.0\n')
+    key = Store.key(lockfile=lockfile, executable=sys.executable)
+    store = Store(tmp_path / 'store')
+    assert not store.materialize(key=key, target=tmp_path / 'orb')
+
+    (module := make_venv(tmp_path / 'source') / 'module.py').write_text('stored = True\n')
+    assert store.add(key=key, source=tmp_path / 'source')
+    assert not store.add(key=key, source=tmp_path / 'source')  # already present
+    assert (entry := store.get(key))
+    assert (entry / 'module.py').stat().st_ino == module.stat().st_ino
+    assert (tmp_path / 'source/bin/activate').read_text() == (
+        f'VIRTUAL_ENV="{tmp_path / "source"}"\n'
+    )
+    assert (entry / 'bin/activate').read_text() == f'VIRTUAL_ENV="{entry}"\n'
+    assert (entry / 'pyvenv.cfg').stat().st_nlink == 1  # relocated
+    target = make_venv(tmp_path / 'orb')
+    assert store.materialize(key=key, target=target)
+    assert (target / 'bin/activate').read_text() == f'VIRTUAL_ENV="{target}"\n'
+    assert (target / 'module.py').stat().st_ino == module.stat().st_ino  # hardlinked
+    assert (entry / 'bin/activate').read_text() == f'VIRTUAL_ENV="{entry}"\n'
+
+    assert Store.key(lockfile=lockfile, executable=sys.executable, optimize=1) != key
+    lockfile.write_text('pip==23.1\n')
+    assert Store.key(lockfile=lockfile, executable=sys.executable) != key
+
+    # Stored orbs that are not used anymore are pruned
+    staging = store.staging(store.entry('interrupted'))
+    staging.mkdir()
+    with store.lock(shared=True):  # used by another process
+        store.prune_entries(keys=set())
+    assert store.get(key) and staging.exists()
+    store.prune_entries(keys={key})
+    assert store.get(key) and not staging.exists()
+    store.prune_entries(keys=set())
+    assert not store.get(key)
+
+
+def test_bases(tmp_path: Path) -> None:
+    store = Store(tmp_path / 'store')
+    base = store.base(sys.executable)
+    staging = store.staging(base)
+    make_venv(staging)
+    store.commit(staging, base)
+    assert (base / 'bin/activate').read_text() == f'VIRTUAL_ENV="{base}"\n'
+
+    outdated_base = make_venv(base.with_name('outdated'))  # same interpreter, different binary
+    other_base = base.with_name('other')
+    (other_base / 'bin').mkdir(parents=True)
+    (other_base / 'bin/python').symlink_to(tmp_path)
+    store.prune_bases(sys.executable)
+    assert base.exists()
+    assert not outdated_base.exists()
+    assert other_base.exists()
+
+    target = make_venv(tmp_path / 'orb')
+    Store.restore(base, target=target)
+    assert (target / 'bin/activate').read_text() == f'VIRTUAL_ENV="{target}"\n'
+
+
+def test_deduplicate(tmp_path: Path) -> None:
+    store = Store(tmp_path / 'store')
+    for orb in ('first', 'second'):
+        (tmp_path / orb / 'lib').mkdir(parents=True)
+        (tmp_path / orb / 'lib/module.py').write_text('shared = True\n')
+        (tmp_path / orb / 'lib/empty.py').touch()
+        (tmp_path / orb / 'lib/link.py').symlink_to(tmp_path / orb / 'lib/module.py')
+    (tmp_path / 'second/lib/unique.py').write_text('unique = True\n')
+
+    assert store.deduplicate(tmp_path / 'first') == 0
+    assert store.deduplicate(tmp_path / 'second') == len('shared = True\n')
+    assert store.deduplicate(tmp_path / 'second') == 0  # already deduplicated
+    first, second = (tmp_path / orb / 'lib/module.py' for orb in ('first', 'second'))
+    assert first.stat().st_ino == second.stat().st_ino
+    assert (tmp_path / 'second/lib/link.py').is_symlink()
+    assert (tmp_path / 'first/lib/empty.py').stat().st_nlink == 1
+
+    # Files that are rewritten do not affect other orbs
+    write_file(first, 'changed = True\n')
+    assert second.read_text() == 'shared = True\n'
+
+    # Unused objects are pruned
+    objects = list(store.objects.glob('*/*'))
+    assert len(objects) == 2
+    second.unlink()
+    (tmp_path / 'second/lib/unique.py').unlink()
+    with store.lock(shared=True):  # used by another process
+        store.prune_objects()
+    assert len(list(store.objects.glob('*/*'))) == 2
+    store.prune_objects()
+    assert not list(store.objects.glob('*/*'))
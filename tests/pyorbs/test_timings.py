@@ -0,0 +1,41 @@
+import json
+import threading
+from pathlib import Path
+
+from pytest import raises
+
+from pyorbs.timings import Timings
+
+
+def test_timings(tmp_path: Path) -> None:
+    timings = Timings()
+    with timings.phase('make'):
+        with timings.phase('execute', command='pip install'):
+            pass
+        with raises(RuntimeError), timings.phase('execute', command='pip freeze'):
+            raise RuntimeError('Failed')
+
+    def freeze() -> None:
+        with timings.phase('freeze'):
+            pass
+
+    thread = threading.Thread(target=freeze)
+    thread.start()
+    thread.join()
+
+    summary = timings.summary().splitlines()
+    assert summary[0].split() == ['Phase', 'Calls', 'Time']
+    assert [line.split()[:2] for line in summary[1:4]] == [
+        ['make', '1'], ['execute', '2'], ['freeze', '1'],
+    ]
+    assert summary[-2].endswith('pip install')
+    assert summary[-1].endswith('pip freeze')
+
+    trace = tmp_path / 'trace.json'
+    timings.write_trace(trace)
+    events = json.loads(trace.read_text())['traceEvents']
+    assert [event['name'] for event in events] == ['make', 'execute', 'execute', 'freeze']
+    assert events[1]['args'] == {'command': 'pip install'}
+    assert events[0]['ts'] <= events[1]['ts']
+    assert events[0]['dur'] >= events[1]['dur'] + events[2]['dur']
+    assert events[3]['tid'] != events[0]['tid']
@@ -0,0 +1,40 @@
+import os
+from pathlib import Path
+
+from pyorbs.usage import StorageUsage
+
+
+def test_storage_usage(tmp_path: Path) -> None:
+    shared, size = os.urandom(100000), 100000
+    for name, number in (('first', 1), ('first', 2), ('second', 1)):
+        (generation := tmp_path / '.generations' / name / str(number)).mkdir(parents=True)
+        (generation / 'unique').write_bytes(os.urandom(100000))
+    (tmp_path / 'first').symlink_to('.generations/first/2')
+    (tmp_path / 'legacy').mkdir()
+    (tmp_path / 'legacy/unique').write_bytes(os.urandom(100000))
+    (objects := tmp_path / '.store/objects/00').mkdir(parents=True)
+    (objects / 'shared').write_bytes(shared)
+    (objects / 'unused').write_bytes(shared)
+    for stored in ('key', 'unused'):
+        (tmp_path / '.store/orbs' / stored).mkdir(parents=True)
+        (tmp_path / '.store/orbs' / stored / 'shared').hardlink_to(objects / 'shared')
+    (tmp_path / '.generations/second/1/shared').hardlink_to(objects / 'shared')
+
+    usage = StorageUsage(tmp_path, keys={'first': None, 'second': 'key', 'legacy': None})
+    total = usage.size
+    assert total >= 5 * size  # the unused object is not counted
+    assert sorted(usage.generations('first')) == [
+        tmp_path / '.generations/first/1', tmp_path / '.generations/first/2', tmp_path / 'first',
+    ]
+    assert usage.unused() == [tmp_path / '.store/orbs/unused']
+    assert usage.release(usage.unused()) < size  # the shared file is still used
+    assert usage.release(usage.unused()) == 0  # already released
+
+    # Shared files are freed along with the last part using them
+    assert usage.freed([tmp_path / '.generations/second/1']) < 2 * size
+    assert usage.freed(usage.orb('second')) > 2 * size
+    assert usage.remove_orb('second') > 2 * size
+    assert usage.freed([tmp_path / '.generations/first/1']) >= size
+    assert usage.remove_orb('legacy') >= size
+    assert usage.remove_orb('first') >= 2 * size
+    assert usage.size < total - 5 * size
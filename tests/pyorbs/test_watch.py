@@ -0,0 +1,43 @@
+import threading
+import time
+from pathlib import Path
+
+from pytest import mark, skip
+
+from pyorbs.watch import Watcher
+
+
+def edit_later(*files: Path) -> threading.Thread:
+    def edit() -> None:
+        for file in files:
+            time.sleep(0.05)
+            file.write_text(f'{file.read_text()}changed\n')
+    thread = threading.Thread(target=edit)
+    thread.start()
+    return thread
+
+
+@mark.parametrize('inotify', [True, False])
+def test_watcher(tmp_path: Path, inotify: bool) -> None:
+    watched, other = tmp_path / 'requirements.txt', tmp_path / 'other.txt'
+    included = tmp_path / 'requirements/base.txt'
+    included.parent.mkdir()
+    for file in (watched, other, included):
+        file.write_text('six\n')
+
+    with Watcher(debounce=0.2, interval=0.01, inotify=inotify) as watcher:
+        if inotify and not watcher.inotify:
+            skip('inotify is not available')
+        watcher.watch([watched, included])
+        thread = edit_later(other, watched, included)
+        assert watcher.wait() == {watched, included}  # bursts of changes are reported at once
+        thread.join()
+
+        # Files replaced by editors are reported as well
+        watcher.watch([watched])
+        thread = edit_later(other)
+        tmp_file = tmp_path / '.requirements.txt.swp'
+        tmp_file.write_text('PyYAML\n')
+        tmp_file.replace(watched)
+        assert watcher.wait() == {watched}
+        thread.join()